@@ -32,6 +32,12 @@ interface ApiService {
         @Query("page_size") pageSize: Int = 50
     ): Response<BankNotificationListResponse>
 
+    @GET("api/v1/bank-notifications/changes")
+    suspend fun getBankNotificationChanges(
+        @Query("since") since: String? = null,
+        @Query("limit") limit: Int = 100
+    ): Response<BankNotificationChangesResponse>
+
     @POST("api/v1/bank-notifications/device-status")
     suspend fun updateDeviceStatus(
         @Body status: DeviceStatusUpdate
@@ -85,7 +85,17 @@ data class BankNotificationListResponse(
     val total: Int,
     val page: Int,
     @SerializedName("page_size")
-    val pageSize: Int
+    val pageSize: Int,
+    @SerializedName("sync_token")
+    val syncToken: String? = null
+)
+
+data class BankNotificationChangesResponse(
+    val items: List<BankNotificationResponse>,
+    @SerializedName("next_token")
+    val nextToken: String,
+    @SerializedName("has_more")
+    val hasMore: Boolean
 )
 
 data class DeviceStatusUpdate(
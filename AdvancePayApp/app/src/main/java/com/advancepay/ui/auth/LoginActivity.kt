@@ -9,6 +9,7 @@ import androidx.lifecycle.lifecycleScope
 import com.advancepay.data.api.ApiService
 import com.advancepay.data.repository.TokenManager
 import com.advancepay.databinding.ActivityLoginBinding
+import com.advancepay.ui.history.HistoryActivity
 import com.advancepay.ui.main.MainActivity
 import kotlinx.coroutines.flow.first
 import kotlinx.coroutines.launch
@@ -64,6 +65,7 @@ class LoginActivity : AppCompatActivity() {
                 if (response.isSuccessful && response.body() != null) {
                     val token = response.body()!!.accessToken
                     tokenManager.saveToken(token)
+                    HistoryActivity.clearSyncedHistory()
 
                     Toast.makeText(this@LoginActivity, "Вход выполнен", Toast.LENGTH_SHORT).show()
                     navigateToMain()
@@ -22,6 +22,36 @@ import java.util.*
 
 class HistoryActivity : AppCompatActivity() {
 
+    companion object {
+        // Первая загрузка берёт столько последних уведомлений, дальше приходят только изменения
+        private const val FIRST_PAGE_SIZE = 100
+        // После долгого перерыва изменения догружаются не больше чем по стольку страниц за обновление
+        private const val MAX_PAGES_PER_LOAD = 5
+        // Сколько последних уведомлений держим в памяти
+        private const val MAX_SYNCED_NOTIFICATIONS = 500
+
+        // Синхронизированная история и токен переживают пересоздание экрана,
+        // но принадлежат сессии, в которой загружены
+        private val syncedNotifications = linkedMapOf<String, BankNotificationResponse>()
+        private var syncToken: String? = null
+        private var syncedForToken: String? = null
+
+        /** Забыть историю прошлой сессии: вызывается при входе и выходе */
+        fun clearSyncedHistory() {
+            syncedNotifications.clear()
+            syncToken = null
+            syncedForToken = null
+        }
+
+        private fun trimSyncedHistory() {
+            if (syncedNotifications.size <= MAX_SYNCED_NOTIFICATIONS) return
+            syncedNotifications.values
+                .sortedByDescending { it.createdAt }
+                .drop(MAX_SYNCED_NOTIFICATIONS)
+                .forEach { syncedNotifications.remove(it.id) }
+        }
+    }
+
     private lateinit var binding: ActivityHistoryBinding
     private lateinit var tokenManager: TokenManager
     private lateinit var adapter: NotificationAdapter
@@ -62,11 +92,43 @@ class HistoryActivity : AppCompatActivity() {
                     return@launch
                 }
 
+                if (token != syncedForToken) {
+                    clearSyncedHistory()
+                    syncedForToken = token
+                }
+
                 val api = ApiService.create(token)
-                val response = api.getBankNotifications(page = 1, pageSize = 100)
+
+                // Первый раз: последняя страница истории и токен, с которого идут изменения после неё
+                if (syncToken == null) {
+                    val listResponse = api.getBankNotifications(page = 1, pageSize = FIRST_PAGE_SIZE)
+                    val list = listResponse.body()
+                    if (!listResponse.isSuccessful || list?.syncToken == null) {
+                        showLoadError(listResponse.code())
+                        return@launch
+                    }
+                    if (token != syncedForToken) return@launch  // сессия сменилась во время загрузки
+                    list.items.forEach { syncedNotifications[it.id] = it }
+                    syncToken = list.syncToken
+                }
+
+                // Забираем только изменения с прошлой синхронизации, остальное при следующем обновлении
+                var pages = 0
+                var hasMore = false
+                var response = api.getBankNotificationChanges(since = syncToken)
+                while (response.isSuccessful && response.body() != null) {
+                    val changes = response.body()!!
+                    if (token != syncedForToken) return@launch  // сессия сменилась во время загрузки
+                    changes.items.forEach { syncedNotifications[it.id] = it }
+                    syncToken = changes.nextToken
+                    hasMore = changes.hasMore
+                    if (!hasMore || ++pages >= MAX_PAGES_PER_LOAD) break
+                    response = api.getBankNotificationChanges(since = syncToken)
+                }
 
                 if (response.isSuccessful && response.body() != null) {
-                    val notifications = response.body()!!.items
+                    trimSyncedHistory()
+                    val notifications = syncedNotifications.values.sortedByDescending { it.createdAt }
                     adapter.updateData(notifications)
 
                     if (notifications.isEmpty()) {
@@ -76,12 +138,16 @@ class HistoryActivity : AppCompatActivity() {
                         binding.tvEmpty.visibility = View.GONE
                         binding.recyclerView.visibility = View.VISIBLE
                     }
+
+                    if (hasMore) {
+                        Toast.makeText(
+                            this@HistoryActivity,
+                            "Загружена часть истории, обновите, чтобы загрузить ещё",
+                            Toast.LENGTH_SHORT
+                        ).show()
+                    }
                 } else {
-                    Toast.makeText(
-                        this@HistoryActivity,
-                        "Ошибка загрузки: ${response.code()}",
-                        Toast.LENGTH_SHORT
-                    ).show()
+                    showLoadError(response.code())
                 }
 
             } catch (e: Exception) {
@@ -96,6 +162,10 @@ class HistoryActivity : AppCompatActivity() {
         }
     }
 
+    private fun showLoadError(code: Int) {
+        Toast.makeText(this, "Ошибка загрузки: $code", Toast.LENGTH_SHORT).show()
+    }
+
     override fun onSupportNavigateUp(): Boolean {
         finish()
         return true
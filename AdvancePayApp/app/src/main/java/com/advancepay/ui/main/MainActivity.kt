@@ -181,6 +181,7 @@ class MainActivity : AppCompatActivity() {
     private fun logout() {
         lifecycleScope.launch {
             tokenManager.clearToken()
+            HistoryActivity.clearSyncedHistory()
 
             // Останавливаем сервис
             stopService(Intent(this@MainActivity, MonitoringForegroundService::class.java))
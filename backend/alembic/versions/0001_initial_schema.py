@@ -0,0 +1,174 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 12:10:25.302646
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('teams',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('teamlead_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=True),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.Enum('OWNER', 'INVESTOR', 'SUPPORT', 'TEAMLEAD', 'TRADER', name='userrole'), nullable=False),
+    sa.Column('team_id', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('working_balance', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('security_deposit', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('security_deposit_required', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('pending_balance', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_username'), ['username'], unique=True)
+
+    op.create_table('bank_notifications',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('app_package', sa.String(length=200), nullable=False),
+    sa.Column('app_name', sa.String(length=100), nullable=True),
+    sa.Column('notification_title', sa.String(length=500), nullable=False),
+    sa.Column('notification_text', sa.Text(), nullable=False),
+    sa.Column('posted_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('card_last4', sa.String(length=4), nullable=True),
+    sa.Column('operation_type', sa.String(length=50), nullable=True),
+    sa.Column('raw_data', sa.Text(), nullable=True),
+    sa.Column('is_processed', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('notifications',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('type', sa.Enum('PAYIN', 'PAYOUT', 'DISPUTE', 'SYSTEM', 'BALANCE', name='notificationtype'), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('message', sa.String(length=500), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('amount_usdt', sa.Numeric(precision=18, scale=6), nullable=True),
+    sa.Column('order_id', sa.String(length=50), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('requisites',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('type', sa.Enum('CARD', 'ACCOUNT', 'SBP', name='requisitetype'), nullable=False),
+    sa.Column('bank_name', sa.String(length=100), nullable=False),
+    sa.Column('card_number', sa.String(length=30), nullable=True),
+    sa.Column('account_number', sa.String(length=30), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('holder_name', sa.String(length=100), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('daily_limit', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('daily_used', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('monthly_limit', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('monthly_used', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('total_processed', sa.Numeric(precision=18, scale=2), nullable=True),
+    sa.Column('transactions_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('methods', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('wallet_transactions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('type', sa.Enum('DEPOSIT', 'WITHDRAW', name='wallettransactiontype'), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'COMPLETED', 'FAILED', 'CANCELLED', name='wallettransactionstatus'), nullable=True),
+    sa.Column('tx_hash', sa.String(length=100), nullable=True),
+    sa.Column('address', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('transactions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('order_id', sa.String(length=50), nullable=False),
+    sa.Column('trader_id', sa.String(), nullable=False),
+    sa.Column('requisite_id', sa.String(), nullable=True),
+    sa.Column('type', sa.Enum('PAYIN', 'PAYOUT', name='transactiontype'), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('amount_usdt', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('method', sa.Enum('SBP', 'CARD', 'ACCOUNT', 'QR', name='paymentmethod'), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', 'DISPUTED', 'CANCELLED', name='transactionstatus'), nullable=True),
+    sa.Column('card_last4', sa.String(length=4), nullable=True),
+    sa.Column('bank_name', sa.String(length=100), nullable=True),
+    sa.Column('client_id', sa.String(length=100), nullable=True),
+    sa.Column('direction', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['requisite_id'], ['requisites.id'], ),
+    sa.ForeignKeyConstraint(['trader_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_transactions_order_id'), ['order_id'], unique=True)
+
+    op.create_table('disputes',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('transaction_id', sa.String(), nullable=False),
+    sa.Column('trader_id', sa.String(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('amount_usdt', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('status', sa.Enum('OPEN', 'PENDING', 'RESOLVED', 'WON', 'LOST', name='disputestatus'), nullable=True),
+    sa.Column('reason', sa.Enum('PAYMENT_NOT_RECEIVED', 'AMOUNT_MISMATCH', 'DUPLICATE_PAYMENT', 'WRONG_DETAILS', 'TIMEOUT', 'OTHER', name='disputereason'), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('client_message', sa.Text(), nullable=True),
+    sa.Column('trader_response', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('deadline_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['trader_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('disputes')
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_transactions_order_id'))
+
+    op.drop_table('transactions')
+    op.drop_table('wallet_transactions')
+    op.drop_table('requisites')
+    op.drop_table('notifications')
+    op.drop_table('bank_notifications')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username'))
+
+    op.drop_table('users')
+    op.drop_table('teams')
@@ -0,0 +1,30 @@
+"""bank notification fingerprint
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:14:02.118310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('bank_notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_bank_notifications_fingerprint'), ['fingerprint'], unique=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('bank_notifications', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bank_notifications_fingerprint'))
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,64 @@
+"""list query indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:16:40.527104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('bank_notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_bank_notifications_created_at', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_bank_notifications_user_id_created_at', ['user_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('disputes', schema=None) as batch_op:
+        batch_op.create_index('ix_disputes_trader_id_created_at', ['trader_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_disputes_trader_id_status_created_at', ['trader_id', 'status', 'created_at'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_notifications_user_id_is_read', ['user_id', 'is_read'], unique=False)
+
+    with op.batch_alter_table('requisites', schema=None) as batch_op:
+        batch_op.create_index('ix_requisites_owner_id_created_at', ['owner_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_trader_id_created_at', ['trader_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('wallet_transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_wallet_transactions_user_id_created_at', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('wallet_transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_wallet_transactions_user_id_created_at')
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_trader_id_created_at')
+
+    with op.batch_alter_table('requisites', schema=None) as batch_op:
+        batch_op.drop_index('ix_requisites_owner_id_created_at')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_id_is_read')
+        batch_op.drop_index('ix_notifications_user_id_created_at')
+
+    with op.batch_alter_table('disputes', schema=None) as batch_op:
+        batch_op.drop_index('ix_disputes_trader_id_status_created_at')
+        batch_op.drop_index('ix_disputes_trader_id_created_at')
+
+    with op.batch_alter_table('bank_notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_bank_notifications_user_id_created_at')
+        batch_op.drop_index('ix_bank_notifications_created_at')
@@ -0,0 +1,32 @@
+"""resource versions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:02:11.318540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('resource_versions',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('resource', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'resource')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('resource_versions')
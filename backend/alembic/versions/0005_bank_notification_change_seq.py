@@ -0,0 +1,30 @@
+"""bank notification change sequence
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:10:37.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('bank_notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_bank_notifications_user_id_change_seq', ['user_id', 'change_seq', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('bank_notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_bank_notifications_user_id_change_seq')
+        batch_op.drop_column('change_seq')
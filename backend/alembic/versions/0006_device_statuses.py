@@ -0,0 +1,36 @@
+"""device statuses
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:24:05.771932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('device_statuses',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('battery_level', sa.Integer(), nullable=False),
+    sa.Column('is_charging', sa.Boolean(), nullable=False),
+    sa.Column('has_internet', sa.Boolean(), nullable=False),
+    sa.Column('is_working', sa.Boolean(), nullable=False),
+    sa.Column('last_notification_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_heartbeat_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('device_statuses')
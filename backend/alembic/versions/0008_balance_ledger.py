@@ -0,0 +1,126 @@
+"""balance ledger
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:12:37.905969
+
+"""
+import os
+import time
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ULID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def upgrade() -> None:
+    op.create_table('balance_ledger',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('entry_type', sa.Enum('OPENING', 'WITHDRAW_REQUESTED', 'TRANSACTION_COMPLETED', 'TRANSACTION_REVERSED', name='ledgerentrytype'), nullable=False),
+    sa.Column('reference_id', sa.String(), nullable=True),
+    sa.Column('working_delta', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('pending_delta', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('deposit_delta', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('processed_delta', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('working_balance', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('pending_balance', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('security_deposit', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('total_processed', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('balance_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_balance_ledger_user_id_created_at', ['user_id', 'created_at', 'id'], unique=False)
+
+    op.create_table('balance_snapshots',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('working_balance', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('pending_balance', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('security_deposit', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('total_processed', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    backfill_opening_balances()
+
+
+def _ulid() -> str:
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    return ''.join(ULID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+def backfill_opening_balances() -> None:
+    """Carry current balances and total processed over as each user's opening entry."""
+    users = sa.table(
+        'users',
+        sa.column('id'), sa.column('working_balance'), sa.column('pending_balance'), sa.column('security_deposit'),
+    )
+    transactions = sa.table('transactions', sa.column('trader_id'), sa.column('amount_usdt'), sa.column('status'))
+    snapshots = sa.table(
+        'balance_snapshots',
+        sa.column('user_id'), sa.column('working_balance'), sa.column('pending_balance'),
+        sa.column('security_deposit'), sa.column('total_processed'), sa.column('updated_at'),
+    )
+    ledger = sa.table(
+        'balance_ledger',
+        sa.column('id'), sa.column('user_id'), sa.column('entry_type'), sa.column('reference_id'),
+        sa.column('working_delta'), sa.column('pending_delta'), sa.column('deposit_delta'), sa.column('processed_delta'),
+        sa.column('working_balance'), sa.column('pending_balance'), sa.column('security_deposit'),
+        sa.column('total_processed'), sa.column('created_at'),
+    )
+
+    bind = op.get_bind()
+    processed = dict(bind.execute(
+        sa.select(transactions.c.trader_id, sa.func.sum(transactions.c.amount_usdt))
+        .where(transactions.c.status == 'COMPLETED')
+        .group_by(transactions.c.trader_id)
+    ).all())
+
+    now = datetime.utcnow()
+    snapshot_rows, ledger_rows = [], []
+    for user in bind.execute(sa.select(users)).all():
+        balances = {
+            'working_balance': user.working_balance or 0,
+            'pending_balance': user.pending_balance or 0,
+            'security_deposit': user.security_deposit or 0,
+            'total_processed': processed.get(user.id) or 0,
+        }
+        snapshot_rows.append({'user_id': user.id, 'updated_at': now, **balances})
+        ledger_rows.append({
+            'id': _ulid(),
+            'user_id': user.id,
+            'entry_type': 'OPENING',
+            'reference_id': None,
+            'working_delta': balances['working_balance'],
+            'pending_delta': balances['pending_balance'],
+            'deposit_delta': balances['security_deposit'],
+            'processed_delta': balances['total_processed'],
+            'created_at': now,
+            **balances,
+        })
+
+    if snapshot_rows:
+        op.bulk_insert(snapshots, snapshot_rows)
+        op.bulk_insert(ledger, ledger_rows)
+
+
+def downgrade() -> None:
+    op.drop_table('balance_snapshots')
+    with op.batch_alter_table('balance_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_balance_ledger_user_id_created_at')
+
+    op.drop_table('balance_ledger')
@@ -0,0 +1,103 @@
+"""trader stats
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 19:03:27.560082
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUSES = ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', 'DISPUTED', 'CANCELLED')
+TYPES = ('PAYIN', 'PAYOUT')
+
+
+def upgrade() -> None:
+    op.create_table('trader_stats',
+    sa.Column('trader_id', sa.String(), nullable=False),
+    sa.Column('total_count', sa.Integer(), nullable=False),
+    sa.Column('total_processed', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('pending_count', sa.Integer(), nullable=False),
+    sa.Column('processing_count', sa.Integer(), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.Column('failed_count', sa.Integer(), nullable=False),
+    sa.Column('disputed_count', sa.Integer(), nullable=False),
+    sa.Column('cancelled_count', sa.Integer(), nullable=False),
+    sa.Column('payin_count', sa.Integer(), nullable=False),
+    sa.Column('payout_count', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=True),
+    sa.Column('day_count', sa.Integer(), nullable=False),
+    sa.Column('day_volume', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('month', sa.Date(), nullable=True),
+    sa.Column('month_count', sa.Integer(), nullable=False),
+    sa.Column('month_volume', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['trader_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('trader_id')
+    )
+
+    # Existing transactions are counted once here, afterwards incrementally
+    backfill_trader_stats()
+
+
+def backfill_trader_stats() -> None:
+    """Aggregate every trader's existing transactions into their stats row."""
+    transactions = sa.table(
+        'transactions',
+        sa.column('trader_id'), sa.column('type'), sa.column('status'),
+        sa.column('amount_usdt', sa.Numeric(18, 6)), sa.column('completed_at', sa.DateTime(timezone=True)),
+    )
+    trader_stats = sa.table(
+        'trader_stats',
+        sa.column('trader_id'), sa.column('total_count'), sa.column('total_processed'),
+        *(sa.column(f'{status.lower()}_count') for status in STATUSES + TYPES),
+        sa.column('day'), sa.column('day_count'), sa.column('day_volume'),
+        sa.column('month'), sa.column('month_count'), sa.column('month_volume'),
+    )
+
+    now = datetime.utcnow()
+    today = now.date()
+    month = today.replace(day=1)
+    completed = transactions.c.status == 'COMPLETED'
+    completed_today = sa.and_(completed, transactions.c.completed_at >= datetime.combine(today, datetime.min.time()))
+    completed_this_month = sa.and_(
+        completed, transactions.c.completed_at >= datetime.combine(month, datetime.min.time())
+    )
+
+    def count_where(condition):
+        return sa.func.sum(sa.case((condition, 1), else_=0))
+
+    def volume_where(condition):
+        return sa.func.coalesce(sa.func.sum(sa.case((condition, transactions.c.amount_usdt), else_=0)), 0)
+
+    values = {
+        'trader_id': transactions.c.trader_id,
+        'total_count': sa.func.count(),
+        'total_processed': volume_where(completed),
+        **{f'{status.lower()}_count': count_where(transactions.c.status == status) for status in STATUSES},
+        **{f'{tx_type.lower()}_count': count_where(transactions.c.type == tx_type) for tx_type in TYPES},
+        'day': sa.literal(today, sa.Date),
+        'day_count': count_where(completed_today),
+        'day_volume': volume_where(completed_today),
+        'month': sa.literal(month, sa.Date),
+        'month_count': count_where(completed_this_month),
+        'month_volume': volume_where(completed_this_month),
+    }
+    op.execute(trader_stats.insert().from_select(
+        list(values),
+        sa.select(*(value.label(name) for name, value in values.items())).group_by(transactions.c.trader_id),
+    ))
+
+
+def downgrade() -> None:
+    op.drop_table('trader_stats')
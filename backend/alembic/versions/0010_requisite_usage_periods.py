@@ -0,0 +1,30 @@
+"""requisite usage periods
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 19:41:37.008261
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('requisites', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('usage_day', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('usage_month', sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('requisites', schema=None) as batch_op:
+        batch_op.drop_column('usage_month')
+        batch_op.drop_column('usage_day')
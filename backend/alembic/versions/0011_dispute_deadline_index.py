@@ -0,0 +1,28 @@
+"""dispute deadline index
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 20:12:05.431870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('disputes', schema=None) as batch_op:
+        batch_op.create_index('ix_disputes_status_deadline_at', ['status', 'deadline_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('disputes', schema=None) as batch_op:
+        batch_op.drop_index('ix_disputes_status_deadline_at')
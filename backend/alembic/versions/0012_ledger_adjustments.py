@@ -0,0 +1,121 @@
+"""ledger adjustments
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 21:04:51.227316
+
+"""
+import os
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BALANCE_COLUMNS = ('working_balance', 'pending_balance', 'security_deposit', 'total_processed')
+DELTA_COLUMNS = ('working_delta', 'pending_delta', 'deposit_delta', 'processed_delta')
+SCALES = (2, 2, 2, 6)
+ULID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # A new enum value must be committed before rows can use it
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE ledgerentrytype ADD VALUE IF NOT EXISTS 'ADJUSTMENT'")
+
+    book_missing_balances()
+
+
+def _ulid() -> str:
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    return ''.join(ULID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+def _decimal(value) -> Decimal:
+    return Decimal('0') if value is None else Decimal(str(value))
+
+
+def _numeric(names):
+    return [sa.column(name, sa.Numeric(18, scale)) for name, scale in zip(names, SCALES)]
+
+
+def book_missing_balances() -> None:
+    """
+    Users registered since 0008 have no snapshot, and balances written
+    around the ledger left others behind: book the difference to the
+    users columns and completed transactions as one entry per user.
+    """
+    users = sa.table(
+        'users',
+        sa.column('id'), sa.column('working_balance'), sa.column('pending_balance'), sa.column('security_deposit'),
+    )
+    transactions = sa.table('transactions', sa.column('trader_id'), sa.column('amount_usdt'), sa.column('status'))
+    snapshots = sa.table(
+        'balance_snapshots',
+        sa.column('user_id'), sa.column('updated_at', sa.DateTime(timezone=True)), *_numeric(BALANCE_COLUMNS),
+    )
+    ledger = sa.table(
+        'balance_ledger',
+        sa.column('id'), sa.column('user_id'), sa.column('entry_type'), sa.column('reference_id'),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+        *_numeric(DELTA_COLUMNS), *_numeric(BALANCE_COLUMNS),
+    )
+
+    bind = op.get_bind()
+    processed = dict(bind.execute(
+        sa.select(transactions.c.trader_id, sa.func.sum(transactions.c.amount_usdt))
+        .where(transactions.c.status == 'COMPLETED')
+        .group_by(transactions.c.trader_id)
+    ).all())
+    stored = {row.user_id: row for row in bind.execute(sa.select(snapshots)).all()}
+
+    now = datetime.utcnow()
+    ledger_rows = []
+    for user in bind.execute(sa.select(users)).all():
+        expected = {
+            'working_balance': _decimal(user.working_balance),
+            'pending_balance': _decimal(user.pending_balance),
+            'security_deposit': _decimal(user.security_deposit),
+            'total_processed': _decimal(processed.get(user.id)),
+        }
+        snapshot = stored.get(user.id)
+        deltas = {
+            column: expected[column] - (_decimal(getattr(snapshot, column)) if snapshot is not None else 0)
+            for column in BALANCE_COLUMNS
+        }
+        if snapshot is not None and not any(deltas.values()):
+            continue
+
+        if snapshot is None:
+            bind.execute(snapshots.insert().values(user_id=user.id, updated_at=now, **expected))
+        else:
+            bind.execute(
+                snapshots.update().where(snapshots.c.user_id == user.id).values(updated_at=now, **expected)
+            )
+        ledger_rows.append({
+            'id': _ulid(),
+            'user_id': user.id,
+            'entry_type': 'OPENING' if snapshot is None else 'ADJUSTMENT',
+            'reference_id': None,
+            'created_at': now,
+            **dict(zip(DELTA_COLUMNS, (deltas[column] for column in BALANCE_COLUMNS))),
+            **expected,
+        })
+
+    if ledger_rows:
+        op.bulk_insert(ledger, ledger_rows)
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop an enum value; the booked entries stay valid history
+    pass
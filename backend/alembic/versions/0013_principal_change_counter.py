@@ -0,0 +1,41 @@
+"""principal change counter
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 23:41:37.602915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    counters = op.create_table('change_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    with op.batch_alter_table('resource_versions', schema=None) as batch_op:
+        batch_op.create_index('ix_resource_versions_resource_version', ['resource', 'version'], unique=False)
+
+    # Continue above every principal stamp issued so far, so none is mistaken for a new one
+    versions = sa.table('resource_versions', sa.column('resource'), sa.column('version'))
+    latest = op.get_bind().execute(
+        sa.select(sa.func.max(versions.c.version)).where(versions.c.resource == 'principal')
+    ).scalar()
+    op.bulk_insert(counters, [{'name': 'principal', 'value': latest or 0}])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('resource_versions', schema=None) as batch_op:
+        batch_op.drop_index('ix_resource_versions_resource_version')
+    op.drop_table('change_counters')
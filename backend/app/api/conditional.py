@@ -0,0 +1,44 @@
+"""
+Conditional GET for polled endpoints.
+
+The ETag combines the caller's version stamp of the resource with the query
+string, so each page/filter combination is cached separately by clients.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.versions import get_version
+
+
+def make_etag(resource: str, version: int, query: str) -> str:
+    query_hash = hashlib.blake2s(query.encode(), digest_size=6).hexdigest()
+    return f'W/"{resource}-{version}-{query_hash}"'
+
+
+async def not_modified(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    user_id: str,
+    resource: str,
+    version: Optional[int] = None,
+) -> Optional[Response]:
+    """
+    Return a 304 response when the client's copy is current; otherwise set
+    the ETag on the outgoing response and return None. Callers that need
+    the stamp themselves pass the ``version`` they read.
+    """
+    if version is None:
+        version = await get_version(db, user_id, resource)
+    etag = make_etag(resource, version, str(request.url.query))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -1,35 +1,93 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from typing import Optional
 
-from app.db.database import get_db
-from app.core.security import oauth2_scheme, decode_token
+from app.db.database import get_db, async_session
+from app.core.security import oauth2_scheme, optional_oauth2_scheme, decode_token
+from app.core.principal_cache import Principal, principal_cache
 from app.models.user import User, UserRole
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    payload = decode_token(token)
-    if payload is None:
-        raise credentials_exception
 
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
+async def authenticate_token(token: str, db: AsyncSession) -> Principal:
+    """Resolve a bearer token to a principal, from the principal cache when possible"""
+    principal = principal_cache.get(token)
+
+    if principal is None:
+        payload = decode_token(token)
+        if payload is None:
+            raise credentials_exception()
+
+        user_id: str = payload.get("sub")
+        if user_id is None:
+            raise credentials_exception()
+
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+
+        if user is None:
+            raise credentials_exception()
+
+        principal = Principal.from_user(user)
+        principal_cache.put(token, principal, payload.get("exp"))
+
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    return principal
+
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    return await authenticate_token(token, db)
+
+
+def get_stream_token(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None),
+) -> str:
+    """
+    Bearer token of a long-lived stream. Browsers' EventSource cannot send
+    headers, so the token may come as ?access_token=.
+    """
+    token = token or access_token
+    if not token:
+        raise credentials_exception()
+    return token
+
+
+async def authenticate_stream_token(token: str) -> Principal:
+    """Uses its own short session, so a stream does not pin a pooled connection."""
+    async with async_session() as db:
+        return await authenticate_token(token, db)
+
+
+async def get_stream_principal(token: str = Depends(get_stream_token)) -> Principal:
+    """Auth for long-lived streams; they re-check it with ``authenticate_stream_token``."""
+    return await authenticate_stream_token(token)
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Full ORM user, for endpoints that need balances or profile fields"""
+    # On a cache miss the user is already in the session's identity map
+    user = await db.get(User, principal.id)
 
     if user is None:
-        raise credentials_exception
+        principal_cache.invalidate_user(principal.id)
+        raise credentials_exception()
 
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -46,11 +104,11 @@ async def get_current_active_user(
 
 
 def require_roles(*roles: UserRole):
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
-        if current_user.role not in roles:
+    async def role_checker(principal: Principal = Depends(get_current_principal)) -> Principal:
+        if principal.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions"
             )
-        return current_user
+        return principal
     return role_checker
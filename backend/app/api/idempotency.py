@@ -0,0 +1,172 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A client that retries a POST with the same ``Idempotency-Key`` header gets
+the first response replayed instead of running the handler again. The
+response is stored in ``idempotency_keys`` in the same commit as the
+handler's writes, so a key is never recorded without its effects or vice
+versa. When two copies of a request race, the loser's commit hits the
+primary key, is rolled back, and replays the winner's response.
+
+Recently used keys are also kept in an in-process LRU, so replays are
+usually answered without a query. Reusing a key with a different request
+body is rejected with 422.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_principal
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.core.timeutil import utc_timestamp
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: str
+    stored_at: float
+
+
+class IdempotencyCache:
+    """Bounded LRU of (user id, key) -> stored response."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[Tuple[str, str], StoredResponse]" = OrderedDict()
+
+    def get(self, user_id: str, key: str) -> Optional[StoredResponse]:
+        stored = self._items.get((user_id, key))
+        if stored is None:
+            return None
+        if stored.stored_at + self.ttl <= time.time():
+            del self._items[(user_id, key)]
+            return None
+        self._items.move_to_end((user_id, key))
+        return stored
+
+    def put(self, user_id: str, key: str, stored: StoredResponse) -> None:
+        self._items[(user_id, key)] = stored
+        self._items.move_to_end((user_id, key))
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+idempotency_cache = IdempotencyCache(settings.idempotency_cache_size, settings.idempotency_key_ttl_hours * 3600)
+
+
+class Idempotency:
+    def __init__(self, user_id: str, key: Optional[str], endpoint: str, request_hash: str):
+        self.user_id = user_id
+        self.key = key
+        self.endpoint = endpoint
+        self.request_hash = request_hash
+
+    def _response(self, stored: StoredResponse) -> Response:
+        if stored.request_hash != self.request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+    async def replay(self, db: AsyncSession) -> Optional[Response]:
+        """The stored response for this key, or None when the handler must run."""
+        if self.key is None:
+            return None
+
+        stored = idempotency_cache.get(self.user_id, self.key)
+        if stored is None:
+            record = await db.get(IdempotencyKey, (self.user_id, self.key))
+            if record is None:
+                return None
+            stored = StoredResponse(
+                request_hash=record.request_hash,
+                status_code=record.status_code,
+                body=record.response_body,
+                stored_at=utc_timestamp(record.created_at, time.time()),
+            )
+            if stored.stored_at + idempotency_cache.ttl <= time.time():
+                # Expired: the key may be reused, this request replaces the record
+                await db.delete(record)
+                return None
+            idempotency_cache.put(self.user_id, self.key, stored)
+
+        return self._response(stored)
+
+    async def commit(self, db: AsyncSession, body: BaseModel, status_code: int) -> Optional[Response]:
+        """
+        Commit the handler's writes together with its response.
+
+        Returns None when this request won, or the winner's response when a
+        concurrent copy with the same key committed first (this request's
+        writes are rolled back then).
+        """
+        if self.key is None:
+            await db.commit()
+            return None
+
+        payload = body.model_dump_json()
+        db.add(IdempotencyKey(
+            user_id=self.user_id,
+            key=self.key,
+            endpoint=self.endpoint,
+            request_hash=self.request_hash,
+            status_code=status_code,
+            response_body=payload,
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            replay = await self.replay(db)
+            if replay is None:
+                raise
+            return replay
+
+        idempotency_cache.put(
+            self.user_id, self.key, StoredResponse(self.request_hash, status_code, payload, time.time())
+        )
+        return None
+
+
+def idempotency(endpoint: str):
+    """Dependency reading the Idempotency-Key header of a create endpoint."""
+    async def dependency(
+        request: Request,
+        principal: Principal = Depends(get_current_principal),
+    ) -> Idempotency:
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+        request_hash = ""
+        if key is not None:
+            digest = hashlib.sha256(endpoint.encode())
+            digest.update(b"\x1f")
+            digest.update(await request.body())
+            request_hash = digest.hexdigest()
+        return Idempotency(principal.id, key, endpoint, request_hash)
+    return dependency
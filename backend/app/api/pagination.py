@@ -0,0 +1,166 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+Cursors are opaque url-safe tokens encoding the sort key of the last row of
+a page. The next page is the rows strictly after it in
+``created_at DESC, id DESC`` order, so every page costs one index range
+scan no matter how deep it is.
+
+Totals ride along with the page as a scalar ``(SELECT count(*) ...)`` column
+instead of a separate round-trip. A ``COUNT(*) OVER ()`` window would make
+SQLite materialize and re-sort every matching row; the uncorrelated
+subquery runs once on its own index and the page keeps its index order.
+Clients that only need to know whether another page exists can skip
+counting altogether with ``include_total=false``.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import engine
+
+
+def _encode_token(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_token(token: str) -> list:
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    return _encode_token([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, row_id = _decode_token(cursor)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_sync_token(change_seq: int, row_id: str) -> str:
+    """Delta-sync position: the change sequence and id of the last row sent."""
+    return _encode_token([change_seq, row_id])
+
+
+def decode_sync_token(token: str) -> Tuple[int, str]:
+    try:
+        change_seq, row_id = _decode_token(token)
+        return int(change_seq), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+def _bind_created_at(value: datetime) -> Any:
+    """
+    SQLite stores server-default timestamps as 'YYYY-MM-DD HH:MM:SS' text,
+    while bound datetimes always carry microseconds; compare like with like.
+    """
+    if engine.dialect.name != "sqlite":
+        return value
+    text = value.strftime("%Y-%m-%d %H:%M:%S")
+    if value.microsecond:
+        text += f".{value.microsecond:06d}"
+    return literal(text, String)
+
+
+def order_newest_first(query, model):
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def after_cursor(query, model, cursor: str):
+    """Restrict an ordered query to rows after the cursor."""
+    created_at, row_id = decode_cursor(cursor)
+    bound = _bind_created_at(created_at)
+    return query.where(
+        or_(
+            model.created_at < bound,
+            and_(model.created_at == bound, model.id < row_id),
+        )
+    )
+
+
+def paginate(query, model, cursor: Optional[str], page: int, page_size: int):
+    """
+    Order newest first and select one page, keyset when a cursor is given
+    and offset otherwise. One extra row is fetched to detect a next page.
+    """
+    query = order_newest_first(query, model)
+    if cursor:
+        query = after_cursor(query, model, cursor)
+    else:
+        query = query.offset((page - 1) * page_size)
+    return query.limit(page_size + 1)
+
+
+def split_page(rows: Sequence, page_size: int) -> Tuple[List, Optional[str]]:
+    """Drop the look-ahead row and build the cursor for the next page."""
+    items = list(rows[:page_size])
+    if len(rows) <= page_size or not items:
+        return items, None
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
+
+
+class Page(NamedTuple):
+    items: List
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query,
+    count_query,
+    model,
+    cursor: Optional[str],
+    page: int,
+    page_size: int,
+    include_total: bool = True,
+) -> Page:
+    """
+    Load one page with a single statement.
+
+    ``query`` selects either ``model`` itself or named columns including
+    its created_at and id.
+
+    Offset pages carry ``count_query`` as a scalar subquery column. It only
+    runs on its own when a total is wanted but the page cannot carry it:
+    cursor pages and offsets past the end.
+    """
+    statement = paginate(query, model, cursor, page, page_size)
+    # Column projections come back as rows, entity queries as objects
+    entity = len(query.column_descriptions) == 1
+    total = None
+
+    if include_total and not cursor:
+        result = await db.execute(statement.add_columns(count_query.scalar_subquery().label("total_count")))
+        rows = result.all()
+        models = [row[0] for row in rows] if entity else rows
+        if rows:
+            total = rows[0].total_count
+        elif page == 1:
+            total = 0
+    else:
+        result = await db.execute(statement)
+        models = result.scalars().all() if entity else result.all()
+
+    if include_total and total is None:
+        total_result = await db.execute(count_query)
+        total = total_result.scalar()
+
+    items, next_cursor = split_page(models, page_size)
+    return Page(items=items, total=total, next_cursor=next_cursor)
@@ -0,0 +1,48 @@
+"""
+Fast JSON rendering for list endpoints.
+
+``FastJSONResponse`` encodes with pydantic-core, which handles Decimal,
+datetime and enums natively and in the same format as the response
+models, so it needs no ``jsonable_encoder`` pass.
+
+List endpoints select the columns of their item schema (``columns_for``)
+and hand the rows to ``row_items``: no ORM instances are built and no
+per-item model validation runs. The column list is derived from the schema,
+so the two cannot drift apart.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def columns_for(model, schema: Type[BaseModel], **columns) -> List:
+    """The model's column for every field of ``schema``, in field order; ``columns`` overrides by field."""
+    return [
+        columns[name].label(name) if name in columns else getattr(model, name)
+        for name in schema.model_fields
+    ]
+
+
+def row_items(rows: Sequence, schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Rows selected with ``columns_for`` as item dicts; trailing extra columns are dropped."""
+    fields = tuple(schema.model_fields)
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def json_response(content: Dict[str, Any], response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Render ``content`` directly, skipping response model validation.
+
+    Headers already set on the injected ``response`` (such as an ETag) are
+    carried over, since FastAPI only merges them into responses it builds.
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
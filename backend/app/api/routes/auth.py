@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from datetime import timedelta
-import uuid
 
 from app.db.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import (
+    verify_password_async,
+    get_password_hash_async,
+    needs_rehash,
+    create_access_token,
+)
 from app.core.config import settings
+from app.core.ids import new_id
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token, UserLogin
 from app.api.deps import get_current_user
@@ -36,10 +41,10 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
 
     # Create user
     user = User(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
         role=user_data.role,
     )
 
@@ -55,10 +60,16 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(User).where(User.username == form_data.username))
-    user = result.scalar_one_or_none()
+    result = await db.execute(
+        select(User.id, User.username, User.role, User.is_active, User.hashed_password)
+        .where(User.username == form_data.username)
+    )
+    user = result.one_or_none()
+    # Hand the connection back to the pool while bcrypt runs: the hash pool
+    # queues far more logins than the DB pool has connections
+    await db.rollback()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -71,6 +82,18 @@ async def login(
             detail="Inactive user"
         )
 
+    # Upgrade hashes made with an old cost factor while we have the plaintext
+    if needs_rehash(user.hashed_password):
+        new_hash = await get_password_hash_async(form_data.password)
+        # Unless the password changed meanwhile
+        await db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .where(User.hashed_password == user.hashed_password)
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
+
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
         data={"sub": user.id, "username": user.username, "role": user.role.value},
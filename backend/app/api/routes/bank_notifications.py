@@ -1,163 +1,343 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import Optional
-import uuid
-import re
+from sqlalchemy import select, func, insert, and_, or_
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional
 
 from app.db.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import User, UserRole
+from app.api.deps import get_current_principal, require_roles
+from app.api.idempotency import Idempotency, idempotency
+from app.api.conditional import not_modified
+from app.api.pagination import fetch_page, encode_sync_token, decode_sync_token
+from app.api.responses import columns_for, json_response, row_items
+from app.core.ids import new_id
+from app.core.principal_cache import Principal
+from app.models.user import UserRole
 from app.models.bank_notification import BankNotification
+from app.services.bank_parser import parse_bank_notification
+from app.services.devices import device_registry
+from app.services.dedup import notification_fingerprint, recent_notifications
+from app.services.matching import transaction_matcher
+from app.services.events import event_hub, bank_notification_event
+from app.services.versions import BANK_NOTIFICATIONS, get_version, next_version
 from app.schemas.bank_notification import (
     BankNotificationCreate,
+    BankNotificationBatchCreate,
+    BankNotificationBatchItemResult,
+    BankNotificationBatchResponse,
     BankNotificationResponse,
     BankNotificationListResponse,
+    BankNotificationChangesResponse,
     DeviceStatusUpdate,
+    DeviceStatusResponse,
 )
 
 router = APIRouter(prefix="/bank-notifications", tags=["bank-notifications"])
 
+BANK_NOTIFICATION_COLUMNS = columns_for(BankNotification, BankNotificationResponse)
 
-def parse_bank_notification(title: str, text: str, app_package: str):
-    """Parse amount and card from bank notification"""
-    amount = None
-    card_last4 = None
-    operation_type = None
-
-    full_text = title + ' ' + text
-
-    amount_patterns = [
-        r'(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)\s*[₽руб\u20bd]',
-        r'(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)\s*(?:RUB|rub)',
-        r'[Сс]умма[:\s]+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
-        r'на сумму\s+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
-        r'[Пп]еревод[:\s]+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
-        r'[Зз]ачисление[:\s]+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
-        r'(\d+(?:[.,]\d{2})?)\s*р\.?(?:\s|$)',
-        r'(\d+(?:[.,]\d{2})?)\s*рублей'
-    ]
-
-    for pattern in amount_patterns:
-        match = re.search(pattern, full_text, re.IGNORECASE)
-        if match:
-            amount_str = match.group(1).replace(' ', '').replace('\u00a0', '').replace(',', '.')
-            try:
-                amount = float(amount_str)
-                if amount > 0:
-                    break
-            except ValueError:
-                pass
-
-    card_patterns = [
-        r'\*{1,4}(\d{4})',
-        r'карт[аы]?\s*\*?(\d{4})',
-        r'(\d{4})\s*\*{4}',
-        r'[Кк]арта[:\s]+\S*(\d{4})'
-    ]
-
-    for pattern in card_patterns:
-        match = re.search(pattern, full_text, re.IGNORECASE)
-        if match:
-            card_last4 = match.group(1)
-            break
-
-    credit_keywords = ['зачисление', 'пополнение', 'получен', 'входящий', 'поступление', 'перевод от', 'вам перевели']
-    debit_keywords = ['списание', 'покупка', 'оплата', 'перевод', 'снятие', 'оплачен', 'платеж']
-
-    text_lower = full_text.lower()
-
-    if any(keyword in text_lower for keyword in credit_keywords):
-        operation_type = 'credit'
-    elif any(keyword in text_lower for keyword in debit_keywords):
-        operation_type = 'debit'
-
-    return amount, card_last4, operation_type
+
+def build_notification_values(notification_data: BankNotificationCreate, user_id: str) -> dict:
+    """Parse a notification and build the column values for its row"""
+    amount, card_last4, operation_type = parse_bank_notification(
+        notification_data.notification_title,
+        notification_data.notification_text,
+        notification_data.app_package
+    )
+
+    return {
+        "id": new_id(),
+        "user_id": user_id,
+        "app_package": notification_data.app_package,
+        "app_name": notification_data.app_name,
+        "notification_title": notification_data.notification_title,
+        "notification_text": notification_data.notification_text,
+        "posted_time": notification_data.posted_time,
+        "amount": amount,
+        "card_last4": card_last4,
+        "operation_type": operation_type,
+        "raw_data": notification_data.raw_data,
+        "is_processed": False,
+        "fingerprint": notification_fingerprint(
+            user_id,
+            notification_data.app_package,
+            notification_data.notification_title,
+            notification_data.notification_text,
+            notification_data.posted_time,
+        ),
+    }
+
+
+async def find_by_fingerprints(db: AsyncSession, fingerprints: List[str]) -> Dict[str, str]:
+    """Map already stored fingerprints to the ids of their rows"""
+    if not fingerprints:
+        return {}
+    result = await db.execute(
+        select(BankNotification.fingerprint, BankNotification.id)
+        .where(BankNotification.fingerprint.in_(fingerprints))
+    )
+    return dict(result.all())
 
 
 @router.post("", response_model=BankNotificationResponse, status_code=201)
 async def create_bank_notification(
     notification_data: BankNotificationCreate,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    idempotency_key: Idempotency = Depends(idempotency("bank_notifications.create")),
     db: AsyncSession = Depends(get_db)
 ):
+    """Store a notification; a re-delivered copy returns the original row with 200"""
 
     if current_user.role != UserRole.TRADER:
         raise HTTPException(status_code=403, detail="Only traders can send notifications")
 
-    amount, card_last4, operation_type = parse_bank_notification(
-        notification_data.notification_title,
-        notification_data.notification_text,
-        notification_data.app_package
-    )
+    replay = await idempotency_key.replay(db)
+    if replay is not None:
+        return replay
 
-    notification = BankNotification(
-        id=str(uuid.uuid4()),
-        user_id=current_user.id,
-        app_package=notification_data.app_package,
-        app_name=notification_data.app_name,
-        notification_title=notification_data.notification_title,
-        notification_text=notification_data.notification_text,
-        posted_time=notification_data.posted_time,
-        amount=amount,
-        card_last4=card_last4,
-        operation_type=operation_type,
-        raw_data=notification_data.raw_data,
-        is_processed=False,
-    )
+    values = build_notification_values(notification_data, current_user.id)
+    fingerprint = values["fingerprint"]
+
+    original_id = recent_notifications.get(fingerprint)
+    if original_id is None:
+        matched = await transaction_matcher.match(
+            db, current_user.id, values["amount"], values["card_last4"], values["operation_type"]
+        )
+        values["is_processed"] = matched is not None
+
+        notification = BankNotification(**values)
+        db.add(notification)
+        try:
+            # Flush first: a fingerprint conflict surfaces here, before the key is stored
+            await db.flush()
+        except IntegrityError:
+            await db.rollback()
+            if matched is not None:
+                transaction_matcher.release(matched)
+            original_id = (await find_by_fingerprints(db, [fingerprint])).get(fingerprint)
+            if original_id is None:
+                raise
+        else:
+            replay = await idempotency_key.commit(db, BankNotificationResponse.model_validate(notification), 201)
+            if replay is not None:
+                if matched is not None:
+                    transaction_matcher.release(matched)
+                return replay
+            recent_notifications.put(fingerprint, notification.id)
+            return notification
+
+    result = await db.execute(select(BankNotification).where(BankNotification.id == original_id))
+    original = result.scalar_one_or_none()
+    if original is None:
+        # Cached row is gone - forget it and store this copy afresh
+        recent_notifications.discard(fingerprint)
+        return await create_bank_notification(notification_data, response, current_user, idempotency_key, db)
+
+    recent_notifications.put(fingerprint, original.id)
+    response.status_code = 200
+    return original
+
+
+@router.post("/batch", response_model=BankNotificationBatchResponse, status_code=201)
+async def create_bank_notifications_batch(
+    batch_data: BankNotificationBatchCreate,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Store a replayed backlog with one multi-row INSERT in one transaction"""
+
+    if current_user.role != UserRole.TRADER:
+        raise HTTPException(status_code=403, detail="Only traders can send notifications")
+
+    rows = [build_notification_values(item, current_user.id) for item in batch_data.items]
+
+    # Resolve duplicates from the LRU first, then with one indexed lookup
+    known = {}
+    for row in rows:
+        original_id = recent_notifications.get(row["fingerprint"])
+        if original_id is not None:
+            known[row["fingerprint"]] = original_id
+    known.update(await find_by_fingerprints(
+        db, [row["fingerprint"] for row in rows if row["fingerprint"] not in known]
+    ))
+
+    statuses = []
+    new_rows = []
+    for row in rows:
+        fingerprint = row["fingerprint"]
+        if fingerprint in known:
+            row["id"] = known[fingerprint]
+            statuses.append("duplicate")
+        else:
+            # Repeats inside the same batch point at the first copy
+            known[fingerprint] = row["id"]
+            new_rows.append(row)
+            statuses.append("created")
+
+    if new_rows:
+        entries = await transaction_matcher.match_many(
+            db, current_user.id, [(row["amount"], row["card_last4"], row["operation_type"]) for row in new_rows]
+        )
+        matched = []
+        for row, entry in zip(new_rows, entries):
+            if entry is not None:
+                row["is_processed"] = True
+                matched.append(entry)
 
-    db.add(notification)
-    await db.commit()
-    await db.refresh(notification)
+        # The whole batch shares one change sequence (and bumps the list version)
+        change_seq = await next_version(db, current_user.id, BANK_NOTIFICATIONS)
+        for row in new_rows:
+            row["change_seq"] = change_seq
 
-    return notification
+        try:
+            result = await db.scalars(insert(BankNotification).returning(BankNotification), new_rows)
+            stored = result.all()
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request stored some of them first - let the device retry
+            await db.rollback()
+            for entry in matched:
+                transaction_matcher.release(entry)
+            raise HTTPException(status_code=409, detail="Concurrent duplicate notifications, retry the batch")
+
+        # Bulk inserts bypass the session hooks, so push them here
+        for notification in stored:
+            event_hub.publish(*bank_notification_event(notification))
+
+    for row in rows:
+        recent_notifications.put(row["fingerprint"], row["id"])
+
+    return BankNotificationBatchResponse(
+        items=[
+            BankNotificationBatchItemResult(
+                index=index,
+                id=row["id"],
+                status=status,
+                amount=row["amount"],
+                card_last4=row["card_last4"],
+                operation_type=row["operation_type"],
+                matched=status == "created" and row["is_processed"],
+            )
+            for index, (row, status) in enumerate(zip(rows, statuses))
+        ],
+        accepted=len(new_rows),
+    )
 
 
 @router.get("", response_model=BankNotificationListResponse)
 async def get_bank_notifications(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
 
+    sync_token = None
     if current_user.role == UserRole.TRADER:
-        query = select(BankNotification).where(BankNotification.user_id == current_user.id)
+        version = await get_version(db, current_user.id, BANK_NOTIFICATIONS)
+        cached = await not_modified(request, response, db, current_user.id, BANK_NOTIFICATIONS, version)
+        if cached is not None:
+            return cached
+        # Every row stamped up to this version is visible to the page query,
+        # so a device can list the newest page and delta-sync from here.
+        # "~" sorts after every id, so rows of this very stamp are not replayed.
+        sync_token = encode_sync_token(version, "~")
+        query = select(*BANK_NOTIFICATION_COLUMNS).where(BankNotification.user_id == current_user.id)
         count_query = select(func.count()).select_from(BankNotification).where(
             BankNotification.user_id == current_user.id
         )
     else:
-        query = select(BankNotification)
+        query = select(*BANK_NOTIFICATION_COLUMNS)
         count_query = select(func.count()).select_from(BankNotification)
 
-    # Get total count
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    page_result = await fetch_page(
+        db, query, count_query, BankNotification, cursor, page, page_size, include_total
+    )
+
+    return json_response({
+        "items": row_items(page_result.items, BankNotificationResponse),
+        "total": page_result.total,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": page_result.next_cursor,
+        "has_more": page_result.has_more,
+        "sync_token": sync_token,
+    }, response)
+
 
-    query = query.order_by(BankNotification.created_at.desc())
-    query = query.offset((page - 1) * page_size).limit(page_size)
+@router.get("/changes", response_model=BankNotificationChangesResponse)
+async def get_bank_notification_changes(
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delta sync for the device: rows inserted or updated after the ``since``
+    token in change order. Without a token the whole history is replayed,
+    ``limit`` rows at a time; keep syncing while ``has_more`` is set. A
+    device that only shows recent history starts from the ``sync_token``
+    of the newest list page instead.
+    """
+
+    if current_user.role != UserRole.TRADER:
+        raise HTTPException(status_code=403, detail="Only traders can sync notifications")
+
+    query = select(BankNotification).where(BankNotification.user_id == current_user.id)
+    if since:
+        change_seq, row_id = decode_sync_token(since)
+        query = query.where(
+            or_(
+                BankNotification.change_seq > change_seq,
+                and_(BankNotification.change_seq == change_seq, BankNotification.id > row_id),
+            )
+        )
+    else:
+        change_seq, row_id = 0, ""
 
-    result = await db.execute(query)
-    notifications = result.scalars().all()
+    result = await db.execute(
+        query.order_by(BankNotification.change_seq, BankNotification.id).limit(limit + 1)
+    )
+    rows = result.scalars().all()
+    items = rows[:limit]
+    if items:
+        change_seq, row_id = items[-1].change_seq, items[-1].id
 
-    return BankNotificationListResponse(
-        items=notifications,
-        total=total,
-        page=page,
-        page_size=page_size,
+    return BankNotificationChangesResponse(
+        items=items,
+        next_token=encode_sync_token(change_seq, row_id),
+        has_more=len(rows) > limit,
     )
 
 
 @router.post("/device-status")
 async def update_device_status(
     status_data: DeviceStatusUpdate,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    """Update device working status"""
+    """Heartbeat: update device working status in memory, stored later by write-behind"""
+
+    device_registry.heartbeat(current_user.id, current_user.team_id, status_data)
 
     return {
         "status": "ok",
         "user_id": current_user.id,
         "is_working": status_data.is_working
     }
+
+
+@router.get("/device-status/problems", response_model=List[DeviceStatusResponse])
+async def get_problem_devices(
+    current_user: Principal = Depends(require_roles(UserRole.OWNER, UserRole.SUPPORT, UserRole.TEAMLEAD))
+):
+    """Devices that missed their heartbeat or report they are not working, longest silent first"""
+
+    devices = device_registry.problems()
+    if current_user.role == UserRole.TEAMLEAD:
+        devices = [device for device in devices if device.team_id == current_user.team_id]
+    return devices
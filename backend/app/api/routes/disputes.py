@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import joinedload
 from typing import Optional
 from datetime import datetime, timedelta
-import uuid
 
 from app.db.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.deps import get_current_principal
+from app.api.idempotency import Idempotency, idempotency
+from app.api.pagination import fetch_page
+from app.api.responses import columns_for, json_response, row_items
+from app.core.config import settings
+from app.core.ids import new_id
+from app.core.principal_cache import Principal
 from app.models.dispute import Dispute, DisputeStatus
 from app.models.transaction import Transaction, TransactionStatus
+from app.services.disputes import deadline_scheduler, set_status
 from app.schemas.dispute import (
     DisputeCreate,
     DisputeUpdate,
@@ -21,68 +25,70 @@ from app.schemas.dispute import (
 router = APIRouter(prefix="/disputes", tags=["disputes"])
 
 
+# Dispute columns plus the few transaction columns a DisputeResponse shows,
+# so neither listing nor single responses materialize ORM objects
+DISPUTE_COLUMNS = columns_for(
+    Dispute,
+    DisputeResponse,
+    order_id=Transaction.order_id,
+    method=Transaction.method,
+    bank_name=Transaction.bank_name,
+    card_last4=Transaction.card_last4,
+    direction=Transaction.direction,
+)
+
+
+def dispute_projection():
+    return select(*DISPUTE_COLUMNS).join(Transaction, Transaction.id == Dispute.transaction_id)
+
+
+async def get_dispute_response(db: AsyncSession, dispute_id: str) -> DisputeResponse:
+    result = await db.execute(dispute_projection().where(Dispute.id == dispute_id))
+    return DisputeResponse.model_validate(result.one())
+
+
 @router.get("", response_model=DisputeListResponse)
 async def get_disputes(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     status: Optional[DisputeStatus] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    query = (
-        select(Dispute)
-        .options(joinedload(Dispute.transaction))
-        .where(Dispute.trader_id == current_user.id)
-    )
-    count_query = (
-        select(func.count())
-        .select_from(Dispute)
-        .where(Dispute.trader_id == current_user.id)
-    )
+    query = dispute_projection().where(Dispute.trader_id == current_user.id)
+    count_query = select(func.count()).select_from(Dispute).where(Dispute.trader_id == current_user.id)
 
     if status:
         query = query.where(Dispute.status == status)
         count_query = count_query.where(Dispute.status == status)
 
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    query = query.order_by(Dispute.created_at.desc())
-    result = await db.execute(query)
-    disputes = result.scalars().unique().all()
-
-    # Map disputes with transaction info
-    dispute_responses = []
-    for dispute in disputes:
-        tx = dispute.transaction
-        dispute_responses.append(DisputeResponse(
-            id=dispute.id,
-            transaction_id=dispute.transaction_id,
-            trader_id=dispute.trader_id,
-            order_id=tx.order_id if tx else "",
-            amount=dispute.amount,
-            amount_usdt=dispute.amount_usdt,
-            status=dispute.status,
-            reason=dispute.reason,
-            description=dispute.description,
-            client_message=dispute.client_message,
-            trader_response=dispute.trader_response,
-            method=tx.method if tx else None,
-            bank_name=tx.bank_name if tx else None,
-            card_last4=tx.card_last4 if tx else None,
-            direction=tx.direction if tx else None,
-            created_at=dispute.created_at,
-            deadline_at=dispute.deadline_at,
-            resolved_at=dispute.resolved_at,
-        ))
-
-    return DisputeListResponse(items=dispute_responses, total=total)
+    page_result = await fetch_page(
+        db, query, count_query, Dispute, cursor, page, page_size, include_total
+    )
+
+    return json_response({
+        "items": row_items(page_result.items, DisputeResponse),
+        "total": page_result.total,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": page_result.next_cursor,
+        "has_more": page_result.has_more,
+    })
 
 
 @router.post("", response_model=DisputeResponse, status_code=201)
 async def create_dispute(
     dispute_data: DisputeCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
+    idempotency_key: Idempotency = Depends(idempotency("disputes.create")),
     db: AsyncSession = Depends(get_db)
 ):
+    replay = await idempotency_key.replay(db)
+    if replay is not None:
+        return replay
+
     # Check transaction exists
     result = await db.execute(
         select(Transaction)
@@ -102,7 +108,7 @@ async def create_dispute(
         raise HTTPException(status_code=400, detail="Dispute already exists for this transaction")
 
     dispute = Dispute(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         transaction_id=dispute_data.transaction_id,
         trader_id=current_user.id,
         amount=transaction.amount,
@@ -110,48 +116,35 @@ async def create_dispute(
         reason=dispute_data.reason,
         description=dispute_data.description,
         client_message=dispute_data.client_message,
-        deadline_at=datetime.utcnow() + timedelta(hours=1),
+        deadline_at=datetime.utcnow() + timedelta(minutes=settings.dispute_response_minutes),
     )
 
     # Update transaction status
     transaction.status = TransactionStatus.DISPUTED
 
     db.add(dispute)
-    await db.commit()
-    await db.refresh(dispute)
-
-    return DisputeResponse(
-        id=dispute.id,
-        transaction_id=dispute.transaction_id,
-        trader_id=dispute.trader_id,
-        order_id=transaction.order_id,
-        amount=dispute.amount,
-        amount_usdt=dispute.amount_usdt,
-        status=dispute.status,
-        reason=dispute.reason,
-        description=dispute.description,
-        client_message=dispute.client_message,
-        trader_response=dispute.trader_response,
-        method=transaction.method,
-        bank_name=transaction.bank_name,
-        card_last4=transaction.card_last4,
-        direction=transaction.direction,
-        created_at=dispute.created_at,
-        deadline_at=dispute.deadline_at,
-        resolved_at=dispute.resolved_at,
-    )
+    await db.flush()
+
+    response = await get_dispute_response(db, dispute.id)
+
+    replay = await idempotency_key.commit(db, response, 201)
+    if replay is not None:
+        return replay
+
+    deadline_scheduler.schedule(dispute.id, dispute.deadline_at)
+
+    return response
 
 
 @router.patch("/{dispute_id}", response_model=DisputeResponse)
 async def update_dispute(
     dispute_id: str,
     update_data: DisputeUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
         select(Dispute)
-        .options(joinedload(Dispute.transaction))
         .where(Dispute.id == dispute_id)
         .where(Dispute.trader_id == current_user.id)
     )
@@ -164,31 +157,13 @@ async def update_dispute(
         dispute.trader_response = update_data.trader_response
 
     if update_data.status:
-        dispute.status = update_data.status
-        if update_data.status in [DisputeStatus.RESOLVED, DisputeStatus.WON, DisputeStatus.LOST]:
-            dispute.resolved_at = datetime.utcnow()
+        set_status(dispute, update_data.status)
 
     await db.commit()
-    await db.refresh(dispute)
-
-    tx = dispute.transaction
-    return DisputeResponse(
-        id=dispute.id,
-        transaction_id=dispute.transaction_id,
-        trader_id=dispute.trader_id,
-        order_id=tx.order_id if tx else "",
-        amount=dispute.amount,
-        amount_usdt=dispute.amount_usdt,
-        status=dispute.status,
-        reason=dispute.reason,
-        description=dispute.description,
-        client_message=dispute.client_message,
-        trader_response=dispute.trader_response,
-        method=tx.method if tx else None,
-        bank_name=tx.bank_name if tx else None,
-        card_last4=tx.card_last4 if tx else None,
-        direction=tx.direction if tx else None,
-        created_at=dispute.created_at,
-        deadline_at=dispute.deadline_at,
-        resolved_at=dispute.resolved_at,
-    )
+
+    if dispute.status == DisputeStatus.OPEN and dispute.deadline_at is not None:
+        deadline_scheduler.schedule(dispute.id, dispute.deadline_at)
+    else:
+        deadline_scheduler.cancel(dispute.id)
+
+    return await get_dispute_response(db, dispute.id)
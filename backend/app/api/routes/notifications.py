@@ -1,47 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
+import asyncio
+import json
 
 from app.db.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.conditional import not_modified
+from app.api.deps import authenticate_stream_token, get_current_principal, get_stream_principal, get_stream_token
+from app.api.responses import columns_for, json_response, row_items
+from app.core.principal_cache import Principal
 from app.models.notification import Notification
 from app.schemas.notification import NotificationResponse, NotificationListResponse
+from app.services.events import event_hub
+from app.services.versions import NOTIFICATIONS, bump_versions
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+STREAM_KEEPALIVE_SECONDS = 15
+
+NOTIFICATION_COLUMNS = columns_for(Notification, NotificationResponse)
+
 
 @router.get("", response_model=NotificationListResponse)
 async def get_notifications(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(Notification)
-        .where(Notification.user_id == current_user.id)
-        .order_by(Notification.created_at.desc())
-        .limit(50)
-    )
-    notifications = result.scalars().all()
+    cached = await not_modified(request, response, db, current_user.id, NOTIFICATIONS)
+    if cached is not None:
+        return cached
 
-    unread_result = await db.execute(
+    # Unread count over all of the user's notifications, computed in the same statement.
+    # A scalar subquery rather than a window, so the page keeps its index order.
+    unread = (
         select(func.count())
         .select_from(Notification)
         .where(Notification.user_id == current_user.id)
         .where(Notification.is_read == False)
+        .scalar_subquery()
     )
-    unread_count = unread_result.scalar()
+    result = await db.execute(
+        select(*NOTIFICATION_COLUMNS, unread.label("unread_count"))
+        .where(Notification.user_id == current_user.id)
+        .order_by(Notification.created_at.desc())
+        .limit(50)
+    )
+    rows = result.all()
+    unread_count = rows[0].unread_count if rows else 0
+
+    return json_response({
+        "items": row_items(rows, NotificationResponse),
+        "unread_count": unread_count,
+    }, response)
+
 
-    return NotificationListResponse(
-        items=notifications,
-        unread_count=unread_count
+@router.get("/stream")
+async def stream_notifications(
+    current_user: Principal = Depends(get_stream_principal),
+    token: str = Depends(get_stream_token),
+):
+    """
+    Server-Sent Events with notifications and bank notifications as they are
+    stored. Every keepalive checks the token again, from the principal cache
+    unless the user changed, and ends the stream of a deactivated user.
+    """
+
+    async def event_stream():
+        with event_hub.subscribe(current_user.id) as queue:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event_type, data = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    try:
+                        await authenticate_stream_token(token)
+                    except HTTPException:
+                        return
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.post("/{notification_id}/read")
 async def mark_as_read(
     notification_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
@@ -62,15 +115,17 @@ async def mark_as_read(
 
 @router.post("/read-all")
 async def mark_all_as_read(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    await db.execute(
+    result = await db.execute(
         update(Notification)
         .where(Notification.user_id == current_user.id)
         .where(Notification.is_read == False)
         .values(is_read=True)
     )
+    if result.rowcount:
+        await bump_versions(db, current_user.id, NOTIFICATIONS)
     await db.commit()
 
     return {"status": "ok"}
@@ -1,23 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
-import uuid
 
 from app.db.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.conditional import not_modified
+from app.api.deps import get_current_principal
+from app.core.ids import new_id
+from app.core.principal_cache import Principal
 from app.models.requisite import Requisite
 from app.schemas.requisite import RequisiteCreate, RequisiteUpdate, RequisiteResponse
+from app.services.requisite_routing import requisite_router
+from app.services.versions import REQUISITES
 
 router = APIRouter(prefix="/requisites", tags=["requisites"])
 
 
 @router.get("", response_model=List[RequisiteResponse])
 async def get_requisites(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
+    cached = await not_modified(request, response, db, current_user.id, REQUISITES)
+    if cached is not None:
+        return cached
+
     result = await db.execute(
         select(Requisite)
         .where(Requisite.owner_id == current_user.id)
@@ -29,11 +38,11 @@ async def get_requisites(
 @router.post("", response_model=RequisiteResponse, status_code=status.HTTP_201_CREATED)
 async def create_requisite(
     requisite_data: RequisiteCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     requisite = Requisite(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         owner_id=current_user.id,
         type=requisite_data.type,
         bank_name=requisite_data.bank_name,
@@ -50,13 +59,15 @@ async def create_requisite(
     await db.commit()
     await db.refresh(requisite)
 
+    requisite_router.add(requisite)
+
     return requisite
 
 
 @router.get("/{requisite_id}", response_model=RequisiteResponse)
 async def get_requisite(
     requisite_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
@@ -76,7 +87,7 @@ async def get_requisite(
 async def update_requisite(
     requisite_id: str,
     update_data: RequisiteUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
@@ -96,13 +107,15 @@ async def update_requisite(
     await db.commit()
     await db.refresh(requisite)
 
+    requisite_router.add(requisite)
+
     return requisite
 
 
 @router.delete("/{requisite_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_requisite(
     requisite_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
@@ -117,3 +130,5 @@ async def delete_requisite(
 
     await db.delete(requisite)
     await db.commit()
+
+    requisite_router.discard(requisite_id)
@@ -2,12 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import Optional
-import uuid
 
 from app.db.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.deps import get_current_principal
+from app.api.idempotency import Idempotency, idempotency
+from app.api.pagination import fetch_page
+from app.api.responses import columns_for, json_response, row_items
+from app.core.ids import new_id, new_order_id
+from app.core.principal_cache import Principal
 from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.services.matching import OPEN_STATUSES, transaction_matcher
+from app.services.requisite_routing import card_last4, requisite_router
 from app.schemas.transaction import (
     TransactionCreate,
     TransactionUpdate,
@@ -17,22 +22,21 @@ from app.schemas.transaction import (
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
-
-def generate_order_id() -> str:
-    import random
-    return f"ORD-{random.randint(10000, 99999)}"
+TRANSACTION_COLUMNS = columns_for(Transaction, TransactionResponse)
 
 
 @router.get("", response_model=TransactionListResponse)
 async def get_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     type: Optional[TransactionType] = None,
     status: Optional[TransactionStatus] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Transaction).where(Transaction.trader_id == current_user.id)
+    query = select(*TRANSACTION_COLUMNS).where(Transaction.trader_id == current_user.id)
     count_query = select(func.count()).select_from(Transaction).where(Transaction.trader_id == current_user.id)
 
     if type:
@@ -43,55 +47,79 @@ async def get_transactions(
         query = query.where(Transaction.status == status)
         count_query = count_query.where(Transaction.status == status)
 
-    # Get total count
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    # Get paginated results
-    query = query.order_by(Transaction.created_at.desc())
-    query = query.offset((page - 1) * page_size).limit(page_size)
-
-    result = await db.execute(query)
-    transactions = result.scalars().all()
-
-    return TransactionListResponse(
-        items=transactions,
-        total=total,
-        page=page,
-        page_size=page_size,
+    page_result = await fetch_page(
+        db, query, count_query, Transaction, cursor, page, page_size, include_total
     )
 
+    return json_response({
+        "items": row_items(page_result.items, TransactionResponse),
+        "total": page_result.total,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": page_result.next_cursor,
+        "has_more": page_result.has_more,
+    })
+
 
 @router.post("", response_model=TransactionResponse, status_code=201)
 async def create_transaction(
     transaction_data: TransactionCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
+    idempotency_key: Idempotency = Depends(idempotency("transactions.create")),
     db: AsyncSession = Depends(get_db)
 ):
+    replay = await idempotency_key.replay(db)
+    if replay is not None:
+        return replay
+
+    requisite = None
+    if transaction_data.type == TransactionType.PAYIN:
+        # Payins reserve requisite limit: the given requisite, or the best free one
+        if transaction_data.requisite_id is not None:
+            requisite = await requisite_router.reserve(
+                db, transaction_data.requisite_id, current_user.id, transaction_data.amount
+            )
+            if requisite is None:
+                raise HTTPException(status_code=409, detail="Requisite is unavailable or its limit is exceeded")
+        else:
+            requisite = await requisite_router.route(
+                db, current_user.id, transaction_data.method.value, transaction_data.amount
+            )
+            if requisite is None:
+                raise HTTPException(status_code=409, detail="No requisite available for this payment")
+
     transaction = Transaction(
-        id=str(uuid.uuid4()),
-        order_id=generate_order_id(),
+        id=new_id(),
+        order_id=new_order_id(),
         trader_id=current_user.id,
         type=transaction_data.type,
         amount=transaction_data.amount,
         amount_usdt=transaction_data.amount_usdt,
         method=transaction_data.method,
-        requisite_id=transaction_data.requisite_id,
+        requisite_id=requisite.id if requisite is not None else transaction_data.requisite_id,
+        card_last4=card_last4(requisite.card_number) if requisite is not None else None,
+        bank_name=requisite.bank_name if requisite is not None else None,
         client_id=transaction_data.client_id,
         direction=transaction_data.direction,
     )
 
     db.add(transaction)
-    await db.commit()
+    await db.flush()
     await db.refresh(transaction)
 
+    replay = await idempotency_key.commit(db, TransactionResponse.model_validate(transaction), 201)
+    if replay is not None:
+        return replay
+
+    transaction_matcher.add(transaction)
+
     return transaction
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
@@ -111,7 +139,7 @@ async def get_transaction(
 async def update_transaction(
     transaction_id: str,
     update_data: TransactionUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
@@ -133,4 +161,7 @@ async def update_transaction(
     await db.commit()
     await db.refresh(transaction)
 
+    if transaction.status not in OPEN_STATUSES:
+        transaction_matcher.discard(transaction.id)
+
     return transaction
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
+from datetime import datetime
 from decimal import Decimal
 
 from app.db.database import get_db
-from app.api.deps import get_current_user
+from app.api.conditional import not_modified
+from app.api.deps import get_current_principal, get_current_user
+from app.core.principal_cache import Principal
+from app.core.timeutil import naive_utc
 from app.models.user import User
-from app.models.transaction import Transaction, TransactionStatus
-from app.schemas.user import UserResponse, UserBalanceResponse
+from app.models.ledger import BalanceSnapshot
+from app.schemas.user import UserResponse, UserBalanceResponse, BalanceAtResponse, TraderStatsResponse
+from app.services.ledger import balance_at
+from app.services.trader_stats import get_stats
+from app.services.versions import BALANCE
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -19,21 +26,83 @@ async def get_me(current_user: User = Depends(get_current_user)):
 
 @router.get("/me/balance", response_model=UserBalanceResponse)
 async def get_my_balance(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    # Calculate total processed
+    cached = await not_modified(request, response, db, principal.id, BALANCE)
+    if cached is not None:
+        return cached
+
+    # users holds the balances withdrawals check; the snapshot only adds the
+    # processed total, so there is no aggregation over transaction history
     result = await db.execute(
-        select(func.sum(Transaction.amount_usdt))
-        .where(Transaction.trader_id == current_user.id)
-        .where(Transaction.status == TransactionStatus.COMPLETED)
+        select(
+            User.working_balance,
+            User.security_deposit,
+            User.security_deposit_required,
+            User.pending_balance,
+            BalanceSnapshot.total_processed,
+        )
+        .outerjoin(BalanceSnapshot, BalanceSnapshot.user_id == User.id)
+        .where(User.id == principal.id)
     )
-    total_processed = result.scalar() or Decimal("0")
+    balance = result.one()
 
     return UserBalanceResponse(
-        available=current_user.working_balance,
-        security_deposit=current_user.security_deposit,
-        security_deposit_required=current_user.security_deposit_required,
-        pending=current_user.pending_balance,
-        total_processed=total_processed,
+        available=balance.working_balance,
+        security_deposit=balance.security_deposit,
+        security_deposit_required=balance.security_deposit_required,
+        pending=balance.pending_balance,
+        total_processed=balance.total_processed or Decimal("0"),
     )
+
+
+@router.get("/me/balance/history", response_model=BalanceAtResponse)
+async def get_my_balance_at(
+    at: datetime = Query(..., description="Point in time, UTC when no offset is given"),
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    at = naive_utc(at)
+
+    entry = await balance_at(db, principal.id, at)
+    if entry is None:
+        return BalanceAtResponse(
+            at=at,
+            available=Decimal("0"),
+            security_deposit=Decimal("0"),
+            pending=Decimal("0"),
+            total_processed=Decimal("0"),
+        )
+
+    return BalanceAtResponse(
+        at=at,
+        available=entry.working_balance,
+        security_deposit=entry.security_deposit,
+        pending=entry.pending_balance,
+        total_processed=entry.total_processed,
+    )
+
+
+@router.get("/me/stats", response_model=TraderStatsResponse)
+async def get_my_stats(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Dashboard counters, read from the materialized trader_stats row"""
+    stats = await get_stats(db, principal.id)
+    if stats is None:
+        return TraderStatsResponse(
+            **{field: 0 for field in TraderStatsResponse.model_fields}
+        )
+
+    response = TraderStatsResponse.model_validate(stats, from_attributes=True)
+    # Period counters belong to the day/month of their last update
+    today = datetime.utcnow().date()
+    if stats.day != today:
+        response.day_count, response.day_volume = 0, Decimal("0")
+    if stats.month != today.replace(day=1):
+        response.month_count, response.month_volume = 0, Decimal("0")
+    return response
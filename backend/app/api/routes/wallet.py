@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-import uuid
+from sqlalchemy import select, func, update
+from typing import Optional
 
 from app.db.database import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_principal
+from app.api.idempotency import Idempotency, idempotency
+from app.api.pagination import fetch_page
+from app.core.ids import new_id
+from app.core.principal_cache import Principal
 from app.models.user import User
 from app.models.wallet import WalletTransaction, WalletTransactionType, WalletTransactionStatus
+from app.models.ledger import LedgerEntryType
+from app.services.ledger import record_movement
+from app.services.versions import BALANCE, bump_versions
 from app.schemas.wallet import (
     WalletTransactionCreate,
     WalletTransactionResponse,
@@ -21,48 +28,89 @@ MOCK_DEPOSIT_ADDRESS = "TJYxNdv3T1QQHrWYPTQJYNqPJqGJLQxnVZ"
 
 
 @router.get("/deposit-address", response_model=DepositAddressResponse)
-async def get_deposit_address(current_user: User = Depends(get_current_user)):
+async def get_deposit_address(current_user: Principal = Depends(get_current_principal)):
     # In production, this would fetch/generate unique address per user
     return DepositAddressResponse(address=MOCK_DEPOSIT_ADDRESS)
 
 
 @router.get("/transactions", response_model=WalletTransactionListResponse)
 async def get_wallet_transactions(
-    current_user: User = Depends(get_current_user),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(WalletTransaction)
+    query = select(WalletTransaction).where(WalletTransaction.user_id == current_user.id)
+    count_query = (
+        select(func.count())
+        .select_from(WalletTransaction)
         .where(WalletTransaction.user_id == current_user.id)
-        .order_by(WalletTransaction.created_at.desc())
     )
-    transactions = result.scalars().all()
+
+    page_result = await fetch_page(
+        db, query, count_query, WalletTransaction, cursor, page, page_size, include_total
+    )
 
     return WalletTransactionListResponse(
-        items=transactions,
-        total=len(transactions)
+        items=page_result.items,
+        total=page_result.total,
+        next_cursor=page_result.next_cursor,
+        has_more=page_result.has_more,
     )
 
 
 @router.post("/withdraw", response_model=WalletTransactionResponse, status_code=201)
 async def request_withdraw(
     withdraw_data: WalletTransactionCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
+    idempotency_key: Idempotency = Depends(idempotency("wallet.withdraw")),
     db: AsyncSession = Depends(get_db)
 ):
+    replay = await idempotency_key.replay(db)
+    if replay is not None:
+        return replay
+
     if withdraw_data.type != WalletTransactionType.WITHDRAW:
         raise HTTPException(status_code=400, detail="Invalid transaction type")
 
     if not withdraw_data.address:
         raise HTTPException(status_code=400, detail="Withdrawal address is required")
 
-    # Check balance
-    if current_user.working_balance < withdraw_data.amount:
+    if withdraw_data.amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+
+    # Check and move the funds in one conditional UPDATE: concurrent withdrawals
+    # serialize on the user's row only, and the one that would overdraw matches nothing
+    result = await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .where(User.working_balance >= withdraw_data.amount)
+        .values(
+            working_balance=User.working_balance - withdraw_data.amount,
+            pending_balance=User.pending_balance + withdraw_data.amount,
+        )
+        .returning(User.working_balance)
+        .execution_options(synchronize_session=False)
+    )
+    if result.first() is None:
         raise HTTPException(status_code=400, detail="Insufficient balance")
+    await bump_versions(db, current_user.id, BALANCE)
+
+    transaction_id = new_id()
+    await record_movement(
+        db,
+        current_user.id,
+        LedgerEntryType.WITHDRAW_REQUESTED,
+        transaction_id,
+        working=-withdraw_data.amount,
+        pending=withdraw_data.amount,
+    )
 
     # Create withdrawal request
     transaction = WalletTransaction(
-        id=str(uuid.uuid4()),
+        id=transaction_id,
         user_id=current_user.id,
         type=WalletTransactionType.WITHDRAW,
         amount=withdraw_data.amount,
@@ -70,12 +118,12 @@ async def request_withdraw(
         status=WalletTransactionStatus.PENDING,
     )
 
-    # Deduct from working balance
-    current_user.working_balance -= withdraw_data.amount
-    current_user.pending_balance += withdraw_data.amount
-
     db.add(transaction)
-    await db.commit()
+    await db.flush()
     await db.refresh(transaction)
 
+    replay = await idempotency_key.commit(db, WalletTransactionResponse.model_validate(transaction), 201)
+    if replay is not None:
+        return replay
+
     return transaction
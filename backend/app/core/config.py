@@ -5,16 +5,61 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # Database (SQLite for development, PostgreSQL for production)
     database_url: str = "sqlite+aiosqlite:///./advancepay.db"
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_echo: bool = False
+    # Statements slower than this are logged with their route; 0 disables
+    slow_query_ms: int = 200
+    # A request running the same statement this many times is logged as a likely N+1; 0 disables
+    query_repeat_threshold: int = 10
+    # Run `alembic upgrade head` on startup instead of only verifying the revision
+    db_auto_migrate: bool = False
+
+    # SQLite tuning, applied to every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 268435456
 
     # JWT
     secret_key: str = "your-super-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: int = 60
+    # How often each worker picks up role/activity changes made by other workers
+    principal_cache_sync_seconds: float = 2.0
+
+    # Password hashing
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
 
     # App
     debug: bool = True
     api_prefix: str = "/api/v1"
 
+    # Bank notifications
+    notification_dedup_cache_size: int = 10000
+    transaction_match_window_minutes: int = 30
+    # Requisites examined per payin before giving up on finding one with enough limit
+    requisite_route_max_probes: int = 32
+
+    # Disputes still OPEN this long after being opened are lost
+    dispute_response_minutes: int = 60
+
+    # Idempotency-Key replay
+    idempotency_cache_size: int = 10000
+    idempotency_key_ttl_hours: int = 24
+
+    # Device heartbeats
+    device_stale_after_seconds: int = 120
+    device_wheel_tick_seconds: int = 5
+    device_status_flush_seconds: int = 30
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,66 @@
+"""
+Time-ordered identifiers (ULID).
+
+A ULID is a 48-bit millisecond timestamp followed by 80 random bits,
+written as 26 Crockford base32 characters, so ids sort by creation time
+both as strings and as index keys. Within one process ids generated in the
+same millisecond increment the random part and stay strictly monotonic;
+across processes and workers the 80 random bits make collisions
+negligible.
+"""
+import os
+import threading
+import time
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+
+class UlidGenerator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._last_ms = -1
+            self._last_random = 0
+
+    def _next(self) -> int:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            elif self._last_random < _RANDOM_MAX:
+                # Same millisecond (or the clock stepped back): keep counting up
+                self._last_random += 1
+            else:
+                self._last_ms += 1
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            return (self._last_ms << _RANDOM_BITS) | self._last_random
+
+    def new(self) -> str:
+        value = self._next()
+        chars = []
+        for _ in range(26):
+            chars.append(_ALPHABET[value & 31])
+            value >>= 5
+        return "".join(reversed(chars))
+
+
+_generator = UlidGenerator()
+
+# A forked worker must not continue the parent's sequence within the same millisecond
+os.register_at_fork(after_in_child=_generator.reset)
+
+
+def new_id() -> str:
+    """Primary key for a new row."""
+    return _generator.new()
+
+
+def new_order_id() -> str:
+    return f"ORD-{_generator.new()}"
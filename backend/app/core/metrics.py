@@ -0,0 +1,218 @@
+"""
+Request and database instrumentation in Prometheus text format.
+
+``MetricsMiddleware`` times every request per (method, route template) and
+counts responses per status code; statements timed by the query inspector
+(``app.core.query_inspector``) are attributed to the request running them
+through a context variable, giving DB time and query count per request.
+
+Histograms keep one pre-allocated list of bucket counters and observing is
+a bisect plus an increment. Everything is updated from the event loop
+thread (statement events run there too, in the greenlet driving the
+connection), so no locks are taken. Metrics are per process.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+RouteKey = Tuple[str, str]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # bisect_left: a value equal to a bound belongs to that bucket (le)
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ("scope", "db_time", "queries", "statements")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.db_time = 0.0
+        self.queries = 0
+        self.statements: Dict[str, int] = {}  # SQL -> executions, kept by the query inspector
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "db_time", "queries")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self.routes: Dict[RouteKey, RouteMetrics] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.in_flight = 0
+        self.query_latency = Histogram(LATENCY_BUCKETS)
+        # name -> (help, type, callable returning the current value), sampled at scrape time
+        self.gauges: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+        # Called with (route key, stats) once a request has finished
+        self.request_hooks: List[Callable[[RouteKey, RequestStats], None]] = []
+
+    def route(self, key: RouteKey) -> RouteMetrics:
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        return metrics
+
+    def observe_request(self, key: RouteKey, status_code: int, elapsed: float, stats: RequestStats) -> None:
+        metrics = self.route(key)
+        metrics.latency.observe(elapsed)
+        metrics.db_time.observe(stats.db_time)
+        metrics.queries.observe(stats.queries)
+        response_key = (key[0], key[1], status_code)
+        self.responses[response_key] = self.responses.get(response_key, 0) + 1
+        for hook in self.request_hooks:
+            hook(key, stats)
+
+    def observe_query(self, elapsed: float) -> None:
+        self.query_latency.observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.db_time += elapsed
+            stats.queries += 1
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float], kind: str = "gauge") -> None:
+        """Expose a value kept elsewhere; ``kind`` is "counter" for ever-growing totals."""
+        self.gauges[name] = (help_text, kind, read)
+
+    def clear(self) -> None:
+        self.routes.clear()
+        self.responses.clear()
+        self.query_latency = Histogram(LATENCY_BUCKETS)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        routes = sorted(self.routes.items())
+
+        def labels(method: str, route: str) -> str:
+            return f'method="{method}",route="{_escape(route)}"'
+
+        for name, help_text, attribute in (
+            ("http_request_duration_seconds", "Request latency by route", "latency"),
+            ("http_request_db_seconds", "Time spent in database statements per request", "db_time"),
+            ("http_request_db_queries", "Database statements executed per request", "queries"),
+        ):
+            _header(lines, name, help_text, "histogram")
+            for (method, route), metrics in routes:
+                _histogram(lines, name, labels(method, route), getattr(metrics, attribute))
+
+        _header(lines, "http_responses_total", "Responses by route and status code", "counter")
+        for (method, route, status_code), count in sorted(self.responses.items()):
+            lines.append(f'http_responses_total{{{labels(method, route)},status="{status_code}"}} {count}')
+
+        _header(lines, "http_requests_in_flight", "Requests being processed", "gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        _header(lines, "db_query_duration_seconds", "Database statement latency", "histogram")
+        _histogram(lines, "db_query_duration_seconds", "", self.query_latency)
+
+        for name, (help_text, kind, read) in sorted(self.gauges.items()):
+            _header(lines, name, help_text, kind)
+            lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _header(lines: List[str], name: str, help_text: str, kind: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines: List[str], name: str, labels: str, histogram: Histogram) -> None:
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    for bound, count in zip(_bucket_labels(histogram.bounds), histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+def _bucket_labels(bounds: Iterable[float]) -> List[str]:
+    return [str(bound) for bound in bounds] + ["+Inf"]
+
+
+metrics = Metrics()
+
+
+_templates: Dict[Tuple[int, int], str] = {}
+
+
+def route_template(scope) -> str:
+    """Path template of the route the router matched, e.g. /api/v1/transactions/{transaction_id}."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    # Depending on the FastAPI version, routes of included routers carry their full path
+    # or only their own part; what precedes it are the static router prefixes
+    extra = scope["path"].count("/") - template.count("/")
+    if extra <= 0:
+        return template
+    key = (id(route), extra)
+    full = _templates.get(key)
+    if full is None:
+        full = _templates[key] = "/".join(scope["path"].split("/")[:extra + 1]) + template
+    return full
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware, so it adds no task or response wrapping of its own."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.in_flight -= 1
+            current_request.reset(token)
+            metrics.observe_request((scope["method"], route_template(scope)), status_code, elapsed, stats)
+
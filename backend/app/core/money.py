@@ -0,0 +1,11 @@
+"""
+Decimal helpers for amounts read from Numeric columns and request bodies.
+"""
+from decimal import Decimal
+
+ZERO = Decimal("0")
+
+
+def to_decimal(value) -> Decimal:
+    """``value`` as a Decimal, going through str so floats keep their printed value; None is zero."""
+    return ZERO if value is None else Decimal(str(value))
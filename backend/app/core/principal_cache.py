@@ -0,0 +1,144 @@
+"""
+Cache of authenticated principals.
+
+Maps a bearer token to the few user fields authorization needs, so most
+requests are authorized without decoding the JWT or selecting the user.
+Entries live for ``principal_cache_ttl_seconds`` (never past the token's own
+expiry) and are dropped as soon as a user's role, activity or team changes.
+
+The cache is per process. A flush in this process invalidates right away;
+changes made by other workers arrive through the user's ``principal``
+stamp in ``resource_versions``, which the versions hook bumps and
+``watch`` polls every ``principal_cache_sync_seconds``. The stamps come
+from one counter shared by all users, so a sync reads only those above the
+last one seen, an index range that is empty most of the time. So a user
+deactivated or demoted on another worker keeps access here for at most
+that long, rather than for the whole TTL.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.resource_version import ChangeCounter, ResourceVersion
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# Changing any of these must drop the user's cached principals
+PRINCIPAL_FIELDS = ("role", "is_active", "team_id")
+# resource_versions stamp bumped on every such change
+PRINCIPAL = "principal"
+
+
+class Principal(NamedTuple):
+    id: str
+    role: UserRole
+    is_active: bool
+    team_id: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, role=user.role, is_active=user.is_active, team_id=user.team_id)
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._seen: Optional[int] = None  # highest principal stamp at the last sync
+
+    def get(self, token: str) -> Optional[Principal]:
+        item = self._items.get(token)
+        if item is None:
+            return None
+        principal, expires_at = item
+        if expires_at <= time.time():
+            self._remove(token)
+            return None
+        self._items.move_to_end(token)
+        return principal
+
+    def put(self, token: str, principal: Principal, token_exp: Optional[float] = None) -> None:
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        self._items[token] = (principal, expires_at)
+        self._items.move_to_end(token)
+        self._tokens_by_user.setdefault(principal.id, set()).add(token)
+        while len(self._items) > self.maxsize:
+            self._remove(next(iter(self._items)))
+
+    def invalidate_user(self, user_id: str) -> None:
+        for token in self._tokens_by_user.pop(user_id, ()):
+            self._items.pop(token, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        principal, _ = self._items.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Drop principals whose stamp changed since the last sync; returns the number of users."""
+        if self._seen is None:
+            # No baseline to compare with yet, so anything already cached may be stale
+            result = await db.execute(select(ChangeCounter.value).where(ChangeCounter.name == PRINCIPAL))
+            self.clear()
+            self._seen = result.scalar() or 0
+            return 0
+        result = await db.execute(
+            select(ResourceVersion.user_id, ResourceVersion.version)
+            .where(ResourceVersion.resource == PRINCIPAL)
+            .where(ResourceVersion.version > self._seen)
+        )
+        stamps = dict(result.all())
+        for user_id in stamps:
+            self.invalidate_user(user_id)
+        if stamps:
+            self._seen = max(stamps.values())
+        return len(stamps)
+
+    async def watch(self, session_factory, interval: float) -> None:
+        """Background task syncing with the other workers' changes until cancelled."""
+        while True:
+            try:
+                async with session_factory() as db:
+                    await self.sync(db)
+            except Exception:
+                # Cached principals still expire after the TTL
+                logger.exception("syncing cached principals failed")
+            await asyncio.sleep(interval)
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_changed_principals(session, flush_context):
+    """Drop cached principals of users deactivated, deleted or re-roled in this flush."""
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+                principal_cache.invalidate_user(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            principal_cache.invalidate_user(obj.id)
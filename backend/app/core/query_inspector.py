@@ -0,0 +1,130 @@
+"""
+Statement inspection: per-request query counts, N+1 shapes and slow statements.
+
+``instrument_engine`` times every statement on the engine and feeds the
+metrics. A statement slower than ``settings.slow_query_ms`` is logged with
+the route running it. Within a request every statement's SQL is counted;
+parameters travel separately, so identical SQL is one statement shape, and
+a shape executed ``settings.query_repeat_threshold`` times or more is
+logged as a likely N+1 once the request finishes. That is one dict
+increment per statement, cheap enough to leave on in production.
+
+``max_queries`` caps the statements a block may run, e.g. as a pytest
+fixture asserting an endpoint's budget::
+
+    @pytest.fixture
+    def query_budget():
+        return max_queries
+
+    def test_list_transactions(client, query_budget):
+        with query_budget(3):
+            client.get("/api/v1/transactions")
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import RequestStats, RouteKey, current_request, metrics, route_template
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_LOG_LENGTH = 300
+
+
+class QueryBudget:
+    __slots__ = ("limit", "queries", "statements")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queries = 0
+        self.statements: Dict[str, int] = {}
+
+
+# Open max_queries blocks. Checked on every statement of the process rather than
+# through the request context, since a test client runs the app in another thread.
+_budgets: List[QueryBudget] = []
+
+
+def _shorten(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > STATEMENT_LOG_LENGTH:
+        statement = statement[:STATEMENT_LOG_LENGTH] + "..."
+    return statement
+
+
+def _route(stats: Optional[RequestStats]) -> str:
+    if stats is None or stats.scope is None:
+        return "<background>"
+    return f'{stats.scope["method"]} {route_template(stats.scope)}'
+
+
+def _observe(statement: str, elapsed: float) -> None:
+    metrics.observe_query(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+    for budget in _budgets:
+        budget.queries += 1
+        budget.statements[statement] = budget.statements.get(statement, 0) + 1
+    if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+        logger.warning("slow query: %.1f ms on %s: %s", elapsed * 1000, _route(stats), _shorten(statement))
+
+
+def repeated_statements(statements: Dict[str, int], threshold: int) -> List[str]:
+    return [statement for statement, count in statements.items() if count >= threshold]
+
+
+def report_repeats(key: RouteKey, stats: RequestStats) -> None:
+    """Log statement shapes a finished request executed suspiciously often."""
+    threshold = settings.query_repeat_threshold
+    if not threshold or stats.queries < threshold:
+        return
+    for statement in repeated_statements(stats.statements, threshold):
+        logger.warning(
+            "possible N+1: %s ran the same statement %d times (%d statements in total): %s",
+            f"{key[0]} {key[1]}", stats.statements[statement], stats.queries, _shorten(statement),
+        )
+
+
+def instrument_engine(engine) -> None:
+    """Time and inspect every statement executed on ``engine``."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        _observe(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _drop_timer(exception_context):
+        # Failed statements never reach after_cursor_execute
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            _observe(exception_context.statement or "", time.perf_counter() - started.pop())
+
+
+metrics.request_hooks.append(report_repeats)
+
+
+@contextmanager
+def max_queries(limit: int) -> Iterator[QueryBudget]:
+    """Fail with AssertionError if the block executes more than ``limit`` statements."""
+    budget = QueryBudget(limit)
+    _budgets.append(budget)
+    try:
+        yield budget
+    finally:
+        _budgets.remove(budget)
+    if budget.queries > limit:
+        by_count = sorted(budget.statements.items(), key=lambda item: -item[1])
+        raise AssertionError(
+            f"{budget.queries} statements executed, at most {limit} expected:\n"
+            + "\n".join(f"  {count} x {_shorten(statement)}" for statement, count in by_count)
+        )
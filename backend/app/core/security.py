@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -8,6 +10,7 @@ from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/login", auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -26,11 +29,87 @@ def get_password_hash(password: str) -> str:
     # Truncate to 72 bytes (bcrypt limit)
     if len(password_bytes) > 72:
         password_bytes = password_bytes[:72]
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash was made with a different cost factor than configured."""
+    try:
+        rounds = int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.bcrypt_rounds
+
+
+class PasswordHashPool:
+    """
+    Runs bcrypt on worker threads so it never blocks the event loop.
+
+    bcrypt releases the GIL, so workers hash in parallel. At most
+    ``workers`` hashes run at once; callers beyond that wait, and once
+    ``max_queue`` are waiting new requests are rejected with 503.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._semaphore = asyncio.Semaphore(workers)
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func, *args):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, retry later",
+                headers={"Retry-After": "1"},
+            )
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_hash_pool = PasswordHashPool(settings.password_hash_workers, settings.password_hash_max_queue)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
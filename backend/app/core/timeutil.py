@@ -0,0 +1,30 @@
+"""
+UTC helpers.
+
+The app stores naive UTC datetimes; SQLite hands them back naive, while
+PostgreSQL and clients may send aware ones.
+"""
+from datetime import date, datetime, timezone
+from typing import Optional, Tuple
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """``value`` as naive UTC; naive values are taken to be UTC already."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def utc_timestamp(value: Optional[datetime], default: float = 0.0) -> float:
+    """POSIX timestamp of ``value``, reading naive values as UTC; ``default`` for None."""
+    if value is None:
+        return default
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def periods(now: datetime) -> Tuple[date, date]:
+    """The day and the first day of the month ``now`` falls in."""
+    today = now.date()
+    return today, today.replace(day=1)
@@ -1,9 +1,47 @@
+import asyncio
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from app.core.config import settings
 
-engine = create_async_engine(settings.database_url, echo=settings.debug)
+
+def create_engine_from_settings():
+    is_sqlite = settings.database_url.startswith("sqlite")
+    options = {"echo": settings.db_echo}
+    if not (is_sqlite and ":memory:" in settings.database_url):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    new_engine = create_async_engine(settings.database_url, **options)
+
+    if is_sqlite:
+        event.listen(new_engine.sync_engine, "connect", set_sqlite_pragmas)
+
+    return new_engine
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; NORMAL sync is safe under WAL."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
+
+
+engine = create_engine_from_settings()
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -19,6 +57,31 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def alembic_config() -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Make sure the schema is at the latest migration before serving."""
+    config = alembic_config()
+    if settings.db_auto_migrate:
+        # env.py runs its own event loop, so migrate from a worker thread
+        await asyncio.to_thread(command.upgrade, config, "head")
+
+    head = ScriptDirectory.from_config(config).get_current_head()
+    async with engine.connect() as conn:
+        current = await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision()
+        )
+
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current}, expected {head}. "
+            "Run `alembic upgrade head` (or set DB_AUTO_MIGRATE=true)."
+        )
@@ -1,18 +1,49 @@
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.db.database import init_db
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.query_inspector import instrument_engine
+from app.core.principal_cache import principal_cache
+from app.core.security import password_hash_pool
+from app.db.database import engine, init_db, async_session
+from app.api.responses import FastJSONResponse
 from app.api.routes import api_router
+from app.services.matching import transaction_matcher
+from app.services.requisite_routing import requisite_router
+from app.services.devices import device_registry, write_behind
+from app.services.disputes import deadline_scheduler
+from app.services.events import event_hub
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    async with async_session() as db:
+        await transaction_matcher.load(db)
+        await requisite_router.load(db)
+        await device_registry.load(db)
+        await deadline_scheduler.load(db)
+    device_flusher = asyncio.create_task(write_behind(async_session, settings.device_status_flush_seconds))
+    dispute_expirer = asyncio.create_task(deadline_scheduler.run(async_session))
+    principal_watcher = asyncio.create_task(
+        principal_cache.watch(async_session, settings.principal_cache_sync_seconds)
+    )
     yield
     # Shutdown
+    background = (principal_watcher, dispute_expirer, device_flusher)
+    for task in background:
+        task.cancel()
+    for task in background:
+        with suppress(asyncio.CancelledError):
+            await task
+    # Only now, so a flush cancelled mid-write cannot race the final one
+    async with async_session() as db:
+        await device_registry.flush(db)
 
 
 app = FastAPI(
@@ -20,6 +51,9 @@ app = FastAPI(
     description="Payment processing platform API",
     version="1.0.0",
     lifespan=lifespan,
+    # As a Default, FastAPI still serializes response models straight to JSON
+    # bytes where it can, and renders everything else with pydantic-core
+    default_response_class=Default(FastJSONResponse),
 )
 
 # CORS middleware
@@ -35,6 +69,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing; added after CORS so it wraps it and counts preflights too
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+
+metrics.gauge("password_hash_in_flight", "bcrypt hashes running", lambda: password_hash_pool.in_flight)
+metrics.gauge("password_hash_queued", "bcrypt hashes waiting for a worker", lambda: password_hash_pool.queued)
+metrics.gauge(
+    "password_hash_rejected_total", "Logins rejected with 503 by the hash pool",
+    lambda: password_hash_pool.rejected, "counter",
+)
+metrics.gauge("event_stream_subscribers", "Connected notification streams", event_hub.subscriber_count)
+metrics.gauge("devices_tracked", "Devices in the heartbeat registry", lambda: len(device_registry))
+metrics.gauge("open_payins_indexed", "Open payins in the matching index", lambda: len(transaction_matcher))
+metrics.gauge("requisites_indexed", "Active requisites in the routing index", lambda: len(requisite_router))
+metrics.gauge("disputes_scheduled", "Open disputes waiting for their deadline", lambda: len(deadline_scheduler))
+
 # Include API routes
 app.include_router(api_router, prefix=settings.api_prefix)
 
@@ -44,6 +94,11 @@ async def root():
     return {"message": "AdvancePay API", "version": "1.0.0"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
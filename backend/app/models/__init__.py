@@ -5,6 +5,11 @@ from app.models.dispute import Dispute, DisputeStatus, DisputeReason
 from app.models.wallet import WalletTransaction, WalletTransactionType, WalletTransactionStatus
 from app.models.notification import Notification, NotificationType
 from app.models.bank_notification import BankNotification
+from app.models.resource_version import ResourceVersion, ChangeCounter
+from app.models.device_status import DeviceStatus
+from app.models.idempotency_key import IdempotencyKey
+from app.models.ledger import BalanceLedgerEntry, BalanceSnapshot, LedgerEntryType
+from app.models.trader_stats import TraderStats
 
 __all__ = [
     "User",
@@ -25,4 +30,12 @@ __all__ = [
     "Notification",
     "NotificationType",
     "BankNotification",
+    "ResourceVersion",
+    "ChangeCounter",
+    "DeviceStatus",
+    "IdempotencyKey",
+    "BalanceLedgerEntry",
+    "BalanceSnapshot",
+    "LedgerEntryType",
+    "TraderStats",
 ]
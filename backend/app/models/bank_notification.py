@@ -1,14 +1,22 @@
-from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Text, Boolean
+from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Text, Boolean, Index, Integer
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
+from app.core.ids import new_id
 from app.db.database import Base
 
 
 class BankNotification(Base):
     __tablename__ = "bank_notifications"
-
-    id = Column(String, primary_key=True)
+    __table_args__ = (
+        Index("ix_bank_notifications_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_bank_notifications_created_at", "created_at", "id"),
+        Index("ix_bank_notifications_user_id_change_seq", "user_id", "change_seq", "id"),
+    )
+    # Load created_at on insert, so new rows can be pushed to subscribers as is
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = Column(String, primary_key=True, default=new_id)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
 
     # Notification metadata
@@ -26,9 +34,15 @@ class BankNotification(Base):
     # Raw JSON data from Android
     raw_data = Column(Text, nullable=True)
 
+    # Content hash of user, package, title, text and posted_time (dedup key)
+    fingerprint = Column(String(64), nullable=True, unique=True, index=True)
+
     # Processing status
     is_processed = Column(Boolean, default=False)
 
+    # Per-user change sequence, restamped on every insert and update (delta sync)
+    change_seq = Column(Integer, nullable=False, server_default="0")
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, ForeignKey, Integer, Boolean, DateTime
+
+from app.db.database import Base
+
+
+class DeviceStatus(Base):
+    """Last known state of a trader's Android device, written behind from the in-memory registry"""
+    __tablename__ = "device_statuses"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+
+    battery_level = Column(Integer, nullable=False)
+    is_charging = Column(Boolean, nullable=False)
+    has_internet = Column(Boolean, nullable=False)
+    is_working = Column(Boolean, nullable=False)
+    last_notification_time = Column(DateTime(timezone=True), nullable=True)
+
+    last_heartbeat_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum, Text
+from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
+from app.core.ids import new_id
 from app.db.database import Base
 
 
@@ -25,8 +26,13 @@ class DisputeReason(str, enum.Enum):
 
 class Dispute(Base):
     __tablename__ = "disputes"
+    __table_args__ = (
+        Index("ix_disputes_trader_id_created_at", "trader_id", "created_at", "id"),
+        Index("ix_disputes_trader_id_status_created_at", "trader_id", "status", "created_at"),
+        Index("ix_disputes_status_deadline_at", "status", "deadline_at"),
+    )
 
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True, default=new_id)
     transaction_id = Column(String, ForeignKey("transactions.id"), nullable=False, unique=True)
     trader_id = Column(String, ForeignKey("users.id"), nullable=False)
 
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, ForeignKey, Integer, Text, DateTime
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+
+class IdempotencyKey(Base):
+    """Response stored for a client's Idempotency-Key, replayed on retries"""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+
+    endpoint = Column(String(100), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
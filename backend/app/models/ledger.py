@@ -0,0 +1,55 @@
+from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum, Index
+from sqlalchemy.sql import func
+import enum
+
+from app.core.ids import new_id
+from app.db.database import Base
+
+
+class LedgerEntryType(str, enum.Enum):
+    OPENING = "opening"  # balances of a new user, or carried over when the ledger was introduced
+    ADJUSTMENT = "adjustment"  # balance columns changed directly, or a reconciliation
+    WITHDRAW_REQUESTED = "withdraw_requested"
+    TRANSACTION_COMPLETED = "transaction_completed"
+    TRANSACTION_REVERSED = "transaction_reversed"  # a completed transaction was disputed, failed or cancelled
+
+
+class BalanceLedgerEntry(Base):
+    """Append-only balance movement, carrying the user's balances after it"""
+    __tablename__ = "balance_ledger"
+    __table_args__ = (
+        Index("ix_balance_ledger_user_id_created_at", "user_id", "created_at", "id"),
+    )
+
+    id = Column(String, primary_key=True, default=new_id)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    entry_type = Column(Enum(LedgerEntryType), nullable=False)
+    reference_id = Column(String, nullable=True)  # transaction / wallet transaction id
+
+    # Movement
+    working_delta = Column(Numeric(18, 2), nullable=False, default=0)
+    pending_delta = Column(Numeric(18, 2), nullable=False, default=0)
+    deposit_delta = Column(Numeric(18, 2), nullable=False, default=0)
+    processed_delta = Column(Numeric(18, 6), nullable=False, default=0)
+
+    # Running balances after this entry
+    working_balance = Column(Numeric(18, 2), nullable=False)
+    pending_balance = Column(Numeric(18, 2), nullable=False)
+    security_deposit = Column(Numeric(18, 2), nullable=False)
+    total_processed = Column(Numeric(18, 6), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class BalanceSnapshot(Base):
+    """Current balances of a user, i.e. the running balances of their last ledger entry"""
+    __tablename__ = "balance_snapshots"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+
+    working_balance = Column(Numeric(18, 2), nullable=False, default=0)
+    pending_balance = Column(Numeric(18, 2), nullable=False, default=0)
+    security_deposit = Column(Numeric(18, 2), nullable=False, default=0)
+    total_processed = Column(Numeric(18, 6), nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum, Boolean
+from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum, Boolean, Index
 from sqlalchemy.sql import func
 import enum
 
+from app.core.ids import new_id
 from app.db.database import Base
 
 
@@ -15,8 +16,14 @@ class NotificationType(str, enum.Enum):
 
 class Notification(Base):
     __tablename__ = "notifications"
-
-    id = Column(String, primary_key=True)
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+        Index("ix_notifications_user_id_is_read", "user_id", "is_read"),
+    )
+    # Load created_at on insert, so new rows can be pushed to subscribers as is
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = Column(String, primary_key=True, default=new_id)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
 
     type = Column(Enum(NotificationType), nullable=False)
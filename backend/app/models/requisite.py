@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey, Numeric, DateTime, Enum, Integer, JSON
+from sqlalchemy import Column, String, Boolean, ForeignKey, Numeric, Date, DateTime, Enum, Integer, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
+from app.core.ids import new_id
 from app.db.database import Base
 
 
@@ -21,8 +22,11 @@ class PaymentMethod(str, enum.Enum):
 
 class Requisite(Base):
     __tablename__ = "requisites"
+    __table_args__ = (
+        Index("ix_requisites_owner_id_created_at", "owner_id", "created_at"),
+    )
 
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True, default=new_id)
     owner_id = Column(String, ForeignKey("users.id"), nullable=False)
     type = Column(Enum(RequisiteType), nullable=False)
     bank_name = Column(String(100), nullable=False)
@@ -37,6 +41,9 @@ class Requisite(Base):
     daily_used = Column(Numeric(18, 2), default=0)
     monthly_limit = Column(Numeric(18, 2), default=5000000)
     monthly_used = Column(Numeric(18, 2), default=0)
+    # Day / first of month that daily_used / monthly_used count for
+    usage_day = Column(Date, nullable=True)
+    usage_month = Column(Date, nullable=True)
 
     # Stats
     total_processed = Column(Numeric(18, 2), default=0)
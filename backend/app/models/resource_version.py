@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, ForeignKey, Integer, Index
+
+from app.db.database import Base
+
+
+class ResourceVersion(Base):
+    """Per-user change counter of a polled resource, used as its ETag"""
+    __tablename__ = "resource_versions"
+    __table_args__ = (
+        Index("ix_resource_versions_resource_version", "resource", "version"),
+    )
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    resource = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ChangeCounter(Base):
+    """Change counter shared by all users, for stamps that must grow across users"""
+    __tablename__ = "change_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
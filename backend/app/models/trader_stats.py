@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, ForeignKey, Numeric, Integer, Date, DateTime
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+
+class TraderStats(Base):
+    """Per-trader transaction counters, maintained incrementally on every status change"""
+    __tablename__ = "trader_stats"
+
+    trader_id = Column(String, ForeignKey("users.id"), primary_key=True)
+
+    total_count = Column(Integer, nullable=False, default=0)
+    total_processed = Column(Numeric(18, 6), nullable=False, default=0)
+
+    # Counts by status
+    pending_count = Column(Integer, nullable=False, default=0)
+    processing_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    disputed_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+
+    # Counts by type
+    payin_count = Column(Integer, nullable=False, default=0)
+    payout_count = Column(Integer, nullable=False, default=0)
+
+    # Completed volume of the current UTC day / month (by completed_at);
+    # stale once the period has passed
+    day = Column(Date, nullable=True)
+    day_count = Column(Integer, nullable=False, default=0)
+    day_volume = Column(Numeric(18, 6), nullable=False, default=0)
+    month = Column(Date, nullable=True)  # first day of the month
+    month_count = Column(Integer, nullable=False, default=0)
+    month_volume = Column(Numeric(18, 6), nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum
+from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
+from app.core.ids import new_id
 from app.db.database import Base
 
 
@@ -29,8 +30,11 @@ class PaymentMethod(str, enum.Enum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_trader_id_created_at", "trader_id", "created_at", "id"),
+    )
 
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True, default=new_id)
     order_id = Column(String(50), unique=True, nullable=False, index=True)
     trader_id = Column(String, ForeignKey("users.id"), nullable=False)
     requisite_id = Column(String, ForeignKey("requisites.id"), nullable=True)
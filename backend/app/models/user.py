@@ -3,6 +3,7 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
+from app.core.ids import new_id
 from app.db.database import Base
 
 
@@ -17,7 +18,7 @@ class UserRole(str, enum.Enum):
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True, default=new_id)
     username = Column(String(50), unique=True, nullable=False, index=True)
     email = Column(String(100), unique=True, nullable=True)
     hashed_password = Column(String(255), nullable=False)
@@ -44,7 +45,7 @@ class User(Base):
 class Team(Base):
     __tablename__ = "teams"
 
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True, default=new_id)
     name = Column(String(100), nullable=False)
     teamlead_id = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum
+from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
+from app.core.ids import new_id
 from app.db.database import Base
 
 
@@ -20,8 +21,11 @@ class WalletTransactionStatus(str, enum.Enum):
 
 class WalletTransaction(Base):
     __tablename__ = "wallet_transactions"
+    __table_args__ = (
+        Index("ix_wallet_transactions_user_id_created_at", "user_id", "created_at", "id"),
+    )
 
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True, default=new_id)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
 
     type = Column(Enum(WalletTransactionType), nullable=False)
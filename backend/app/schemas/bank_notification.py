@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
@@ -14,6 +14,11 @@ class BankNotificationCreate(BaseModel):
     raw_data: Optional[str] = None
 
 
+class BankNotificationBatchCreate(BaseModel):
+    """Backlog replayed by the Android app after reconnecting"""
+    items: List[BankNotificationCreate] = Field(..., min_length=1, max_length=500)
+
+
 class BankNotificationResponse(BaseModel):
     id: str
     user_id: str
@@ -34,9 +39,35 @@ class BankNotificationResponse(BaseModel):
 
 class BankNotificationListResponse(BaseModel):
     items: List[BankNotificationResponse]
-    total: int
+    total: Optional[int] = None  # omitted when requested with include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    # Traders only: ?since= token to delta-sync changes made after this list was read
+    sync_token: Optional[str] = None
+
+
+class BankNotificationChangesResponse(BaseModel):
+    """Rows inserted or updated since the client's sync token"""
+    items: List[BankNotificationResponse]
+    next_token: str  # pass back as ?since= on the next sync
+    has_more: bool = False
+
+
+class BankNotificationBatchItemResult(BaseModel):
+    index: int
+    id: str
+    status: str
+    amount: Optional[Decimal] = None
+    card_last4: Optional[str] = None
+    operation_type: Optional[str] = None
+    matched: bool = False  # confirmed a pending transaction in this request
+
+
+class BankNotificationBatchResponse(BaseModel):
+    items: List[BankNotificationBatchItemResult]
+    accepted: int
 
 
 class DeviceStatusUpdate(BaseModel):
@@ -46,3 +77,18 @@ class DeviceStatusUpdate(BaseModel):
     has_internet: bool
     is_working: bool
     last_notification_time: Optional[datetime] = None
+
+
+class DeviceStatusResponse(BaseModel):
+    """Device state as last reported by its heartbeat"""
+    user_id: str
+    battery_level: int
+    is_charging: bool
+    has_internet: bool
+    is_working: bool
+    last_notification_time: Optional[datetime] = None
+    last_heartbeat_at: datetime
+    is_stale: bool  # missed the heartbeat window
+
+    class Config:
+        from_attributes = True
@@ -45,4 +45,8 @@ class DisputeResponse(DisputeBase):
 
 class DisputeListResponse(BaseModel):
     items: List[DisputeResponse]
-    total: int
+    total: Optional[int] = None  # omitted when requested with include_total=false
+    page: int
+    page_size: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
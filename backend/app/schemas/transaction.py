@@ -42,6 +42,8 @@ class TransactionResponse(TransactionBase):
 
 class TransactionListResponse(BaseModel):
     items: List[TransactionResponse]
-    total: int
+    total: Optional[int] = None  # omitted when requested with include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
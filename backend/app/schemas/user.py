@@ -44,6 +44,33 @@ class UserBalanceResponse(BaseModel):
     total_processed: Decimal
 
 
+class BalanceAtResponse(BaseModel):
+    """Balances as of a past moment, from the ledger"""
+    at: datetime
+    available: Decimal
+    security_deposit: Decimal
+    pending: Decimal
+    total_processed: Decimal
+
+
+class TraderStatsResponse(BaseModel):
+    total_count: int
+    total_processed: Decimal
+    pending_count: int
+    processing_count: int
+    completed_count: int
+    failed_count: int
+    disputed_count: int
+    cancelled_count: int
+    payin_count: int
+    payout_count: int
+    # Completed volume of the current UTC day and month
+    day_count: int
+    day_volume: Decimal
+    month_count: int
+    month_volume: Decimal
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -30,7 +30,9 @@ class WalletTransactionResponse(WalletTransactionBase):
 
 class WalletTransactionListResponse(BaseModel):
     items: List[WalletTransactionResponse]
-    total: int
+    total: Optional[int] = None  # omitted when requested with include_total=false
+    next_cursor: Optional[str] = None
+    has_more: bool = False
 
 
 class DepositAddressResponse(BaseModel):
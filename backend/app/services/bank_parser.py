@@ -0,0 +1,167 @@
+"""
+Bank notification parser engine.
+
+All patterns are compiled once at import. Each bank app gets a profile whose
+bank-specific patterns are tried before the generic ones; unknown packages
+fall back to the generic profile.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional, Pattern, Tuple
+
+# Amount with optional thousands separators and kopecks: "1 000", "1 000,50", "10"
+_AMOUNT = r'(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)'
+
+# Generic patterns, in priority order. Text is lowercased before matching,
+# so no IGNORECASE flag is needed.
+GENERIC_AMOUNT_PATTERNS = (
+    _AMOUNT + r'\s*[₽руб\u20bd]',
+    _AMOUNT + r'\s*rub',
+    r'сумма[:\s]+' + _AMOUNT,
+    r'на сумму\s+' + _AMOUNT,
+    r'перевод[:\s]+' + _AMOUNT,
+    r'зачисление[:\s]+' + _AMOUNT,
+    r'(\d+(?:[.,]\d{2})?)\s*р\.?(?:\s|$)',
+    r'(\d+(?:[.,]\d{2})?)\s*рублей',
+)
+
+GENERIC_CARD_PATTERNS = (
+    r'\*{1,4}(\d{4})',
+    r'карт[аы]?\s*\*?(\d{4})',
+    r'(\d{4})\s*\*{4}',
+    r'карта[:\s]+\S*(\d{4})',
+)
+
+GENERIC_CREDIT_KEYWORDS = (
+    'зачисление', 'пополнение', 'получен', 'входящий', 'поступление', 'перевод от', 'вам перевели',
+)
+GENERIC_DEBIT_KEYWORDS = (
+    'списание', 'покупка', 'оплата', 'перевод', 'снятие', 'оплачен', 'платеж',
+)
+
+_DIGIT = re.compile(r'\d')
+
+CREDIT = 'credit'
+DEBIT = 'debit'
+
+
+def _compile_keywords(credit: Tuple[str, ...], debit: Tuple[str, ...]) -> Pattern:
+    """
+    Build one alternation matching every keyword.
+
+    Credit keywords come first so that at the same position "перевод от"
+    wins over the debit "перевод"; longer keywords go first within a group.
+    """
+    credit_alt = '|'.join(re.escape(k) for k in sorted(credit, key=len, reverse=True))
+    debit_alt = '|'.join(re.escape(k) for k in sorted(debit, key=len, reverse=True))
+    return re.compile(f'(?P<credit>{credit_alt})|(?P<debit>{debit_alt})')
+
+
+@dataclass(frozen=True)
+class ParserProfile:
+    name: str
+    amount_patterns: Tuple[Pattern, ...]
+    card_patterns: Tuple[Pattern, ...]
+    keywords: Pattern
+
+
+def make_profile(
+    name: str,
+    amount_patterns: Tuple[str, ...] = (),
+    card_patterns: Tuple[str, ...] = (),
+    credit_keywords: Tuple[str, ...] = (),
+    debit_keywords: Tuple[str, ...] = (),
+) -> ParserProfile:
+    """Compile a profile: bank-specific patterns first, then the generic ones."""
+    return ParserProfile(
+        name=name,
+        amount_patterns=tuple(re.compile(p) for p in amount_patterns + GENERIC_AMOUNT_PATTERNS),
+        card_patterns=tuple(re.compile(p) for p in card_patterns + GENERIC_CARD_PATTERNS),
+        keywords=_compile_keywords(
+            credit_keywords + GENERIC_CREDIT_KEYWORDS,
+            debit_keywords + GENERIC_DEBIT_KEYWORDS,
+        ),
+    )
+
+
+GENERIC_PROFILE = make_profile('generic')
+
+SBER_PROFILE = make_profile(
+    'sber',
+    # "Плат. счёт •• 7750", "MIR-1234"
+    card_patterns=(r'[\u2022*]{2}\s*(\d{4})', r'mir-(\d{4})'),
+    credit_keywords=('перевод по сбп от',),
+)
+
+TINKOFF_PROFILE = make_profile(
+    'tinkoff',
+    # "Пополнение, счет RUB. 1 000 ₽" - the currency code precedes the amount
+    amount_patterns=(r'(?:пополнение|зачисление)[^\d]{0,20}' + _AMOUNT + r'\s*[₽\u20bd]',),
+    credit_keywords=('входящий перевод',),
+)
+
+ALFA_PROFILE = make_profile(
+    'alfa',
+    # "Пополнение *1234 на 1 000,00 RUR"
+    amount_patterns=(_AMOUNT + r'\s*rur',),
+)
+
+VTB_PROFILE = make_profile(
+    'vtb',
+    # "Поступление 1000р Счет *1234"
+    amount_patterns=(r'поступление\s+' + _AMOUNT + r'\s*р',),
+)
+
+PROFILES = {
+    'ru.sberbankmobile': SBER_PROFILE,
+    'ru.sberbank.android': SBER_PROFILE,
+    'com.idamob.tinkoff.android': TINKOFF_PROFILE,
+    'ru.tinkoff.sme': TINKOFF_PROFILE,
+    'ru.alfabank.mobile.android': ALFA_PROFILE,
+    'ru.alfabank.oavdo.amc': ALFA_PROFILE,
+    'ru.vtb24.mobilebanking.android': VTB_PROFILE,
+}
+
+
+def get_profile(app_package: Optional[str]) -> ParserProfile:
+    return PROFILES.get(app_package or '', GENERIC_PROFILE)
+
+
+def parse_bank_notification(
+    title: str, text: str, app_package: Optional[str] = None
+) -> Tuple[Optional[float], Optional[str], Optional[str]]:
+    """Parse amount, card last 4 digits and operation type from a bank notification."""
+    amount = None
+    card_last4 = None
+    operation_type = None
+
+    profile = get_profile(app_package)
+    text_lower = (title + ' ' + text).lower()
+
+    # Most non-bank pushes carry no digits at all - skip every numeric pattern
+    if _DIGIT.search(text_lower):
+        for pattern in profile.amount_patterns:
+            match = pattern.search(text_lower)
+            if match:
+                amount_str = match.group(1).replace(' ', '').replace('\u00a0', '').replace(',', '.')
+                try:
+                    amount = float(amount_str)
+                    if amount > 0:
+                        break
+                except ValueError:
+                    pass
+
+        for pattern in profile.card_patterns:
+            match = pattern.search(text_lower)
+            if match:
+                card_last4 = match.group(1)
+                break
+
+    # Single pass over the text: a credit keyword anywhere wins over debit
+    for match in profile.keywords.finditer(text_lower):
+        if match.lastgroup == CREDIT:
+            operation_type = CREDIT
+            break
+        operation_type = DEBIT
+
+    return amount, card_last4, operation_type
@@ -0,0 +1,58 @@
+"""
+Deduplication of re-delivered bank notifications.
+
+Android listeners re-post the same push on reposts, service restarts and
+after boot. Every notification gets a content fingerprint which is backed
+by a unique index; recently seen fingerprints are kept in an in-process
+LRU so repeats are acknowledged without touching the table.
+"""
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import settings
+
+
+def notification_fingerprint(
+    user_id: str,
+    app_package: str,
+    title: str,
+    text: str,
+    posted_time: datetime,
+) -> str:
+    """SHA-256 over the fields that identify one push on one device."""
+    raw = '\x1f'.join((user_id, app_package, title, text, posted_time.isoformat()))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class FingerprintCache:
+    """Bounded LRU of fingerprint -> id of the stored notification."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        notification_id = self._items.get(fingerprint)
+        if notification_id is not None:
+            self._items.move_to_end(fingerprint)
+        return notification_id
+
+    def put(self, fingerprint: str, notification_id: str) -> None:
+        self._items[fingerprint] = notification_id
+        self._items.move_to_end(fingerprint)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def discard(self, fingerprint: str) -> None:
+        self._items.pop(fingerprint, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+recent_notifications = FingerprintCache(settings.notification_dedup_cache_size)
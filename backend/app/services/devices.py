@@ -0,0 +1,227 @@
+"""
+In-memory registry of trader devices fed by heartbeats.
+
+Heartbeats only touch memory; changed devices are written behind to
+``device_statuses`` every ``device_status_flush_seconds``. Liveness is
+tracked with an expiry wheel: each device sits in the slot of the tick at
+which it goes stale, and advancing the clock empties only the slots that
+have come due. Listing stale or non-working devices therefore costs
+O(result), not O(devices).
+
+The registry is per process: with several workers behind a load balancer
+heartbeats must be routed stickily per user, otherwise each worker sees
+only part of the fleet. The snapshot table is the cross-worker view.
+"""
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.timeutil import utc_timestamp
+from app.models.device_status import DeviceStatus
+from app.models.user import User
+from app.schemas.bank_notification import DeviceStatusUpdate
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = (
+    "battery_level", "is_charging", "has_internet", "is_working", "last_notification_time", "last_heartbeat_at",
+)
+
+
+class DeviceRecord:
+    __slots__ = (
+        "user_id", "team_id", "battery_level", "is_charging", "has_internet", "is_working",
+        "last_notification_time", "last_seen", "expiry_tick",
+    )
+
+    def __init__(self, user_id: str, team_id: Optional[str] = None):
+        self.user_id = user_id
+        self.team_id = team_id
+        self.battery_level = 0
+        self.is_charging = False
+        self.has_internet = False
+        self.is_working = False
+        self.last_notification_time: Optional[datetime] = None
+        self.last_seen = 0.0
+        self.expiry_tick: Optional[int] = None  # None once stale
+
+    @property
+    def last_heartbeat_at(self) -> datetime:
+        return datetime.fromtimestamp(self.last_seen, timezone.utc)
+
+    @property
+    def is_stale(self) -> bool:
+        return self.expiry_tick is None
+
+
+class DeviceRegistry:
+    def __init__(self, stale_after: float, tick: float):
+        self.stale_after = stale_after
+        self.tick = tick
+        # One revolution covers the longest time to expiry plus rounding
+        self._size = math.ceil(stale_after / tick) + 2
+        self._wheel: List[Set[str]] = [set() for _ in range(self._size)]
+        self._current_tick: Optional[int] = None
+        self._records: Dict[str, DeviceRecord] = {}
+        self._stale: Set[str] = set()
+        self._not_working: Set[str] = set()
+        self._dirty: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp // self.tick)
+
+    def _schedule(self, record: DeviceRecord, now: float) -> None:
+        if record.expiry_tick is not None:
+            self._wheel[record.expiry_tick % self._size].discard(record.user_id)
+        self._stale.discard(record.user_id)
+
+        expires_at = record.last_seen + self.stale_after
+        if expires_at <= now:
+            record.expiry_tick = None
+            self._stale.add(record.user_id)
+            return
+        # Round up: a device may be reported stale up to one tick late, never early
+        record.expiry_tick = self._tick_of(expires_at) + 1
+        self._wheel[record.expiry_tick % self._size].add(record.user_id)
+
+    def advance(self, now: Optional[float] = None) -> None:
+        """Move devices whose expiry tick has passed to the stale set."""
+        current = self._tick_of(time.time() if now is None else now)
+        if self._current_tick is None:
+            self._current_tick = current
+            return
+        if current <= self._current_tick:
+            return
+
+        # After a long pause every slot is due, so one revolution is enough
+        for tick in range(max(self._current_tick + 1, current - self._size + 1), current + 1):
+            slot = self._wheel[tick % self._size]
+            if not slot:
+                continue
+            for user_id in [u for u in slot if self._records[u].expiry_tick <= current]:
+                slot.discard(user_id)
+                self._records[user_id].expiry_tick = None
+                self._stale.add(user_id)
+        self._current_tick = current
+
+    def heartbeat(
+        self,
+        user_id: str,
+        team_id: Optional[str],
+        status: DeviceStatusUpdate,
+        now: Optional[float] = None,
+    ) -> DeviceRecord:
+        now = time.time() if now is None else now
+        self.advance(now)
+
+        record = self._records.get(user_id)
+        if record is None:
+            record = self._records[user_id] = DeviceRecord(user_id)
+        record.team_id = team_id
+        record.battery_level = status.battery_level
+        record.is_charging = status.is_charging
+        record.has_internet = status.has_internet
+        record.is_working = status.is_working
+        if status.last_notification_time is not None:
+            record.last_notification_time = status.last_notification_time
+        record.last_seen = now
+
+        self._schedule(record, now)
+        if record.is_working:
+            self._not_working.discard(user_id)
+        else:
+            self._not_working.add(user_id)
+        self._dirty.add(user_id)
+        return record
+
+    def get(self, user_id: str) -> Optional[DeviceRecord]:
+        return self._records.get(user_id)
+
+    def problems(self, now: Optional[float] = None) -> List[DeviceRecord]:
+        """Devices that missed their heartbeat or report they are not working."""
+        self.advance(now)
+        records = [self._records[user_id] for user_id in self._stale | self._not_working]
+        records.sort(key=lambda r: r.last_seen)
+        return records
+
+    def clear(self) -> None:
+        for slot in self._wheel:
+            slot.clear()
+        self._current_tick = None
+        self._records.clear()
+        self._stale.clear()
+        self._not_working.clear()
+        self._dirty.clear()
+
+    async def load(self, db: AsyncSession) -> None:
+        """Restore the last snapshot; devices silent since then start out stale."""
+        self.clear()
+        now = time.time()
+        self.advance(now)
+        # The team is not part of the snapshot; it is read from users, so team
+        # leads see the devices that went silent before the restart too
+        result = await db.execute(
+            select(DeviceStatus, User.team_id).outerjoin(User, User.id == DeviceStatus.user_id)
+        )
+        for snapshot, team_id in result:
+            record = self._records[snapshot.user_id] = DeviceRecord(snapshot.user_id, team_id)
+            record.battery_level = snapshot.battery_level
+            record.is_charging = snapshot.is_charging
+            record.has_internet = snapshot.has_internet
+            record.is_working = snapshot.is_working
+            record.last_notification_time = snapshot.last_notification_time
+            record.last_seen = utc_timestamp(snapshot.last_heartbeat_at)
+            self._schedule(record, now)
+            if not record.is_working:
+                self._not_working.add(record.user_id)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Write the devices changed since the last flush with one upsert."""
+        dirty, self._dirty = self._dirty, set()
+        rows = []
+        for user_id in dirty:
+            record = self._records[user_id]
+            rows.append({"user_id": user_id, **{field: getattr(record, field) for field in SNAPSHOT_FIELDS}})
+        if not rows:
+            return 0
+
+        insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+        statement = insert(DeviceStatus)
+        statement = statement.on_conflict_do_update(
+            index_elements=[DeviceStatus.user_id],
+            set_={field: statement.excluded[field] for field in SNAPSHOT_FIELDS},
+        )
+        try:
+            await db.execute(statement, rows)
+            await db.commit()
+        except Exception:
+            # Keep them for the next round, unless a newer heartbeat already re-marked them
+            self._dirty |= dirty
+            raise
+        return len(rows)
+
+
+device_registry = DeviceRegistry(settings.device_stale_after_seconds, settings.device_wheel_tick_seconds)
+
+
+async def write_behind(session_factory, interval: float) -> None:
+    """Background task flushing the registry until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                await device_registry.flush(db)
+        except Exception:
+            # The rows stay dirty and go out with the next flush
+            logger.exception("writing device statuses failed")
@@ -0,0 +1,183 @@
+"""
+Dispute closing and deadline enforcement.
+
+OPEN disputes the trader does not answer by ``deadline_at`` are lost. Their
+deadlines sit in an in-memory min-heap, so scheduling one and expiring one
+cost O(log n) and the scheduler sleeps until the earliest deadline instead
+of scanning the table. On startup the heap is rebuilt from one query on
+the (status, deadline_at) index; disputes that expired while the server
+was down are settled right away.
+
+Expiry is a conditional UPDATE on the dispute's status and deadline, so a
+trader answering at the last moment, or another worker expiring the same
+dispute, simply wins and the scheduler skips it.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.timeutil import naive_utc
+from app.models.dispute import Dispute, DisputeStatus
+from app.models.notification import Notification, NotificationType
+from app.models.transaction import Transaction, TransactionStatus
+
+CLOSED_STATUSES = (DisputeStatus.RESOLVED, DisputeStatus.WON, DisputeStatus.LOST)
+
+logger = logging.getLogger(__name__)
+
+# Retry delay after a failed expiry, e.g. a locked database
+RETRY_SECONDS = 30.0
+# A dispute whose expiry keeps failing is left OPEN after this many attempts,
+# until the next restart loads it again
+MAX_EXPIRE_ATTEMPTS = 10
+
+
+def set_status(dispute: Dispute, status: DisputeStatus, now: Optional[datetime] = None) -> None:
+    """
+    Status change requested through the API. The disputed transaction is
+    left alone: only an expired deadline settles it, a trader declaring
+    their own dispute won must not complete it.
+    """
+    dispute.status = status
+    if status in CLOSED_STATUSES:
+        dispute.resolved_at = now or datetime.utcnow()
+
+
+class DeadlineScheduler:
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        # Current deadline per dispute; heap items that disagree are stale
+        self._deadlines: Dict[str, datetime] = {}
+        self._wakeup: Optional[asyncio.Event] = None  # created by the runner, on its event loop
+        self._failures: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, dispute_id: str, deadline: datetime) -> None:
+        deadline = naive_utc(deadline)
+        if self._deadlines.get(dispute_id) == deadline:
+            return
+        self._deadlines[dispute_id] = deadline
+        heapq.heappush(self._heap, (deadline, dispute_id))
+        if self._wakeup is not None and self._heap[0] == (deadline, dispute_id):
+            # Earlier than what the runner sleeps for
+            self._wakeup.set()
+
+    def cancel(self, dispute_id: str) -> None:
+        self._deadlines.pop(dispute_id, None)
+        self._failures.pop(dispute_id, None)
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._deadlines.clear()
+        self._failures.clear()
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_deadline(self) -> Optional[datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[str]:
+        """Remove and return the disputes whose deadline has passed."""
+        due = []
+        while self.next_deadline() is not None and self._heap[0][0] <= now:
+            _, dispute_id = heapq.heappop(self._heap)
+            del self._deadlines[dispute_id]
+            due.append(dispute_id)
+        return due
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the heap from the open disputes."""
+        self.clear()
+        result = await db.execute(
+            select(Dispute.id, Dispute.deadline_at)
+            .where(Dispute.status == DisputeStatus.OPEN)
+            .where(Dispute.deadline_at.is_not(None))
+        )
+        for dispute_id, deadline in result:
+            self._deadlines[dispute_id] = naive_utc(deadline)
+        self._heap = [(deadline, dispute_id) for dispute_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    async def expire(self, db: AsyncSession, dispute_id: str, now: datetime) -> bool:
+        """Lose an overdue OPEN dispute and notify its trader; False if it was settled meanwhile."""
+        result = await db.execute(
+            update(Dispute)
+            .where(Dispute.id == dispute_id)
+            .where(Dispute.status == DisputeStatus.OPEN)
+            .where(Dispute.deadline_at <= now)
+            .values(status=DisputeStatus.LOST, resolved_at=now)
+            .returning(Dispute.trader_id, Dispute.transaction_id, Dispute.amount, Dispute.amount_usdt)
+            .execution_options(synchronize_session=False)
+        )
+        expired = result.first()
+        if expired is None:
+            await db.rollback()
+            return False
+
+        # The transaction goes through the ORM, so the ledger, stats and version hooks see it
+        transaction = await db.get(Transaction, expired.transaction_id)
+        if transaction is not None and transaction.status == TransactionStatus.DISPUTED:
+            transaction.status = TransactionStatus.FAILED
+
+        db.add(Notification(
+            user_id=expired.trader_id,
+            type=NotificationType.DISPUTE,
+            title="Спор проигран",
+            message="Истёк срок ответа на спор, транзакция отменена",
+            amount=expired.amount,
+            amount_usdt=expired.amount_usdt,
+            order_id=transaction.order_id if transaction is not None else None,
+        ))
+        await db.commit()
+        return True
+
+    async def run(self, session_factory) -> None:
+        """Background task expiring disputes as their deadlines pass, until cancelled."""
+        self._wakeup = asyncio.Event()
+        while True:
+            self._wakeup.clear()
+            deadline = self.next_deadline()
+            now = datetime.utcnow()
+            if deadline is None or deadline > now:
+                timeout = None if deadline is None else (deadline - now).total_seconds()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = datetime.utcnow()
+            for dispute_id in self.pop_due(now):
+                try:
+                    async with session_factory() as db:
+                        await self.expire(db, dispute_id, now)
+                except Exception:
+                    self._expire_failed(dispute_id)
+                else:
+                    self._failures.pop(dispute_id, None)
+
+    def _expire_failed(self, dispute_id: str) -> None:
+        """Retry a failed expiry later; the loop keeps serving the other disputes."""
+        failures = self._failures.get(dispute_id, 0) + 1
+        if failures >= MAX_EXPIRE_ATTEMPTS:
+            self._failures.pop(dispute_id, None)
+            logger.exception("giving up on expiring dispute %s after %d attempts", dispute_id, failures)
+            return
+        self._failures[dispute_id] = failures
+        logger.exception(
+            "expiring dispute %s failed (attempt %d), retrying in %.0f s", dispute_id, failures, RETRY_SECONDS
+        )
+        self.schedule(dispute_id, datetime.utcnow() + timedelta(seconds=RETRY_SECONDS))
+
+
+deadline_scheduler = DeadlineScheduler()
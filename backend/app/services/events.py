@@ -0,0 +1,86 @@
+"""
+In-process pub/sub for pushing new notifications to connected clients.
+
+Every stored Notification and BankNotification is fanned out to the
+subscribers of its user once the inserting transaction commits. ORM inserts
+are picked up by session hooks; bulk inserts publish explicitly.
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.bank_notification import BankNotification
+from app.models.notification import Notification
+from app.schemas.bank_notification import BankNotificationResponse
+from app.schemas.notification import NotificationResponse
+
+NOTIFICATION_EVENT = "notification"
+BANK_NOTIFICATION_EVENT = "bank_notification"
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class EventHub:
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    @contextmanager
+    def subscribe(self, user_id: str) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id: str, event_type: str, data: dict) -> None:
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                # A stalled client loses its oldest events, never blocks publishers
+                queue.get_nowait()
+            queue.put_nowait((event_type, data))
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+
+event_hub = EventHub()
+
+
+def bank_notification_event(notification: BankNotification) -> tuple:
+    data = BankNotificationResponse.model_validate(notification).model_dump(mode="json")
+    return notification.user_id, BANK_NOTIFICATION_EVENT, data
+
+
+def notification_event(notification: Notification) -> tuple:
+    data = NotificationResponse.model_validate(notification).model_dump(mode="json")
+    return notification.user_id, NOTIFICATION_EVENT, data
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session, flush_context):
+    # Serialize now, while the freshly inserted rows are fully loaded
+    pending = session.info.setdefault("pending_events", [])
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            pending.append(notification_event(obj))
+        elif isinstance(obj, BankNotification):
+            pending.append(bank_notification_event(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session):
+    for user_id, event_type, data in session.info.pop("pending_events", ()):
+        event_hub.publish(user_id, event_type, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_events(session):
+    session.info.pop("pending_events", None)
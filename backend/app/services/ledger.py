@@ -0,0 +1,274 @@
+"""
+Balance ledger.
+
+Every balance movement is appended to ``balance_ledger`` together with the
+user's balances after it, and the user's row in ``balance_snapshots`` holds
+the latest of those. Current balances are one primary-key read and the
+balance at any past time is the last entry before it, one index lookup on
+(user_id, created_at).
+
+The snapshot is advanced by an atomic upsert that returns the new totals,
+so concurrent movements of one user serialize on that row only. Session
+hooks record ORM changes: a new user gets an opening entry, changed
+balance columns of a user an adjustment, and ORM Transaction objects
+moving into or out of COMPLETED their share of total_processed. Bulk
+statements (the withdraw UPDATE, the matcher) call ``record_movement``
+themselves.
+
+Disputes move the ledger only through their transaction: opening one on a
+completed transaction reverses its share of total_processed, and the
+reversal stands when the dispute expires and the transaction fails.
+Closing a dispute through the API books nothing, whatever its status.
+
+The balance columns of ``users`` stay authoritative for available, pending
+and deposit, since withdrawals check them; ``verify`` compares every
+snapshot against them and against the completed transactions, and
+``reconcile`` books the difference of writes made behind the app's back
+as adjustments. total_processed is also counted in ``trader_stats``,
+maintained by its own hooks; ``verify`` reports where the two disagree
+(``rebuild_trader_stats.py`` recomputes that side).
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.ids import new_id
+from app.core.money import ZERO, to_decimal
+from app.models.ledger import BalanceLedgerEntry, BalanceSnapshot, LedgerEntryType
+from app.models.trader_stats import TraderStats
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.user import User
+from app.services.versions import BALANCE, bump_changes
+
+BALANCE_COLUMNS = ("working_balance", "pending_balance", "security_deposit", "total_processed")
+# Columns of users mirrored by the ledger, and the matching _record arguments
+USER_BALANCE_COLUMNS = {"working_balance": "working", "pending_balance": "pending", "security_deposit": "deposit"}
+
+
+def _record(
+    connection,
+    user_id: str,
+    entry_type: LedgerEntryType,
+    reference_id: Optional[str],
+    working=ZERO,
+    pending=ZERO,
+    deposit=ZERO,
+    processed=ZERO,
+) -> BalanceLedgerEntry:
+    now = datetime.utcnow()
+    deltas = dict(zip(BALANCE_COLUMNS, map(to_decimal, (working, pending, deposit, processed))))
+
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    statement = insert(BalanceSnapshot).values(user_id=user_id, updated_at=now, **deltas)
+    table = BalanceSnapshot.__table__
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={
+            **{column: table.c[column] + statement.excluded[column] for column in BALANCE_COLUMNS},
+            "updated_at": now,
+        },
+    ).returning(*(table.c[column] for column in BALANCE_COLUMNS))
+    totals = connection.execute(statement).one()._mapping
+
+    values = dict(
+        id=new_id(),
+        user_id=user_id,
+        entry_type=entry_type,
+        reference_id=reference_id,
+        working_delta=deltas["working_balance"],
+        pending_delta=deltas["pending_balance"],
+        deposit_delta=deltas["security_deposit"],
+        processed_delta=deltas["total_processed"],
+        created_at=now,
+        **{column: totals[column] for column in BALANCE_COLUMNS},
+    )
+    connection.execute(BalanceLedgerEntry.__table__.insert().values(**values))
+    return BalanceLedgerEntry(**values)
+
+
+async def record_movement(
+    db: AsyncSession,
+    user_id: str,
+    entry_type: LedgerEntryType,
+    reference_id: Optional[str],
+    working=ZERO,
+    pending=ZERO,
+    deposit=ZERO,
+    processed=ZERO,
+) -> BalanceLedgerEntry:
+    """Append a movement in the caller's DB transaction and advance the snapshot."""
+    connection = await db.connection()
+    return await connection.run_sync(
+        _record, user_id, entry_type, reference_id, working, pending, deposit, processed
+    )
+
+
+async def get_snapshot(db: AsyncSession, user_id: str) -> Optional[BalanceSnapshot]:
+    return await db.get(BalanceSnapshot, user_id)
+
+
+async def balance_at(db: AsyncSession, user_id: str, at: datetime) -> Optional[BalanceLedgerEntry]:
+    """The last ledger entry at or before ``at``; None before the first movement."""
+    result = await db.execute(
+        select(BalanceLedgerEntry)
+        .where(BalanceLedgerEntry.user_id == user_id)
+        .where(BalanceLedgerEntry.created_at <= at)
+        .order_by(BalanceLedgerEntry.created_at.desc(), BalanceLedgerEntry.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+def _processed_amount(status, amount_usdt) -> Decimal:
+    """A transaction's share of total_processed."""
+    return to_decimal(amount_usdt) if status == TransactionStatus.COMPLETED else ZERO
+
+
+def _previous(state, field: str):
+    history = state.attrs[field].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _expected_balances(connection) -> Dict[str, Dict[str, Decimal]]:
+    """Every user's balances per ``users`` and the completed transactions."""
+    processed = dict(connection.execute(
+        select(Transaction.trader_id, func.sum(Transaction.amount_usdt))
+        .where(Transaction.status == TransactionStatus.COMPLETED)
+        .group_by(Transaction.trader_id)
+    ).all())
+    result = connection.execute(
+        select(User.id, *(getattr(User, column) for column in USER_BALANCE_COLUMNS))
+    )
+    return {
+        row.id: {
+            **{column: to_decimal(getattr(row, column)) for column in USER_BALANCE_COLUMNS},
+            "total_processed": to_decimal(processed.get(row.id)),
+        }
+        for row in result
+    }
+
+
+def _differences(connection) -> Dict[str, Dict[str, Decimal]]:
+    """Per user, what the snapshot is missing (expected minus snapshot) where they disagree."""
+    snapshots = {row.user_id: row for row in connection.execute(select(BalanceSnapshot))}
+    differences = {}
+    for user_id, expected in _expected_balances(connection).items():
+        snapshot = snapshots.get(user_id)
+        missing = {
+            column: value - (to_decimal(getattr(snapshot, column)) if snapshot is not None else ZERO)
+            for column, value in expected.items()
+        }
+        if snapshot is None or any(missing.values()):
+            differences[user_id] = missing
+    return differences
+
+
+def _stats_differences(connection) -> Dict[str, Dict[str, Decimal]]:
+    """Per user, total_processed of the snapshot and of trader_stats where they disagree."""
+    stats = dict(connection.execute(select(TraderStats.trader_id, TraderStats.total_processed)).all())
+    snapshots = dict(connection.execute(select(BalanceSnapshot.user_id, BalanceSnapshot.total_processed)).all())
+    differences = {}
+    for user_id in set(stats) | set(snapshots):
+        snapshot, counted = to_decimal(snapshots.get(user_id)), to_decimal(stats.get(user_id))
+        if snapshot != counted:
+            differences[user_id] = {"snapshot": snapshot, "trader_stats": counted}
+    return differences
+
+
+def _verify(connection) -> List[str]:
+    problems = []
+    for user_id, missing in sorted(_differences(connection).items()):
+        drift = ", ".join(f"{column} {delta:+}" for column, delta in missing.items() if delta)
+        problems.append(f"{user_id}: snapshot is off by {drift}" if drift else f"{user_id}: no snapshot")
+    for user_id, totals in sorted(_stats_differences(connection).items()):
+        problems.append(
+            f"{user_id}: total_processed is {totals['snapshot']} in the snapshot"
+            f" but {totals['trader_stats']} in trader_stats"
+        )
+    return problems
+
+
+def _reconcile(connection) -> int:
+    differences = _differences(connection)
+    for user_id, missing in differences.items():
+        _record(
+            connection,
+            user_id,
+            LedgerEntryType.ADJUSTMENT,
+            None,
+            working=missing["working_balance"],
+            pending=missing["pending_balance"],
+            deposit=missing["security_deposit"],
+            processed=missing["total_processed"],
+        )
+    # The snapshot feeds the balance endpoint, so pollers must see the correction
+    bump_changes(connection, [(user_id, BALANCE) for user_id in differences])
+    return len(differences)
+
+
+async def verify(db: AsyncSession) -> List[str]:
+    """Users whose snapshot disagrees with their balance columns, completed transactions or trader_stats."""
+    connection = await db.connection()
+    return await connection.run_sync(_verify)
+
+
+async def reconcile(db: AsyncSession) -> int:
+    """Book every difference ``verify`` reports as an adjustment; returns the number of users."""
+    connection = await db.connection()
+    count = await connection.run_sync(_reconcile)
+    await db.commit()
+    return count
+
+
+def _user_movement(obj: User, new: bool) -> Dict[str, Decimal]:
+    if new:
+        return {argument: to_decimal(getattr(obj, column)) for column, argument in USER_BALANCE_COLUMNS.items()}
+    state = inspect(obj)
+    return {
+        argument: to_decimal(getattr(obj, column)) - to_decimal(_previous(state, column))
+        for column, argument in USER_BALANCE_COLUMNS.items()
+        if state.attrs[column].history.has_changes()
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _record_user_balance_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, User):
+            # Always written, so every user has a snapshot from the start
+            _record(session.connection(), obj.id, LedgerEntryType.OPENING, None, **_user_movement(obj, True))
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            movement = _user_movement(obj, False)
+            if any(movement.values()):
+                _record(session.connection(), obj.id, LedgerEntryType.ADJUSTMENT, None, **movement)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_processed_changes(session, flush_context):
+    movements = []
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            movements.append((obj, _processed_amount(obj.status, obj.amount_usdt)))
+    for obj in session.dirty:
+        if isinstance(obj, Transaction):
+            state = inspect(obj)
+            before = _processed_amount(_previous(state, "status"), _previous(state, "amount_usdt"))
+            movements.append((obj, _processed_amount(obj.status, obj.amount_usdt) - before))
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            movements.append((obj, -_processed_amount(obj.status, obj.amount_usdt)))
+
+    for transaction, delta in movements:
+        if delta:
+            entry_type = (
+                LedgerEntryType.TRANSACTION_COMPLETED if delta > 0 else LedgerEntryType.TRANSACTION_REVERSED
+            )
+            _record(session.connection(), transaction.trader_id, entry_type, transaction.id, processed=delta)
@@ -0,0 +1,284 @@
+"""
+Matching of credit bank notifications to open payin transactions.
+
+Open payins (PENDING/PROCESSING) are indexed in memory by
+(trader_id, amount in cents, card_last4). A credit notification claims the
+oldest open transaction under its key inside the match window; the
+transaction is completed in the same DB transaction that stores the
+notification as processed.
+
+The index is per process: with several workers a payin created on one
+worker is only in that worker's index, and the index is only rebuilt from
+the window on startup. A miss therefore cannot mean "no open payin", and
+misses fall back to an indexed query. ``match_many`` resolves all misses
+of a batch with one query, so a batch of unmatched credits costs one
+statement rather than one per row.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.timeutil import naive_utc
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.ledger import LedgerEntryType
+from app.services.ledger import record_movement
+from app.services import requisite_routing, trader_stats
+from app.services.versions import BALANCE, bump_versions
+
+OPEN_STATUSES = (TransactionStatus.PENDING, TransactionStatus.PROCESSING)
+
+MatchKey = Tuple[str, int, Optional[str]]
+# (amount, card_last4, operation_type) of a parsed notification
+MatchRequest = Tuple[object, Optional[str], Optional[str]]
+
+
+class OpenTransaction(NamedTuple):
+    id: str
+    key: MatchKey
+    created_at: datetime
+
+
+def amount_key(amount) -> int:
+    """Amount in cents, so float and Decimal amounts hash the same."""
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+def is_credit(amount, operation_type: Optional[str]) -> bool:
+    return operation_type == 'credit' and bool(amount)
+
+
+def _card_matches(card_last4: Optional[str], candidate: Optional[str]) -> bool:
+    """Whether a payin with card ``candidate`` can take a notification for ``card_last4``."""
+    return candidate is None or (card_last4 is not None and candidate == card_last4)
+
+
+class TransactionMatcher:
+    def __init__(self, window: timedelta):
+        self.window = window
+        self._index: Dict[MatchKey, List[OpenTransaction]] = defaultdict(list)
+        self._by_id: Dict[str, OpenTransaction] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, transaction: Transaction) -> None:
+        """Index an open payin transaction."""
+        if transaction.type != TransactionType.PAYIN or transaction.status not in OPEN_STATUSES:
+            return
+        if transaction.id in self._by_id:
+            return
+        entry = OpenTransaction(
+            id=transaction.id,
+            key=(transaction.trader_id, amount_key(transaction.amount), transaction.card_last4),
+            created_at=naive_utc(transaction.created_at) or datetime.utcnow(),
+        )
+        self._by_id[entry.id] = entry
+        bucket = self._index[entry.key]
+        bucket.append(entry)
+        bucket.sort(key=lambda e: e.created_at)
+
+    def release(self, entry: OpenTransaction) -> None:
+        """Put back a claimed entry whose DB transaction was rolled back."""
+        if entry.id in self._by_id:
+            return
+        self._by_id[entry.id] = entry
+        bucket = self._index[entry.key]
+        bucket.append(entry)
+        bucket.sort(key=lambda e: e.created_at)
+
+    def discard(self, transaction_id: str) -> None:
+        entry = self._by_id.pop(transaction_id, None)
+        if entry is None:
+            return
+        bucket = self._index.get(entry.key)
+        if bucket is not None:
+            bucket.remove(entry)
+            if not bucket:
+                del self._index[entry.key]
+
+    def claim(self, trader_id: str, amount, card_last4: Optional[str]) -> Optional[OpenTransaction]:
+        """Remove and return the oldest open transaction for the notification."""
+        cutoff = datetime.utcnow() - self.window
+        cents = amount_key(amount)
+        keys = [(trader_id, cents, card_last4)]
+        if card_last4 is not None:
+            # Transactions created without card details match any card
+            keys.append((trader_id, cents, None))
+
+        for key in keys:
+            bucket = self._index.get(key)
+            while bucket:
+                entry = bucket.pop(0)
+                del self._by_id[entry.id]
+                if entry.created_at >= cutoff:
+                    if not bucket:
+                        del self._index[key]
+                    return entry
+            self._index.pop(key, None)
+        return None
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the index from open payins inside the match window."""
+        self._index.clear()
+        self._by_id.clear()
+        result = await db.execute(
+            select(Transaction)
+            .where(Transaction.type == TransactionType.PAYIN)
+            .where(Transaction.status.in_(OPEN_STATUSES))
+            .where(Transaction.created_at >= datetime.utcnow() - self.window)
+        )
+        for transaction in result.scalars():
+            self.add(transaction)
+
+    def _open_payins(self, trader_id: str):
+        return (
+            select(Transaction.id, Transaction.amount, Transaction.card_last4, Transaction.created_at)
+            .where(Transaction.trader_id == trader_id)
+            .where(Transaction.type == TransactionType.PAYIN)
+            .where(Transaction.status.in_(OPEN_STATUSES))
+            .where(Transaction.created_at >= datetime.utcnow() - self.window)
+        )
+
+    def _found(self, trader_id: str, row) -> OpenTransaction:
+        self.discard(row.id)
+        return OpenTransaction(
+            id=row.id,
+            key=(trader_id, amount_key(row.amount), row.card_last4),
+            created_at=naive_utc(row.created_at) or datetime.utcnow(),
+        )
+
+    async def _find_in_db(
+        self, db: AsyncSession, trader_id: str, amount, card_last4: Optional[str]
+    ) -> Optional[OpenTransaction]:
+        query = self._open_payins(trader_id).where(Transaction.amount == Decimal(str(amount)))
+        if card_last4 is not None:
+            query = query.where(
+                (Transaction.card_last4 == card_last4) | (Transaction.card_last4.is_(None))
+            )
+        else:
+            query = query.where(Transaction.card_last4.is_(None))
+        result = await db.execute(query.order_by(Transaction.created_at).limit(1))
+        row = result.first()
+        return self._found(trader_id, row) if row is not None else None
+
+    async def _find_many_in_db(
+        self, db: AsyncSession, trader_id: str, wanted: Sequence[Tuple[object, Optional[str]]], claimed: Set[str]
+    ) -> List[Optional[OpenTransaction]]:
+        """``_find_in_db`` for several (amount, card_last4) at once, oldest first, each row used once."""
+        amounts = {Decimal(str(amount)) for amount, _ in wanted}
+        result = await db.execute(
+            self._open_payins(trader_id)
+            .where(Transaction.amount.in_(amounts))
+            .order_by(Transaction.created_at)
+        )
+        candidates = [row for row in result if row.id not in claimed]
+
+        found: List[Optional[OpenTransaction]] = []
+        for amount, card_last4 in wanted:
+            cents = amount_key(amount)
+            for position, row in enumerate(candidates):
+                if amount_key(row.amount) == cents and _card_matches(card_last4, row.card_last4):
+                    found.append(self._found(trader_id, candidates.pop(position)))
+                    break
+            else:
+                found.append(None)
+        return found
+
+    async def match(
+        self,
+        db: AsyncSession,
+        trader_id: str,
+        amount,
+        card_last4: Optional[str],
+        operation_type: Optional[str],
+    ) -> Optional[OpenTransaction]:
+        """
+        Complete the transaction confirmed by a credit notification.
+
+        Runs inside the caller's DB transaction: the caller stores the
+        notification as processed and commits, and on rollback must hand the
+        returned entry back via ``release``.
+        """
+        if not is_credit(amount, operation_type):
+            return None
+
+        while True:
+            entry = self.claim(trader_id, amount, card_last4)
+            if entry is None:
+                entry = await self._find_in_db(db, trader_id, amount, card_last4)
+                if entry is None:
+                    return None
+            if await self._complete(db, trader_id, entry):
+                return entry
+
+    async def match_many(
+        self, db: AsyncSession, trader_id: str, requests: Sequence[MatchRequest]
+    ) -> List[Optional[OpenTransaction]]:
+        """``match`` for a batch of notifications, with one DB lookup for all index misses."""
+        entries: List[Optional[OpenTransaction]] = [None] * len(requests)
+        misses = []
+        for index, (amount, card_last4, operation_type) in enumerate(requests):
+            if is_credit(amount, operation_type):
+                entries[index] = self.claim(trader_id, amount, card_last4)
+                if entries[index] is None:
+                    misses.append(index)
+
+        if misses:
+            claimed = {entry.id for entry in entries if entry is not None}
+            found = await self._find_many_in_db(
+                db, trader_id, [requests[index][:2] for index in misses], claimed
+            )
+            for index, entry in zip(misses, found):
+                entries[index] = entry
+
+        for index, entry in enumerate(entries):
+            if entry is not None and not await self._complete(db, trader_id, entry):
+                # Completed elsewhere in the meantime: look again the one-by-one way
+                entries[index] = await self.match(db, trader_id, *requests[index])
+        return entries
+
+    async def _complete(self, db: AsyncSession, trader_id: str, entry: OpenTransaction) -> bool:
+        """Complete a claimed transaction; False if a manual confirmation or another worker won."""
+        # Conditional update, one statement per open status so the stats know which status was left
+        completed_at = datetime.utcnow()
+        for status in OPEN_STATUSES:
+            result = await db.execute(
+                update(Transaction)
+                .where(Transaction.id == entry.id)
+                .where(Transaction.status == status)
+                .values(status=TransactionStatus.COMPLETED, completed_at=completed_at)
+                .returning(
+                    Transaction.amount, Transaction.amount_usdt, Transaction.requisite_id, Transaction.created_at
+                )
+                .execution_options(synchronize_session=False)
+            )
+            completed = result.first()
+            if completed is not None:
+                break
+        else:
+            return False
+
+        # total_processed changed; the core update bypasses the version, ledger, stats and requisite hooks
+        await bump_versions(db, trader_id, BALANCE)
+        await record_movement(
+            db, trader_id, LedgerEntryType.TRANSACTION_COMPLETED, entry.id,
+            processed=completed.amount_usdt,
+        )
+        await trader_stats.record_change(
+            db, trader_id, TransactionType.PAYIN,
+            (status, completed.amount_usdt, None),
+            (TransactionStatus.COMPLETED, completed.amount_usdt, completed_at),
+        )
+        await requisite_routing.record_change(
+            db, completed.requisite_id, completed.amount, naive_utc(completed.created_at),
+            status, TransactionStatus.COMPLETED,
+        )
+        return True
+
+
+transaction_matcher = TransactionMatcher(timedelta(minutes=settings.transaction_match_window_minutes))
@@ -0,0 +1,366 @@
+"""
+Routing of incoming payins to the trader's requisites.
+
+Active requisites are indexed in memory per (owner_id, payment method) in a
+heap ordered by last use, so the least recently used requisite comes first
+and load spreads evenly. Selection pops candidates until one has enough of
+its daily and monthly limit left, examining at most
+``requisite_route_max_probes`` of them: choosing a requisite costs
+O(log n) no matter how many a trader has.
+
+The limit is then reserved in the DB with one conditional UPDATE, which is
+authoritative: the in-memory usage only pre-filters candidates, and when
+another worker got there first the candidate is reloaded and the next one
+tried. daily_used/monthly_used belong to the day/month in usage_day /
+usage_month and restart with the first reservation of a new period. The
+reserved usage reaches the index when the caller commits; on rollback the
+requisite is re-indexed with its previous usage.
+
+The index is per process: a requisite created or reactivated on another
+worker is only in that worker's index. When the owner's heap is empty or
+its probes run out, routing falls back to one indexed query for the
+owner's active requisites, indexes them and tries once more.
+
+Reservations of transactions that fail or are cancelled are released, and
+completed transactions count towards transactions_count/total_processed,
+by a session hook; the notification matcher, which completes with a Core
+statement, calls ``record_change`` itself.
+"""
+import heapq
+import itertools
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, event, func, inspect, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.money import ZERO, to_decimal
+from app.core.timeutil import naive_utc, periods, utc_timestamp
+from app.models.requisite import Requisite
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.services.versions import REQUISITES, bump_changes, bump_versions
+
+# Statuses of a payin that still holds its reservation
+RESERVING_STATUSES = (TransactionStatus.PENDING, TransactionStatus.PROCESSING)
+RELEASING_STATUSES = (TransactionStatus.FAILED, TransactionStatus.CANCELLED)
+
+RouteKey = Tuple[str, str]
+
+
+def card_last4(card_number: Optional[str]) -> Optional[str]:
+    digits = "".join(ch for ch in card_number or "" if ch.isdigit())
+    return digits[-4:] if len(digits) >= 4 else None
+
+
+class RequisiteEntry:
+    __slots__ = (
+        "id", "owner_id", "methods", "bank_name", "card_last4",
+        "daily_limit", "monthly_limit", "daily_used", "monthly_used", "usage_day", "usage_month",
+        "last_used", "seq",
+    )
+
+    def __init__(self, requisite: Requisite):
+        self.id = requisite.id
+        self.owner_id = requisite.owner_id
+        # Requisites without explicit methods accept payments of their own type
+        self.methods: Set[str] = set(requisite.methods or ()) or {requisite.type.value}
+        self.bank_name = requisite.bank_name
+        self.card_last4 = card_last4(requisite.card_number)
+        self.daily_limit = None if requisite.daily_limit is None else to_decimal(requisite.daily_limit)
+        self.monthly_limit = None if requisite.monthly_limit is None else to_decimal(requisite.monthly_limit)
+        self.daily_used = to_decimal(requisite.daily_used)
+        self.monthly_used = to_decimal(requisite.monthly_used)
+        self.usage_day: Optional[date] = requisite.usage_day
+        self.usage_month: Optional[date] = requisite.usage_month
+        self.last_used = utc_timestamp(requisite.last_used_at)
+        self.seq = 0
+
+    def remaining(self, today: date, month: date) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        """Daily and monthly limit left; None when unlimited."""
+        daily = monthly = None
+        if self.daily_limit is not None:
+            daily = self.daily_limit - (self.daily_used if self.usage_day == today else ZERO)
+        if self.monthly_limit is not None:
+            monthly = self.monthly_limit - (self.monthly_used if self.usage_month == month else ZERO)
+        return daily, monthly
+
+    def can_take(self, amount: Decimal, today: date, month: date) -> bool:
+        return all(left is None or amount <= left for left in self.remaining(today, month))
+
+
+class RequisiteRouter:
+    def __init__(self, max_probes: int):
+        self.max_probes = max_probes
+        self._entries: Dict[str, RequisiteEntry] = {}
+        # (last_used, seq, requisite id); items whose seq is behind the entry's are stale
+        self._heaps: Dict[RouteKey, List[Tuple[float, int, str]]] = {}
+        self._live: Dict[RouteKey, int] = {}
+        self._seq = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, requisite_id: str) -> Optional[RequisiteEntry]:
+        return self._entries.get(requisite_id)
+
+    def _keys(self, entry: RequisiteEntry) -> List[RouteKey]:
+        return [(entry.owner_id, method) for method in entry.methods]
+
+    def _push(self, key: RouteKey, entry: RequisiteEntry) -> None:
+        heap = self._heaps.setdefault(key, [])
+        heapq.heappush(heap, (entry.last_used, entry.seq, entry.id))
+        if len(heap) > 2 * self._live.get(key, 0) + 16:
+            # Too many stale items: rebuild from the live entries
+            heap[:] = [item for item in heap if self._is_current(item)]
+            heapq.heapify(heap)
+
+    def _is_current(self, item: Tuple[float, int, str]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry.seq == item[1]
+
+    def _index(self, entry: RequisiteEntry) -> None:
+        entry.seq = next(self._seq)
+        for key in self._keys(entry):
+            self._push(key, entry)
+
+    def add(self, requisite: Requisite) -> None:
+        """Index a requisite, or re-index it after a change; inactive ones are dropped."""
+        if requisite.is_active:
+            self._install(RequisiteEntry(requisite))
+        else:
+            self.discard(requisite.id)
+
+    def _install(self, entry: RequisiteEntry) -> None:
+        self.discard(entry.id)
+        self._entries[entry.id] = entry
+        for key in self._keys(entry):
+            self._live[key] = self._live.get(key, 0) + 1
+        self._index(entry)
+
+    def _restore(self, requisite_id: str) -> None:
+        """Put a requisite whose reservation was rolled back back in its heaps."""
+        entry = self._entries.get(requisite_id)
+        if entry is not None:
+            self._index(entry)
+
+    def discard(self, requisite_id: str) -> None:
+        entry = self._entries.pop(requisite_id, None)
+        if entry is None:
+            return
+        # Its heap items are now stale and dropped lazily
+        for key in self._keys(entry):
+            self._live[key] -= 1
+            if not self._live[key]:
+                del self._live[key]
+                self._heaps.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._heaps.clear()
+        self._live.clear()
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the index from the active requisites."""
+        self.clear()
+        result = await db.execute(select(Requisite).where(Requisite.is_active.is_(True)))
+        for requisite in result.scalars():
+            self.add(requisite)
+
+    async def reserve(self, db: AsyncSession, requisite_id: str, owner_id: str, amount) -> Optional[Requisite]:
+        """
+        Reserve ``amount`` of a requisite's limits in the caller's DB transaction.
+
+        Returns the updated requisite, or None when it does not exist, is not
+        the owner's, is inactive, or has not enough limit left.
+        """
+        amount = to_decimal(amount)
+        now = datetime.utcnow()
+        today, month = periods(now)
+        daily_used = case(
+            (Requisite.usage_day == today, func.coalesce(Requisite.daily_used, 0) + amount), else_=amount
+        )
+        monthly_used = case(
+            (Requisite.usage_month == month, func.coalesce(Requisite.monthly_used, 0) + amount), else_=amount
+        )
+        result = await db.execute(
+            update(Requisite)
+            .where(Requisite.id == requisite_id)
+            .where(Requisite.owner_id == owner_id)
+            .where(Requisite.is_active.is_(True))
+            .where(or_(Requisite.daily_limit.is_(None), daily_used <= Requisite.daily_limit))
+            .where(or_(Requisite.monthly_limit.is_(None), monthly_used <= Requisite.monthly_limit))
+            .values(
+                daily_used=daily_used,
+                monthly_used=monthly_used,
+                usage_day=today,
+                usage_month=month,
+                last_used_at=now,
+            )
+            .returning(Requisite)
+            .execution_options(populate_existing=True)
+        )
+        requisite = result.scalar_one_or_none()
+        if requisite is not None:
+            # Indexed with the new usage once the caller commits
+            db.sync_session.info.setdefault("reserved_requisites", []).append(RequisiteEntry(requisite))
+            # The bulk update bypasses the version hook
+            await bump_versions(db, owner_id, REQUISITES)
+        return requisite
+
+    async def _load_owner(self, db: AsyncSession, owner_id: str) -> int:
+        """Index the owner's active requisites from the DB; returns how many were found."""
+        result = await db.execute(
+            select(Requisite).where(Requisite.owner_id == owner_id).where(Requisite.is_active.is_(True))
+        )
+        found = 0
+        for requisite in result.scalars():
+            self.add(requisite)
+            found += 1
+        return found
+
+    async def _reload(self, db: AsyncSession, requisite_id: str) -> None:
+        requisite = await db.get(Requisite, requisite_id, populate_existing=True)
+        if requisite is None:
+            self.discard(requisite_id)
+        else:
+            self.add(requisite)
+
+    async def route(self, db: AsyncSession, owner_id: str, method: str, amount) -> Optional[Requisite]:
+        """Pick and reserve the least recently used requisite with enough limit left."""
+        amount = to_decimal(amount)
+        requisite = await self._route_indexed(db, owner_id, method, amount)
+        if requisite is None and await self._load_owner(db, owner_id):
+            # Requisites created or changed on another worker are indexed now
+            requisite = await self._route_indexed(db, owner_id, method, amount)
+        return requisite
+
+    async def _route_indexed(
+        self, db: AsyncSession, owner_id: str, method: str, amount: Decimal
+    ) -> Optional[Requisite]:
+        key = (owner_id, method)
+        today, month = periods(datetime.utcnow())
+        skipped: List[RequisiteEntry] = []
+        probes = 0
+        try:
+            while probes < self.max_probes:
+                heap = self._heaps.get(key)
+                if not heap:
+                    return None
+                item = heapq.heappop(heap)
+                if not self._is_current(item):
+                    continue
+                entry = self._entries[item[2]]
+                probes += 1
+                if not entry.can_take(amount, today, month):
+                    skipped.append(entry)
+                    continue
+
+                requisite = await self.reserve(db, entry.id, owner_id, amount)
+                if requisite is not None:
+                    return requisite
+                # Used up or changed by another worker: refresh it and try the next one
+                await self._reload(db, entry.id)
+            return None
+        finally:
+            for entry in skipped:
+                if self._entries.get(entry.id) is entry:
+                    self._push(key, entry)
+
+
+requisite_router = RequisiteRouter(settings.requisite_route_max_probes)
+
+
+@event.listens_for(Session, "after_commit")
+def _index_reservations(session):
+    for entry in session.info.pop("reserved_requisites", ()):
+        requisite_router._install(entry)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _restore_reservations(session, transaction):
+    # Reservations still pending when the outermost transaction ends were rolled back
+    if transaction.parent is not None:
+        return
+    for entry in session.info.pop("reserved_requisites", ()):
+        requisite_router._restore(entry.id)
+
+
+def _record_change(
+    connection,
+    requisite_id: str,
+    amount,
+    created_at: Optional[datetime],
+    old_status: TransactionStatus,
+    new_status: TransactionStatus,
+) -> None:
+    amount = to_decimal(amount)
+    values = {}
+    if new_status == TransactionStatus.COMPLETED and old_status != TransactionStatus.COMPLETED:
+        values["transactions_count"] = func.coalesce(Requisite.transactions_count, 0) + 1
+        values["total_processed"] = func.coalesce(Requisite.total_processed, 0) + amount
+    elif old_status == TransactionStatus.COMPLETED and new_status != TransactionStatus.COMPLETED:
+        values["transactions_count"] = func.coalesce(Requisite.transactions_count, 0) - 1
+        values["total_processed"] = func.coalesce(Requisite.total_processed, 0) - amount
+
+    released = old_status in RESERVING_STATUSES and new_status in RELEASING_STATUSES
+    if released:
+        # Only usage of the period the reservation was made in is given back
+        reserved_on = (created_at or datetime.utcnow()).date()
+        values["daily_used"] = case(
+            (Requisite.usage_day == reserved_on, Requisite.daily_used - amount), else_=Requisite.daily_used
+        )
+        values["monthly_used"] = case(
+            (Requisite.usage_month == reserved_on.replace(day=1), Requisite.monthly_used - amount),
+            else_=Requisite.monthly_used,
+        )
+    if not values:
+        return
+
+    owner_id = connection.execute(
+        update(Requisite).where(Requisite.id == requisite_id).values(**values).returning(Requisite.owner_id)
+    ).scalar()
+    if owner_id is not None:
+        bump_changes(connection, [(owner_id, REQUISITES)])
+
+    entry = requisite_router.get(requisite_id)
+    if released and entry is not None:
+        if entry.usage_day == reserved_on:
+            entry.daily_used -= amount
+        if entry.usage_month == reserved_on.replace(day=1):
+            entry.monthly_used -= amount
+
+
+async def record_change(
+    db: AsyncSession,
+    requisite_id: Optional[str],
+    amount,
+    created_at: Optional[datetime],
+    old_status: TransactionStatus,
+    new_status: TransactionStatus,
+) -> None:
+    """Apply a payin's status change to its requisite's usage and counters."""
+    if requisite_id is None:
+        return
+    connection = await db.connection()
+    await connection.run_sync(_record_change, requisite_id, amount, created_at, old_status, new_status)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_status_changes(session, flush_context):
+    for obj in session.dirty:
+        if not isinstance(obj, Transaction) or obj.type != TransactionType.PAYIN or obj.requisite_id is None:
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.deleted or not history.added:
+            continue
+        _record_change(
+            session.connection(),
+            obj.requisite_id,
+            obj.amount,
+            naive_utc(inspect(obj).dict.get("created_at")),
+            history.deleted[0],
+            history.added[0],
+        )
@@ -0,0 +1,225 @@
+"""
+Materialized per-trader transaction statistics.
+
+Each transaction contributes to its trader's row in ``trader_stats``: one
+count for its status and its type, and, once completed, its amount_usdt to
+total_processed and to the day/month volume of its completion date. Every
+change of an ORM Transaction applies the difference between its old and
+new contribution with one UPDATE, so reads never aggregate over history.
+Bulk statements call ``record_change`` themselves.
+
+``rebuild`` recomputes all rows from the transactions table;
+``rebuild_trader_stats.py --verify`` compares them without writing.
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, delete, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.money import to_decimal
+from app.core.timeutil import periods
+from app.models.trader_stats import TraderStats
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+
+STATUS_COLUMNS = {status: f"{status.value}_count" for status in TransactionStatus}
+TYPE_COLUMNS = {tx_type: f"{tx_type.value}_count" for tx_type in TransactionType}
+COUNTER_COLUMNS = ("total_count", "total_processed", *STATUS_COLUMNS.values(), *TYPE_COLUMNS.values())
+PERIOD_COLUMNS = ("day_count", "day_volume", "month_count", "month_volume")
+
+
+def _contribution(tx_type, status, amount_usdt, completed_at, today: date, month: date) -> Dict[str, object]:
+    values = {"total_count": 1}
+    if status in STATUS_COLUMNS:
+        values[STATUS_COLUMNS[status]] = 1
+    if tx_type in TYPE_COLUMNS:
+        values[TYPE_COLUMNS[tx_type]] = 1
+    if status == TransactionStatus.COMPLETED:
+        amount = to_decimal(amount_usdt)
+        values["total_processed"] = amount
+        completed_on = completed_at.date() if completed_at is not None else None
+        if completed_on == today:
+            values["day_count"] = 1
+            values["day_volume"] = amount
+        if completed_on is not None and completed_on.replace(day=1) == month:
+            values["month_count"] = 1
+            values["month_volume"] = amount
+    return values
+
+
+def _difference(new: Dict[str, object], old: Dict[str, object]) -> Dict[str, object]:
+    changes = {}
+    for column in set(new) | set(old):
+        value = new.get(column, 0) - old.get(column, 0)
+        if value:
+            changes[column] = value
+    return changes
+
+
+def _apply(connection, trader_id: str, changes: Dict[str, object], today: date, month: date) -> None:
+    if not changes:
+        return
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    connection.execute(insert(TraderStats).values(trader_id=trader_id).on_conflict_do_nothing())
+
+    table = TraderStats.__table__
+    values = {
+        column: table.c[column] + changes[column]
+        for column in COUNTER_COLUMNS if column in changes
+    }
+    # Period counters restart when the first change of a new day/month lands
+    for period, value, columns in (("day", today, ("day_count", "day_volume")),
+                                   ("month", month, ("month_count", "month_volume"))):
+        if any(column in changes for column in columns):
+            values[period] = value
+            for column in columns:
+                delta = changes.get(column, 0)
+                values[column] = case((table.c[period] == value, table.c[column] + delta), else_=delta)
+
+    connection.execute(update(table).where(table.c.trader_id == trader_id).values(**values))
+
+
+def _record_change(connection, trader_id: str, tx_type, old: Optional[tuple], new: Optional[tuple]) -> None:
+    """Apply one transaction's change; ``old``/``new`` are (status, amount_usdt, completed_at) or None."""
+    today, month = periods(datetime.utcnow())
+    old_values = _contribution(tx_type, *old, today, month) if old is not None else {}
+    new_values = _contribution(tx_type, *new, today, month) if new is not None else {}
+    _apply(connection, trader_id, _difference(new_values, old_values), today, month)
+
+
+async def record_change(
+    db: AsyncSession, trader_id: str, tx_type, old: Optional[tuple], new: Optional[tuple]
+) -> None:
+    connection = await db.connection()
+    await connection.run_sync(_record_change, trader_id, tx_type, old, new)
+
+
+async def get_stats(db: AsyncSession, trader_id: str) -> Optional[TraderStats]:
+    return await db.get(TraderStats, trader_id)
+
+
+def _compute(connection, now: datetime) -> Dict[str, Dict[str, object]]:
+    """Stats of every trader aggregated from the transactions table."""
+    today, month = periods(now)
+    month_start = datetime.combine(month, datetime.min.time())
+    day_start = datetime.combine(today, datetime.min.time())
+    stats: Dict[str, Dict[str, object]] = {}
+
+    def row(trader_id: str) -> Dict[str, object]:
+        if trader_id not in stats:
+            stats[trader_id] = {column: 0 for column in COUNTER_COLUMNS + PERIOD_COLUMNS}
+            stats[trader_id].update(day=today, month=month)
+        return stats[trader_id]
+
+    counts = connection.execute(
+        select(Transaction.trader_id, Transaction.type, Transaction.status, func.count())
+        .group_by(Transaction.trader_id, Transaction.type, Transaction.status)
+    )
+    for trader_id, tx_type, status, count in counts:
+        values = row(trader_id)
+        values["total_count"] += count
+        if status in STATUS_COLUMNS:
+            values[STATUS_COLUMNS[status]] += count
+        if tx_type in TYPE_COLUMNS:
+            values[TYPE_COLUMNS[tx_type]] += count
+
+    completed = Transaction.status == TransactionStatus.COMPLETED
+    for prefix, since in (("total", None), ("month", month_start), ("day", day_start)):
+        query = select(Transaction.trader_id, func.count(), func.sum(Transaction.amount_usdt)).where(completed)
+        if since is not None:
+            query = query.where(Transaction.completed_at >= since)
+        for trader_id, count, volume in connection.execute(query.group_by(Transaction.trader_id)):
+            volume = to_decimal(volume)
+            values = row(trader_id)
+            if prefix == "total":
+                values["total_processed"] = volume
+            else:
+                values[f"{prefix}_count"] = count
+                values[f"{prefix}_volume"] = volume
+    return stats
+
+
+def rebuild_all(connection) -> int:
+    """Synchronous rebuild on a plain connection."""
+    stats = _compute(connection, datetime.utcnow())
+    connection.execute(delete(TraderStats))
+    if stats:
+        connection.execute(
+            TraderStats.__table__.insert(),
+            [{"trader_id": trader_id, **values} for trader_id, values in stats.items()],
+        )
+    return len(stats)
+
+
+def _verify(connection) -> List[str]:
+    now = datetime.utcnow()
+    today, month = periods(now)
+    expected = _compute(connection, now)
+    stored = {row.trader_id: row for row in connection.execute(select(TraderStats))}
+
+    problems = []
+    for trader_id in sorted(set(expected) | set(stored)):
+        values = expected.get(trader_id)
+        row = stored.get(trader_id)
+        if values is None:
+            if row.total_count:
+                problems.append(f"{trader_id}: stored stats for a trader without transactions")
+            continue
+        if row is None:
+            problems.append(f"{trader_id}: no stats row")
+            continue
+        for column in COUNTER_COLUMNS + PERIOD_COLUMNS:
+            actual = getattr(row, column)
+            # Counters of a passed period read as zero
+            if column.startswith("day") and row.day != today or column.startswith("month") and row.month != month:
+                actual = 0
+            if to_decimal(actual) != to_decimal(values[column]):
+                problems.append(f"{trader_id}: {column} is {actual}, expected {values[column]}")
+    return problems
+
+
+async def rebuild(db: AsyncSession) -> int:
+    """Recompute every trader's stats from scratch; returns the number of traders."""
+    connection = await db.connection()
+    count = await connection.run_sync(rebuild_all)
+    await db.commit()
+    return count
+
+
+async def verify(db: AsyncSession) -> List[str]:
+    """Differences between the stored stats and a fresh recomputation."""
+    connection = await db.connection()
+    return await connection.run_sync(_verify)
+
+
+def _previous(state, field: str):
+    history = state.attrs[field].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _current(transaction: Transaction) -> tuple:
+    return transaction.status, transaction.amount_usdt, transaction.completed_at
+
+
+@event.listens_for(Session, "after_flush")
+def _update_changed_stats(session, flush_context):
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            changes.append((obj, None, _current(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Transaction):
+            state = inspect(obj)
+            old = tuple(_previous(state, field) for field in ("status", "amount_usdt", "completed_at"))
+            changes.append((obj, old, _current(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            changes.append((obj, _current(obj), None))
+
+    for transaction, old, new in changes:
+        if old != new:
+            _record_change(session.connection(), transaction.trader_id, transaction.type, old, new)
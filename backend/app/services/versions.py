@@ -0,0 +1,159 @@
+"""
+Per-user version stamps of polled resources.
+
+Every write that changes what a user's list or balance endpoint returns
+bumps a counter in ``resource_versions`` inside the same DB transaction.
+ORM writes are tracked by a session hook; bulk UPDATE/INSERT statements
+must call ``bump_versions`` themselves. Reading a stamp is a primary-key
+lookup, so conditional GETs can answer 304 without running the page query.
+
+Bank notifications also carry the stamp of the flush that last wrote them
+in ``change_seq``, which makes the stamp a per-user change sequence for
+delta sync. Since the bump locks the user's counter row until commit,
+sequence numbers become visible in increasing order.
+
+Principal stamps are instead drawn from one ``change_counters`` row shared
+by all users, which orders them the same way across users: the principal
+cache of each worker then polls only the stamps above the last one it saw.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.principal_cache import PRINCIPAL, PRINCIPAL_FIELDS
+from app.models.bank_notification import BankNotification
+from app.models.notification import Notification
+from app.models.requisite import Requisite
+from app.models.resource_version import ChangeCounter, ResourceVersion
+from app.models.transaction import Transaction
+from app.models.user import User
+
+BANK_NOTIFICATIONS = "bank_notifications"
+NOTIFICATIONS = "notifications"
+BALANCE = "balance"
+REQUISITES = "requisites"
+
+BALANCE_FIELDS = ("working_balance", "pending_balance", "security_deposit", "security_deposit_required")
+
+
+def _insert(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def _upsert_statement(dialect_name: str, user_id: str, resource: str):
+    statement = _insert(dialect_name)(ResourceVersion).values(user_id=user_id, resource=resource, version=1)
+    return statement.on_conflict_do_update(
+        index_elements=[ResourceVersion.user_id, ResourceVersion.resource],
+        set_={"version": ResourceVersion.version + 1},
+    ).returning(ResourceVersion.version)
+
+
+def _stamp_principals(connection, user_ids: List[str]) -> None:
+    """Give the users' principal stamps the next value of the shared counter."""
+    insert = _insert(connection.dialect.name)
+    counter = insert(ChangeCounter).values(name=PRINCIPAL, value=1).on_conflict_do_update(
+        index_elements=[ChangeCounter.name], set_={"value": ChangeCounter.value + 1},
+    ).returning(ChangeCounter.value)
+    stamp = connection.execute(counter).scalar_one()
+    for user_id in user_ids:
+        statement = insert(ResourceVersion).values(user_id=user_id, resource=PRINCIPAL, version=stamp)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[ResourceVersion.user_id, ResourceVersion.resource], set_={"version": stamp},
+        ))
+
+
+def _next_version(connection, user_id: str, resource: str) -> int:
+    return connection.execute(_upsert_statement(connection.dialect.name, user_id, resource)).scalar_one()
+
+
+def bump_changes(connection, changes: Iterable[Tuple[str, str]]) -> None:
+    """Bump (user_id, resource) stamps on a sync connection, e.g. in a hook or ``run_sync``."""
+    principals = []
+    for user_id, resource in sorted(set(changes)):
+        if resource == PRINCIPAL:
+            principals.append(user_id)
+        else:
+            connection.execute(_upsert_statement(connection.dialect.name, user_id, resource))
+    if principals:
+        _stamp_principals(connection, principals)
+
+
+async def bump_versions(db: AsyncSession, user_id: str, *resources: str) -> None:
+    """Bump stamps after a bulk statement the session hook cannot see."""
+    connection = await db.connection()
+    await connection.run_sync(bump_changes, [(user_id, resource) for resource in resources])
+
+
+async def next_version(db: AsyncSession, user_id: str, resource: str) -> int:
+    """Bump one stamp and return its new value."""
+    connection = await db.connection()
+    return await connection.run_sync(_next_version, user_id, resource)
+
+
+async def get_version(db: AsyncSession, user_id: str, resource: str) -> int:
+    result = await db.execute(
+        select(ResourceVersion.version)
+        .where(ResourceVersion.user_id == user_id)
+        .where(ResourceVersion.resource == resource)
+    )
+    return result.scalar() or 0
+
+
+def _changed(obj, fields: Iterable[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _changes_of(obj, created_or_deleted: bool) -> Optional[Tuple[str, str]]:
+    if isinstance(obj, Notification):
+        return obj.user_id, NOTIFICATIONS
+    if isinstance(obj, Requisite):
+        return obj.owner_id, REQUISITES
+    if isinstance(obj, Transaction) and (created_or_deleted or _changed(obj, ("status", "amount_usdt"))):
+        # Completed transactions feed total_processed
+        return obj.trader_id, BALANCE
+    if isinstance(obj, User) and not created_or_deleted and _changed(obj, BALANCE_FIELDS):
+        return obj.id, BALANCE
+    return None
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_bank_notifications(session, flush_context, instances):
+    """Give new and modified bank notifications the next change sequence of their user."""
+    by_user: Dict[str, List[BankNotification]] = {}
+    for obj in session.new:
+        if isinstance(obj, BankNotification):
+            by_user.setdefault(obj.user_id, []).append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, BankNotification) and session.is_modified(obj):
+            by_user.setdefault(obj.user_id, []).append(obj)
+    if not by_user:
+        return
+
+    connection = session.connection()
+    for user_id in sorted(by_user):
+        seq = _next_version(connection, user_id, BANK_NOTIFICATIONS)
+        for obj in by_user[user_id]:
+            obj.change_seq = seq
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_changed_versions(session, flush_context):
+    changes: Set[Tuple[str, str]] = set()
+    for obj in session.deleted:
+        if isinstance(obj, BankNotification):
+            changes.add((obj.user_id, BANK_NOTIFICATIONS))
+    for objects, created_or_deleted in ((session.new, True), (session.dirty, False), (session.deleted, True)):
+        for obj in objects:
+            change = _changes_of(obj, created_or_deleted)
+            if change is not None and change[0] is not None:
+                changes.add(change)
+    for obj in session.dirty:
+        # Tells the other workers to drop the user's cached principals
+        if isinstance(obj, User) and _changed(obj, PRINCIPAL_FIELDS):
+            changes.add((obj.id, PRINCIPAL))
+    if changes:
+        bump_changes(session.connection(), changes)
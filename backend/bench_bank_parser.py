@@ -0,0 +1,116 @@
+"""
+Сравнение старого парсера банковских уведомлений (регулярки компилируются
+на каждом вызове, поиск с IGNORECASE, ключевые слова перебором) с движком
+app.services.bank_parser на смешанном потоке: большинство уведомлений на
+устройстве не банковские и без цифр, плюс пуши банков.
+
+Заодно проверяет, что общий профиль отвечает так же, как старый парсер.
+Базу и сервер поднимать не нужно:
+    python bench_bank_parser.py [кол-во повторов]
+"""
+import re
+import sys
+import timeit
+
+from app.services.bank_parser import parse_bank_notification
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+BANK_PUSHES = [
+    ("Пополнение", "Зачисление 1 500,00 ₽ на карту *1234", "com.example.bank"),
+    ("Перевод", "Вам перевели 2 000 руб. Карта *5678", "com.example.bank"),
+    ("Покупка", "Оплата 350.00 RUB карта 4321****", "com.example.bank"),
+    ("Списание", "Списание 10р. MIR-1111", "com.example.bank"),
+    ("Перевод по СБП от ДАНИИЛ", "Альфа-Банк +\xa010\xa0₽ Плат. счёт\xa0••\xa07750", "ru.sberbankmobile"),
+    ("Тинькофф", "Баланс 25 300 ₽. Пополнение на 1 000 ₽ с карты *4455", "com.idamob.tinkoff.android"),
+    ("Пополнение", "Пополнение *1234 на 1 000,00 RUR", "ru.alfabank.mobile.android"),
+    ("ВТБ", "Баланс 15 000.00р. Поступление 1000р Счет *1234", "ru.vtb24.mobilebanking.android"),
+]
+OTHER_PUSHES = [
+    ("WhatsApp", "Новое сообщение от Мамы", "com.whatsapp"),
+    ("Telegram", "Иван: ну что, созвонимся вечером?", "org.telegram.messenger"),
+    ("Доставка", "Курьер уже в пути, ожидайте", "ru.foodfox.client"),
+    ("Погода", "Завтра дождь, возьмите зонт", "ru.yandex.weatherplugin"),
+    ("Почта", "Вам пришло письмо от службы поддержки", "ru.mail.mailapp"),
+    ("Такси", "Водитель подъедет через несколько минут", "ru.yandex.taxi"),
+]
+# На одно банковское уведомление приходится примерно три прочих
+MIXED = BANK_PUSHES + OTHER_PUSHES * 4
+
+
+def old_parse_bank_notification(title: str, text: str, app_package: str):
+    """Парсер до перехода на профили, без изменений"""
+    amount = None
+    card_last4 = None
+    operation_type = None
+
+    full_text = title + ' ' + text
+
+    amount_patterns = [
+        r'(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)\s*[₽руб\u20bd]',
+        r'(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)\s*(?:RUB|rub)',
+        r'[Сс]умма[:\s]+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
+        r'на сумму\s+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
+        r'[Пп]еревод[:\s]+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
+        r'[Зз]ачисление[:\s]+(\d{1,3}(?:[\s\u00a0]?\d{3})*(?:[.,]\d{2})?)',
+        r'(\d+(?:[.,]\d{2})?)\s*р\.?(?:\s|$)',
+        r'(\d+(?:[.,]\d{2})?)\s*рублей'
+    ]
+
+    for pattern in amount_patterns:
+        match = re.search(pattern, full_text, re.IGNORECASE)
+        if match:
+            amount_str = match.group(1).replace(' ', '').replace('\u00a0', '').replace(',', '.')
+            try:
+                amount = float(amount_str)
+                if amount > 0:
+                    break
+            except ValueError:
+                pass
+
+    card_patterns = [
+        r'\*{1,4}(\d{4})',
+        r'карт[аы]?\s*\*?(\d{4})',
+        r'(\d{4})\s*\*{4}',
+        r'[Кк]арта[:\s]+\S*(\d{4})'
+    ]
+
+    for pattern in card_patterns:
+        match = re.search(pattern, full_text, re.IGNORECASE)
+        if match:
+            card_last4 = match.group(1)
+            break
+
+    credit_keywords = ['зачисление', 'пополнение', 'получен', 'входящий', 'поступление', 'перевод от', 'вам перевели']
+    debit_keywords = ['списание', 'покупка', 'оплата', 'перевод', 'снятие', 'оплачен', 'платеж']
+
+    text_lower = full_text.lower()
+
+    if any(keyword in text_lower for keyword in credit_keywords):
+        operation_type = 'credit'
+    elif any(keyword in text_lower for keyword in debit_keywords):
+        operation_type = 'debit'
+
+    return amount, card_last4, operation_type
+
+
+def per_notification_us(parse, notifications) -> float:
+    elapsed = timeit.timeit(lambda: [parse(*notification) for notification in notifications], number=ROUNDS)
+    return elapsed / ROUNDS / len(notifications) * 1e6
+
+
+def main():
+    for title, text, _ in MIXED:
+        old = old_parse_bank_notification(title, text, "")
+        new = parse_bank_notification(title, text, "com.example.unknown")
+        assert old == new, f"общий профиль расходится со старым парсером: {title!r} {text!r}: {old} != {new}"
+
+    print(f"{ROUNDS} повторов, мкс на уведомление:")
+    for name, notifications in (("смешанный поток", MIXED), ("только банковские", BANK_PUSHES)):
+        old = per_notification_us(old_parse_bank_notification, notifications)
+        new = per_notification_us(parse_bank_notification, notifications)
+        print(f"  {name:<20} {old:6.2f} -> {new:6.2f}  (x{old / new:.1f})")
+
+
+if __name__ == "__main__":
+    main()
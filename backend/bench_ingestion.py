@@ -0,0 +1,108 @@
+"""
+Пропускная способность приёма банковских уведомлений на SQLite при разных
+настройках соединения: журнал отката с synchronous=FULL против WAL с
+synchronous=NORMAL, плюс старые настройки без busy_timeout.
+
+Несколько конкурентных писателей вставляют уведомления по одному на коммит,
+как их присылают устройства. Каждая конфигурация запускается в отдельном
+процессе со своей временной базой, так как PRAGMA берутся из настроек при
+импорте приложения. Сервер поднимать не нужно:
+    python bench_ingestion.py [писателей] [вставок на писателя]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+WRITERS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+ROWS_PER_WRITER = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+CONFIGS = {
+    "журнал отката, synchronous=FULL": {
+        "SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_SIZE": "0",
+    },
+    "WAL, synchronous=NORMAL": {
+        "SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL",
+    },
+    "старые настройки, без busy_timeout": {
+        "SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_BUSY_TIMEOUT_MS": "0",
+    },
+}
+
+
+async def run_writers() -> dict:
+    """Одна конфигурация: настройки уже в окружении процесса"""
+    from sqlalchemy.exc import OperationalError
+
+    from app.core.ids import new_id
+    from app.db.database import async_session, init_db
+    from app.models.bank_notification import BankNotification
+    from app.models.user import User, UserRole
+
+    await init_db()
+    async with async_session() as db:
+        user = User(id=new_id(), username="bench", hashed_password="-", role=UserRole.TRADER)
+        db.add(user)
+        await db.commit()
+
+    inserted = locked = 0
+
+    async def writer(number: int) -> None:
+        nonlocal inserted, locked
+        for i in range(ROWS_PER_WRITER):
+            async with async_session() as db:
+                db.add(BankNotification(
+                    user_id=user.id,
+                    app_package="ru.sberbankmobile",
+                    notification_title="Зачисление",
+                    notification_text=f"Перевод 1500 р. от писателя {number}, №{i}",
+                    posted_time=datetime.utcnow(),
+                ))
+                try:
+                    await db.commit()
+                    inserted += 1
+                except OperationalError as exc:
+                    if "database is locked" not in str(exc):
+                        raise
+                    await db.rollback()
+                    locked += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(number) for number in range(WRITERS)))
+    return {"inserted": inserted, "locked": locked, "seconds": time.perf_counter() - started}
+
+
+def run_config(name: str, overrides: dict) -> dict:
+    env = dict(os.environ, **overrides)
+    env["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    env["DB_AUTO_MIGRATE"] = "true"
+    env["DB_ECHO"] = "false"
+    output = subprocess.run(
+        [sys.executable, __file__, str(WRITERS), str(ROWS_PER_WRITER), "--child"],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    total = WRITERS * ROWS_PER_WRITER
+    print(f"{WRITERS} писателей, {total} вставок по одной на коммит:")
+    for name, overrides in CONFIGS.items():
+        result = run_config(name, overrides)
+        rate = result["inserted"] / result["seconds"]
+        line = f"  {name:<36} {rate:7.0f} вставок/с"
+        if result["locked"]:
+            line += f", {result['locked']} из {total} упали с 'database is locked'"
+        print(line)
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        print(json.dumps(asyncio.run(run_writers())))
+    else:
+        main()
@@ -0,0 +1,139 @@
+"""
+Сравнение старого и нового пути сериализации списков на страницах по 100
+элементов: выборка ORM-объектов + валидация Pydantic (from_attributes) +
+JSON против выборки колонок + рендеринга строк через FastJSONResponse.
+
+Запускается против временной SQLite базы, сервер поднимать не нужно:
+    python bench_list_serialization.py [кол-во повторов]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/bench.db"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select
+
+from app.api.responses import FastJSONResponse, row_items
+from app.api.routes.transactions import TRANSACTION_COLUMNS
+from app.core.ids import new_id, new_order_id
+from app.db.database import async_session, init_db
+from app.models.transaction import PaymentMethod, Transaction, TransactionStatus, TransactionType
+from app.models.user import User, UserRole
+from app.schemas.transaction import TransactionListResponse, TransactionResponse
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+PAGE_SIZE = 100
+
+
+def page_query(columns):
+    return select(*columns).order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(PAGE_SIZE)
+
+
+async def orm_page(db):
+    result = await db.execute(page_query([Transaction]))
+    items = result.scalars().all()
+    db.expunge_all()  # каждый запрос в приложении идёт в новой сессии
+    return TransactionListResponse(items=items, page=1, page_size=PAGE_SIZE)
+
+
+async def old_json_response(db) -> bytes:
+    """ORM + Pydantic + jsonable_encoder + json.dumps (JSONResponse в FastAPI до dump_json)"""
+    return json.dumps(jsonable_encoder(await orm_page(db))).encode()
+
+
+async def old_dump_json(db) -> bytes:
+    """ORM + Pydantic + model_dump_json (путь FastAPI с dump_json)"""
+    return (await orm_page(db)).model_dump_json().encode()
+
+
+async def new_rows(db) -> bytes:
+    """Колонки + FastJSONResponse"""
+    result = await db.execute(page_query(TRANSACTION_COLUMNS))
+    content = {"items": row_items(result.all(), TransactionResponse), "page": 1, "page_size": PAGE_SIZE}
+    return FastJSONResponse(content).body
+
+
+async def measure(db, path) -> float:
+    await path(db)
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await path(db)
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+def measure_sync(render) -> float:
+    render()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        render()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+def report(title, timings) -> None:
+    print(title)
+    baseline = timings[0][1]
+    for name, elapsed in timings:
+        print(f"  {name:<86} {elapsed:7.3f}  (x{baseline / elapsed:.1f})")
+
+
+async def main():
+    await init_db()
+    async with async_session() as db:
+        user = User(id=new_id(), username="bench", hashed_password="-", role=UserRole.TRADER)
+        db.add(user)
+        await db.flush()
+        await db.execute(insert(Transaction), [
+            {
+                "id": new_id(),
+                "order_id": new_order_id(),
+                "trader_id": user.id,
+                "type": TransactionType.PAYIN,
+                "amount": Decimal("15000.00") + i,
+                "amount_usdt": Decimal("162.162162"),
+                "method": PaymentMethod.CARD,
+                "status": TransactionStatus.COMPLETED,
+                "card_last4": "1234",
+                "bank_name": "Сбербанк",
+                "created_at": datetime.utcnow(),
+                "completed_at": datetime.utcnow(),
+            }
+            for i in range(PAGE_SIZE * 10)
+        ])
+        await db.commit()
+
+        old, new = await old_dump_json(db), await new_rows(db)
+        assert json.loads(old)["items"] == json.loads(new)["items"], "ответы различаются"
+
+        paths = (old_json_response, old_dump_json, new_rows)
+        report(
+            f"Страница {PAGE_SIZE} транзакций, {ROUNDS} повторов, мс на страницу (выборка + сериализация):",
+            [(path.__doc__, await measure(db, path)) for path in paths],
+        )
+
+        # Только сериализация уже выбранной страницы
+        objects = (await db.execute(page_query([Transaction]))).scalars().all()
+        rows = (await db.execute(page_query(TRANSACTION_COLUMNS))).all()
+
+        def validated():
+            return TransactionListResponse(items=objects, page=1, page_size=PAGE_SIZE)
+
+        report("Только сериализация, мс на страницу:", [
+            (old_json_response.__doc__, measure_sync(lambda: json.dumps(jsonable_encoder(validated())).encode())),
+            (old_dump_json.__doc__, measure_sync(lambda: validated().model_dump_json().encode())),
+            (new_rows.__doc__, measure_sync(lambda: FastJSONResponse(
+                {"items": row_items(rows, TransactionResponse), "page": 1, "page_size": PAGE_SIZE}
+            ).body)),
+        ])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
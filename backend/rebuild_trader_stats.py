@@ -0,0 +1,32 @@
+"""
+Пересчёт материализованной статистики трейдеров (таблица trader_stats)
+с нуля по таблице transactions.
+
+    python rebuild_trader_stats.py           # пересчитать
+    python rebuild_trader_stats.py --verify  # только сверить, ничего не меняя
+"""
+import asyncio
+import sys
+
+from app.db.database import async_session
+from app.services import trader_stats
+
+
+async def main(verify_only: bool) -> int:
+    async with async_session() as db:
+        problems = await trader_stats.verify(db)
+        if verify_only:
+            for problem in problems:
+                print(problem)
+            print(f"Расхождений: {len(problems)}")
+            return 1 if problems else 0
+
+        if problems:
+            print(f"Расхождений до пересчёта: {len(problems)}")
+        count = await trader_stats.rebuild(db)
+        print(f"Статистика пересчитана для {count} трейдеров")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--verify" in sys.argv[1:])))
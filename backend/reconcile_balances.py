@@ -0,0 +1,33 @@
+"""
+Сверка журнала балансов (balance_snapshots) с балансами в таблице users и
+суммой завершённых транзакций. Расхождения (например, баланс изменён
+напрямую в базе) записываются в журнал корректирующими проводками.
+Сверка также сравнивает total_processed журнала и trader_stats; статистику
+трейдеров пересчитывает rebuild_trader_stats.py.
+
+    python reconcile_balances.py           # сверить и записать корректировки
+    python reconcile_balances.py --verify  # только сверить, ничего не меняя
+"""
+import asyncio
+import sys
+
+from app.db.database import async_session
+from app.services import ledger
+
+
+async def main(verify_only: bool) -> int:
+    async with async_session() as db:
+        problems = await ledger.verify(db)
+        if verify_only:
+            for problem in problems:
+                print(problem)
+            print(f"Расхождений: {len(problems)}")
+            return 1 if problems else 0
+
+        count = await ledger.reconcile(db)
+        print(f"Корректировки записаны для {count} пользователей")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--verify" in sys.argv[1:])))
@@ -0,0 +1,79 @@
+"""
+Tests run the app against a temporary SQLite database migrated to head,
+the same way a server with DB_AUTO_MIGRATE=true starts.
+"""
+import os
+import tempfile
+import uuid
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/test.db"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+os.environ["DEBUG"] = "false"
+# Tests run in one worker; a background principal sync would count against query budgets
+os.environ["PRINCIPAL_CACHE_SYNC_SECONDS"] = "3600"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.query_inspector import max_queries
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def run(client):
+    """Run a coroutine on the app's event loop, where its engine and pool live"""
+    return client.portal.call
+
+
+@pytest.fixture
+def login(client):
+    """Register a fresh user and return its auth headers"""
+
+    def _login(role: str = "trader") -> dict:
+        username = f"{role}-{uuid.uuid4().hex[:12]}"
+        client.post("/api/v1/auth/register", json={"username": username, "password": "secret123", "role": role})
+        response = client.post("/api/v1/auth/login", data={"username": username, "password": "secret123"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return _login
+
+
+@pytest.fixture
+def trader(client, login):
+    """A trader with a requisite, a payin, a dispute on it and a bank notification"""
+    headers = login()
+    requisite = client.post("/api/v1/requisites", headers=headers, json={
+        "type": "card", "bank_name": "Сбербанк", "card_number": "2200000000001234", "holder_name": "Иван Иванов",
+    })
+    assert requisite.status_code == 201, requisite.text
+    for amount in ("1500.00", "2500.00"):
+        payin = client.post("/api/v1/transactions", headers=headers, json={
+            "type": "payin", "amount": amount, "amount_usdt": "16.5", "method": "card",
+        })
+        assert payin.status_code == 201, payin.text
+    dispute = client.post("/api/v1/disputes", headers=headers, json={
+        "transaction_id": payin.json()["id"], "reason": "payment_not_received",
+    })
+    assert dispute.status_code == 201, dispute.text
+    notification = client.post("/api/v1/bank-notifications", headers=headers, json={
+        "app_package": "ru.sberbankmobile",
+        "notification_title": "Зачисление",
+        "notification_text": "Перевод 900 р. с карты *4321",
+        "posted_time": "2026-10-18T12:00:00Z",
+    })
+    assert notification.status_code == 201, notification.text
+    return headers
+
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(n):`` fails the test when the block runs more than n statements"""
+    return max_queries
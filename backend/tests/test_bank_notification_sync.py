@@ -0,0 +1,29 @@
+"""
+Delta sync of bank notifications bootstrapped from the newest list page.
+"""
+
+
+def notification(text: str) -> dict:
+    return {
+        "app_package": "ru.sberbankmobile",
+        "notification_title": "Зачисление",
+        "notification_text": text,
+        "posted_time": "2026-10-18T12:00:00Z",
+    }
+
+
+def test_list_sync_token_resumes_after_the_page(client, login):
+    headers = login()
+    for i in range(3):
+        client.post("/api/v1/bank-notifications", headers=headers, json=notification(f"Перевод {100 + i} р."))
+
+    listed = client.get("/api/v1/bank-notifications?page_size=2", headers=headers).json()
+    assert len(listed["items"]) == 2 and listed["sync_token"]
+
+    unchanged = client.get(f"/api/v1/bank-notifications/changes?since={listed['sync_token']}", headers=headers)
+    assert unchanged.json()["items"] == []
+
+    created = client.post("/api/v1/bank-notifications", headers=headers, json=notification("Перевод 900 р.")).json()
+    changes = client.get(f"/api/v1/bank-notifications/changes?since={listed['sync_token']}", headers=headers).json()
+    assert [item["id"] for item in changes["items"]] == [created["id"]]
+    assert changes["has_more"] is False
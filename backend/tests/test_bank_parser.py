@@ -0,0 +1,61 @@
+"""
+Bank notification parser: bank profiles, and the generic profile's output
+pinned to what the parser produced before profiles existed.
+"""
+import pytest
+
+from app.services.bank_parser import get_profile, parse_bank_notification
+
+# (app_package, title, text, expected, expected from the generic profile)
+PROFILE_CASES = [
+    pytest.param(
+        "ru.sberbankmobile", "Перевод по СБП от ДАНИИЛ", "Альфа-Банк +\xa010\xa0₽ Плат. счёт\xa0••\xa07750",
+        (10.0, "7750", "credit"), (10.0, None, "debit"), id="sber",
+    ),
+    pytest.param(
+        "ru.sberbankmobile", "СберБанк", "MIR-5521 14:02 зачисление 2 500р Баланс: 10 000р",
+        (2500.0, "5521", "credit"), (2500.0, None, "credit"), id="sber-mir",
+    ),
+    pytest.param(
+        "com.idamob.tinkoff.android", "Тинькофф", "Баланс 25 300 ₽. Пополнение на 1 000 ₽ с карты *4455",
+        (1000.0, "4455", "credit"), (25300.0, "4455", "credit"), id="tinkoff",
+    ),
+    pytest.param(
+        "ru.alfabank.mobile.android", "Пополнение", "Пополнение *1234 на 1 000,00 RUR",
+        (1000.0, "1234", "credit"), (None, "1234", "credit"), id="alfa",
+    ),
+    pytest.param(
+        "ru.vtb24.mobilebanking.android", "ВТБ", "Баланс 15 000.00р. Поступление 1000р Счет *1234",
+        (1000.0, "1234", "credit"), (15000.0, "1234", "credit"), id="vtb",
+    ),
+]
+
+# Output of the parser before profiles, which the generic profile must keep
+GENERIC_CASES = [
+    ("Пополнение", "Зачисление 1 500,00 ₽ на карту *1234", (1500.0, "1234", "credit")),
+    ("Перевод", "Вам перевели 2 000 руб. Карта *5678", (2000.0, "5678", "credit")),
+    ("Покупка", "Оплата 350.00 RUB карта 4321****", (350.0, "4321", "debit")),
+    ("Списание", "Списание 10р. MIR-1111", (10.0, None, "debit")),
+    ("Сумма: 100", "перевод от Ивана", (100.0, None, "credit")),
+    ("Зачисление: 12 000", "Карта: •4567", (12000.0, "4567", "credit")),
+    ("Перевод 300 рублей", "на сумму 300 с карты ****9988", (300.0, "9988", "debit")),
+    ("Снятие наличных", "5 000 р. Карта: 1234", (5000.0, "1234", "debit")),
+    ("Платеж", "Оплачен счет на сумму 1 234,56", (1234.56, None, "debit")),
+    ("Поступление", "Получен перевод 0,00 ₽", (0.0, None, "credit")),
+    ("Перевод по СБП от ДАНИИЛ", "Альфа-Банк +\xa010\xa0₽ Плат. счёт\xa0••\xa07750", (10.0, None, "debit")),
+    ("WhatsApp", "Новое сообщение от Мамы", (None, None, None)),
+    ("Доставка", "Ваш заказ №12345 в пути", (None, None, None)),
+]
+
+
+@pytest.mark.parametrize("app_package,title,text,expected,generic", PROFILE_CASES)
+def test_bank_profile(app_package, title, text, expected, generic):
+    assert get_profile(app_package).name != "generic"
+    assert parse_bank_notification(title, text, app_package) == expected
+    assert parse_bank_notification(title, text, "com.example.unknown") == generic
+
+
+@pytest.mark.parametrize("title,text,expected", GENERIC_CASES)
+def test_generic_profile_matches_previous_parser(title, text, expected):
+    assert parse_bank_notification(title, text, "com.example.unknown") == expected
+    assert parse_bank_notification(title, text, None) == expected
@@ -0,0 +1,100 @@
+"""
+Ledger verification against the balance columns and trader_stats.
+"""
+from decimal import Decimal
+
+from sqlalchemy import select, update
+
+from app.db.database import async_session
+from app.models.ledger import BalanceLedgerEntry, LedgerEntryType
+from app.models.trader_stats import TraderStats
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.user import User
+from app.services import ledger
+from app.services.versions import BALANCE, get_version
+
+
+def test_verify_reports_trader_stats_drift(client, login, run):
+    user_id = client.get("/api/v1/users/me", headers=login()).json()["id"]
+
+    async def verify_with_stats(total_processed):
+        async with async_session() as db:
+            db.add(TraderStats(trader_id=user_id, total_processed=total_processed))
+            await db.flush()
+            problems = await ledger.verify(db)
+            await db.rollback()
+            return problems
+
+    assert run(verify_with_stats, Decimal("0")) == []
+    [problem] = run(verify_with_stats, Decimal("12.5"))
+    assert problem.startswith(f"{user_id}: total_processed is 0")
+    assert problem.endswith("12.500000 in trader_stats")
+
+
+def test_closing_a_dispute_books_nothing(client, login, run):
+    headers = login()
+    user_id = client.get("/api/v1/users/me", headers=headers).json()["id"]
+    client.post("/api/v1/requisites", headers=headers, json={
+        "type": "card", "bank_name": "Сбербанк", "card_number": "2200000000005678", "holder_name": "Иван Иванов",
+    })
+    payin = client.post("/api/v1/transactions", headers=headers, json={
+        "type": "payin", "amount": "1500.00", "amount_usdt": "16.5", "method": "card",
+    }).json()
+
+    async def complete():
+        async with async_session() as db:
+            transaction = await db.get(Transaction, payin["id"])
+            transaction.status = TransactionStatus.COMPLETED
+            await db.commit()
+
+    async def entries():
+        async with async_session() as db:
+            result = await db.execute(
+                select(BalanceLedgerEntry.entry_type, BalanceLedgerEntry.processed_delta)
+                .where(BalanceLedgerEntry.user_id == user_id)
+                .where(BalanceLedgerEntry.reference_id == payin["id"])
+                .order_by(BalanceLedgerEntry.created_at, BalanceLedgerEntry.id)
+            )
+            return result.all()
+
+    async def verify():
+        async with async_session() as db:
+            return await ledger.verify(db)
+
+    run(complete)
+    dispute = client.post("/api/v1/disputes", headers=headers, json={
+        "transaction_id": payin["id"], "reason": "payment_not_received",
+    }).json()
+    booked = [
+        (LedgerEntryType.TRANSACTION_COMPLETED, Decimal("16.5")),
+        (LedgerEntryType.TRANSACTION_REVERSED, Decimal("-16.5")),
+    ]
+    assert run(entries) == booked
+
+    response = client.patch(f"/api/v1/disputes/{dispute['id']}", headers=headers, json={"status": "won"})
+    assert response.status_code == 200, response.text
+    assert run(entries) == booked
+    assert client.get(f"/api/v1/transactions/{payin['id']}", headers=headers).json()["status"] == "disputed"
+    assert run(verify) == []
+
+
+def test_reconcile_bumps_the_balance_version(client, login, run):
+    user_id = client.get("/api/v1/users/me", headers=login()).json()["id"]
+
+    async def write_behind_the_ledger():
+        async with async_session() as db:
+            await db.execute(update(User).where(User.id == user_id).values(working_balance=Decimal("42.00")))
+            await db.commit()
+
+    async def balance_version():
+        async with async_session() as db:
+            return await get_version(db, user_id, BALANCE)
+
+    async def reconcile():
+        async with async_session() as db:
+            return await ledger.reconcile(db)
+
+    run(write_behind_the_ledger)
+    before = run(balance_version)
+    assert run(reconcile) == 1
+    assert run(balance_version) > before
@@ -0,0 +1,34 @@
+"""
+The notification stream re-checks its token on every keepalive.
+"""
+import asyncio
+
+from app.api.deps import authenticate_stream_token
+from app.api.routes import notifications
+from app.db.database import async_session
+from app.models.user import User
+
+
+def test_stream_ends_once_the_user_is_deactivated(client, login, run, monkeypatch):
+    monkeypatch.setattr(notifications, "STREAM_KEEPALIVE_SECONDS", 0.05)
+    token = login()["Authorization"].removeprefix("Bearer ")
+
+    async def stream():
+        principal = await authenticate_stream_token(token)
+        response = await notifications.stream_notifications(current_user=principal, token=token)
+        chunks = response.body_iterator
+        received = [await chunks.__anext__(), await chunks.__anext__()]
+
+        async with async_session() as db:
+            user = await db.get(User, principal.id)
+            user.is_active = False
+            await db.commit()
+
+        async def rest():
+            return [chunk async for chunk in chunks]
+
+        return received, await asyncio.wait_for(rest(), 5)
+
+    received, after_deactivation = run(stream)
+    assert received == [": connected\n\n", ": keepalive\n\n"]
+    assert after_deactivation == []
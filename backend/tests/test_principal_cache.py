@@ -0,0 +1,40 @@
+"""
+Syncing cached principals with changes made by other workers.
+"""
+from app.core.principal_cache import Principal, principal_cache
+from app.db.database import async_session
+from app.models.user import User
+
+
+def test_sync_drops_only_users_stamped_since_the_last_sync(client, login, run):
+    first, second = (client.get("/api/v1/users/me", headers=login()).json()["id"] for _ in range(2))
+
+    async def sync():
+        async with async_session() as db:
+            return await principal_cache.sync(db)
+
+    async def deactivate(user_id):
+        async with async_session() as db:
+            user = await db.get(User, user_id)
+            user.is_active = False
+            await db.commit()
+
+    async def cached(user_id):
+        async with async_session() as db:
+            return Principal.from_user(await db.get(User, user_id))
+
+    run(sync)
+    run(deactivate, first)
+    run(deactivate, second)
+    # As if cached on this worker before the change reached it
+    principal_cache.put("first-token", run(cached, first))
+    principal_cache.put("second-token", run(cached, second))
+
+    assert run(sync) == 2
+    assert principal_cache.get("first-token") is None
+    assert principal_cache.get("second-token") is None
+
+    principal_cache.put("first-token", run(cached, first))
+    assert run(sync) == 0
+    assert principal_cache.get("first-token") is not None
+    principal_cache.invalidate_user(first)
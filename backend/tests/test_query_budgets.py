@@ -0,0 +1,60 @@
+"""
+Statement budgets of the list endpoints. Lists are filled with more rows
+than a page shows, so a per-row lazy load or lookup blows the budget.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.api.pagination import encode_cursor
+
+CURSOR = encode_cursor(datetime.utcnow(), "Z" * 26)
+ROWS = 12
+
+# Offset pages carry their total in the page statement, cursor pages count
+# separately; lists behind a version check add one statement for it.
+BUDGETS = [
+    ("/api/v1/transactions?page_size=5", 1),
+    ("/api/v1/transactions?status=pending", 1),
+    (f"/api/v1/transactions?cursor={CURSOR}", 2),
+    (f"/api/v1/transactions?cursor={CURSOR}&include_total=false", 1),
+    ("/api/v1/bank-notifications?page_size=5", 2),
+    (f"/api/v1/bank-notifications?cursor={CURSOR}", 3),
+    ("/api/v1/bank-notifications/changes?limit=5", 1),
+    ("/api/v1/notifications", 2),
+    ("/api/v1/wallet/transactions", 1),
+    (f"/api/v1/wallet/transactions?cursor={CURSOR}", 2),
+    ("/api/v1/disputes?page_size=5", 1),
+    (f"/api/v1/disputes?cursor={CURSOR}", 2),
+    ("/api/v1/requisites", 2),
+]
+
+
+@pytest.fixture
+def busy_trader(client, trader):
+    for i in range(ROWS):
+        payin = client.post("/api/v1/transactions", headers=trader, json={
+            "type": "payin", "amount": f"{1000 + i}.00", "amount_usdt": "11", "method": "card",
+        })
+        assert payin.status_code == 201, payin.text
+        client.post("/api/v1/disputes", headers=trader, json={
+            "transaction_id": payin.json()["id"], "reason": "timeout",
+        })
+    batch = client.post("/api/v1/bank-notifications/batch", headers=trader, json={"items": [
+        {
+            "app_package": "ru.sberbankmobile",
+            "notification_title": "Зачисление",
+            "notification_text": f"Перевод {500 + i} р.",
+            "posted_time": "2026-10-18T12:00:00Z",
+        }
+        for i in range(ROWS)
+    ]})
+    assert batch.status_code == 201, batch.text
+    return trader
+
+
+@pytest.mark.parametrize("path,budget", BUDGETS)
+def test_list_endpoint_budget(client, busy_trader, query_budget, path, budget):
+    with query_budget(budget):
+        response = client.get(path, headers=busy_trader)
+    assert response.status_code == 200, response.text
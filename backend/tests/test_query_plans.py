@@ -0,0 +1,88 @@
+"""
+Every statement a list endpoint runs against its table must be an index
+SEARCH: no table or index SCAN and no temp B-tree sort for the ORDER BY.
+"""
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.api.pagination import encode_cursor
+from app.core.principal_cache import principal_cache
+from app.db.database import async_session, engine
+
+CURSOR = encode_cursor(datetime.utcnow(), "Z" * 26)
+
+LIST_REQUESTS = [
+    ("/api/v1/transactions", "transactions"),
+    ("/api/v1/transactions?status=disputed&type=payin", "transactions"),
+    (f"/api/v1/transactions?cursor={CURSOR}", "transactions"),
+    ("/api/v1/bank-notifications", "bank_notifications"),
+    (f"/api/v1/bank-notifications?cursor={CURSOR}", "bank_notifications"),
+    ("/api/v1/bank-notifications/changes", "bank_notifications"),
+    ("/api/v1/notifications", "notifications"),
+    ("/api/v1/wallet/transactions", "wallet_transactions"),
+    (f"/api/v1/wallet/transactions?cursor={CURSOR}", "wallet_transactions"),
+    ("/api/v1/disputes", "disputes"),
+    ("/api/v1/disputes?status=open", "disputes"),
+    (f"/api/v1/disputes?cursor={CURSOR}", "disputes"),
+    ("/api/v1/requisites", "requisites"),
+]
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+def query_plan(statement: str, parameters) -> list:
+    with sqlite3.connect(engine.url.database) as connection:
+        return [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+@pytest.mark.parametrize("path,table", LIST_REQUESTS)
+def test_list_statements_use_an_index(client, trader, path, table):
+    with captured_statements() as statements:
+        response = client.get(path, headers=trader)
+    assert response.status_code == 200, response.text
+
+    listed = [
+        (statement, parameters) for statement, parameters in statements
+        if statement.lstrip().upper().startswith("SELECT") and re.search(rf"\bFROM {table}\b", statement)
+    ]
+    assert listed, f"{path} ran no SELECT on {table}"
+
+    for statement, parameters in listed:
+        plan = query_plan(statement, parameters)
+        steps = [step for step in plan if re.match(rf"(SEARCH|SCAN) {table}\b", step)]
+        assert steps, (statement, plan)
+        for step in steps:
+            assert step.startswith(f"SEARCH {table} USING") and "INDEX" in step, (statement, plan)
+        assert not any("TEMP B-TREE" in step for step in plan), (statement, plan)
+
+
+def test_principal_sync_uses_an_index(client, run):
+    async def sync():
+        async with async_session() as db:
+            await principal_cache.sync(db)
+
+    run(sync)
+    with captured_statements() as statements:
+        run(sync)
+
+    [(statement, parameters)] = statements
+    plan = query_plan(statement, parameters)
+    index = "ix_resource_versions_resource_version"
+    assert any(step.startswith(f"SEARCH resource_versions USING INDEX {index}") for step in plan), plan
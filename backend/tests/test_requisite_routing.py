@@ -0,0 +1,49 @@
+"""
+Payin routing against the per-worker requisite index.
+"""
+import pytest
+
+from app.api.idempotency import Idempotency
+from app.services.requisite_routing import requisite_router
+
+PAYIN = {"type": "payin", "amount": "100.00", "amount_usdt": "1.1", "method": "card"}
+
+
+@pytest.fixture
+def requisite(client, login):
+    headers = login()
+    response = client.post("/api/v1/requisites", headers=headers, json={
+        "type": "card", "bank_name": "Сбербанк", "card_number": "2200000000005678",
+        "holder_name": "Иван Иванов", "daily_limit": "1000.00",
+    })
+    assert response.status_code == 201, response.text
+    return headers, response.json()["id"]
+
+
+def test_routes_to_requisite_indexed_by_another_worker(client, requisite):
+    headers, requisite_id = requisite
+    # As if the requisite had been created on another worker
+    requisite_router.discard(requisite_id)
+
+    response = client.post("/api/v1/transactions", headers=headers, json=PAYIN)
+
+    assert response.status_code == 201, response.text
+    assert response.json()["requisite_id"] == requisite_id
+    assert requisite_router.get(requisite_id) is not None
+
+
+def test_rolled_back_reservation_leaves_index_usage(client, requisite, monkeypatch):
+    headers, requisite_id = requisite
+
+    async def fail(self, db, body, status_code):
+        raise RuntimeError("commit failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Idempotency, "commit", fail)
+        with pytest.raises(RuntimeError):
+            client.post("/api/v1/transactions", headers=headers, json=PAYIN)
+
+    assert requisite_router.get(requisite_id).daily_used == 0
+    response = client.post("/api/v1/transactions", headers=headers, json=PAYIN)
+    assert response.status_code == 201, response.text
+    assert requisite_router.get(requisite_id).daily_used == 100
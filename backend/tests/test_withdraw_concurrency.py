@@ -0,0 +1,63 @@
+"""
+Concurrent withdrawals of one trader: none may overdraw, every accepted one
+is debited exactly once, and the ledger snapshot agrees with the users row.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.db.database import async_session
+from app.models.ledger import BalanceSnapshot
+from app.models.user import User
+from app.models.wallet import WalletTransaction
+from app.services import ledger
+
+REQUESTS = 200
+CONCURRENCY = 50
+AMOUNT = Decimal("7.00")
+# Enough for about half of the requests
+START_BALANCE = AMOUNT * (REQUESTS // 2) + Decimal("3.00")
+
+
+def test_concurrent_withdrawals_never_overdraw(client, login, run):
+    headers = login()
+    user_id = client.get("/api/v1/users/me", headers=headers).json()["id"]
+
+    async def fund():
+        # Through the ORM, so the ledger books the deposit
+        async with async_session() as db:
+            user = await db.get(User, user_id)
+            user.working_balance = START_BALANCE
+            await db.commit()
+
+    run(fund)
+
+    def withdraw(_):
+        return client.post(
+            "/api/v1/wallet/withdraw",
+            json={"type": "withdraw", "amount": str(AMOUNT), "address": "TStress"},
+            headers=headers,
+        ).status_code
+
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        statuses = list(pool.map(withdraw, range(REQUESTS)))
+
+    async def stored():
+        async with async_session() as db:
+            user = await db.get(User, user_id)
+            snapshot = await db.get(BalanceSnapshot, user_id)
+            withdrawals = (await db.execute(
+                select(func.count()).select_from(WalletTransaction).where(WalletTransaction.user_id == user_id)
+            )).scalar()
+            return user, snapshot, withdrawals, await ledger.verify(db)
+
+    user, snapshot, withdrawals, problems = run(stored)
+    accepted = statuses.count(201)
+
+    assert statuses.count(400) == REQUESTS - accepted, statuses
+    assert accepted == int(START_BALANCE // AMOUNT) == withdrawals
+    assert user.working_balance == START_BALANCE - AMOUNT * accepted >= 0, "overdraft"
+    assert user.pending_balance == AMOUNT * accepted
+    assert (snapshot.working_balance, snapshot.pending_balance) == (user.working_balance, user.pending_balance)
+    assert problems == []